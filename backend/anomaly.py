@@ -0,0 +1,65 @@
+"""Streaming spending statistics for anomaly detection.
+
+Each (user, category) keeps a small state dict that is updated in O(1) per expense:
+  - Welford running mean / variance (count, mean, m2)
+  - an exponentially weighted moving average of recent amounts (ewma)
+  - a frugal median / MAD sketch: both estimates move a small step towards every new
+    observation, so they track the robust centre and spread without storing history
+"""
+import math
+from typing import Any, Dict, Optional
+
+EWMA_ALPHA = 0.1
+SKETCH_STEP = 0.05  # fraction of the current spread the median/MAD sketch moves per observation
+MIN_SAMPLES = 5
+ROBUST_THRESHOLD = 3.5  # modified z-score cut-off (Iglewicz & Hoaglin)
+Z_THRESHOLD = 3.0  # fallback while the MAD sketch is still zero
+MAD_SCALE = 1.4826  # makes the MAD comparable to a standard deviation for normal data
+
+def empty_stats() -> Dict[str, Any]:
+    return {"count": 0, "mean": 0.0, "m2": 0.0, "ewma": 0.0, "median": 0.0, "mad": 0.0}
+
+def update_stats(stats: Dict[str, Any], amount: float) -> Dict[str, Any]:
+    """Return the state after observing `amount`; the input dict is left untouched"""
+    count = stats["count"] + 1
+    delta = amount - stats["mean"]
+    mean = stats["mean"] + delta / count
+    m2 = stats["m2"] + delta * (amount - mean)
+
+    if stats["count"] == 0:
+        return {"count": count, "mean": mean, "m2": m2, "ewma": amount, "median": amount, "mad": 0.0}
+
+    ewma = EWMA_ALPHA * amount + (1 - EWMA_ALPHA) * stats["ewma"]
+    median, mad = stats["median"], stats["mad"]
+    step = SKETCH_STEP * (mad or abs(median) or 1.0)
+    if amount > median:
+        median += min(step, amount - median)
+    elif amount < median:
+        median -= min(step, median - amount)
+    deviation = abs(amount - median)
+    if deviation > mad:
+        mad += min(step, deviation - mad)
+    elif deviation < mad:
+        mad -= min(step, mad - deviation)
+
+    return {"count": count, "mean": mean, "m2": m2, "ewma": ewma, "median": median, "mad": mad}
+
+def variance(stats: Dict[str, Any]) -> float:
+    return stats["m2"] / (stats["count"] - 1) if stats["count"] > 1 else 0.0
+
+def anomaly_score(stats: Dict[str, Any], amount: float) -> Optional[Dict[str, float]]:
+    """Score `amount` against the state seen so far; returns the scores if it is an upward outlier"""
+    if stats["count"] < MIN_SAMPLES:
+        return None
+    std = math.sqrt(variance(stats))
+    z_score = (amount - stats["mean"]) / std if std > 0 else 0.0
+    robust_score = (amount - stats["median"]) / (MAD_SCALE * stats["mad"]) if stats["mad"] > 0 else 0.0
+
+    if stats["mad"] > 0:
+        is_outlier = robust_score > ROBUST_THRESHOLD
+    else:
+        is_outlier = z_score > Z_THRESHOLD
+    if not is_outlier:
+        return None
+    return {"z_score": z_score, "robust_score": robust_score, "ewma": stats["ewma"],
+            "median": stats["median"], "mean": stats["mean"]}
@@ -0,0 +1,280 @@
+"""Load-test the read routes against a seeded local database and write a JSON baseline.
+
+Usage (from the backend directory):
+    python benchmarks/bench_load.py [--backend mongomock|mongod] [--mongo-url URL] [--db-name NAME]
+        [--users-per-profile 5] [--anclas 200] [--transactions 1000] [--diary 60]
+        [--concurrency 8] [--requests 200] [--alloc-samples 20] [--seed 42]
+        [--output baseline.json] [--compare previous.json]
+
+Synthetic users are seeded for every UserProfile through the same builders the API uses,
+either into an in-process mongomock-motor database (default, needs the mongomock-motor
+package) or into a local mongod. Each route is then driven in-process through the ASGI app
+at a fixed concurrency; the report holds throughput, p50/p95/p99 latency, the median
+tracemalloc peak per request (measured in a separate sequential pass so tracing does not
+distort the timings) and, against mongod, MongoDB commands per request from /api/_metrics.
+Every route starts with an empty response cache; routes served from it report the hit
+ratio of their timed pass, since those timings measure cache hits rather than MongoDB.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Read routes under test; {user_id} and the timeline window are filled per request
+ROUTES = {
+    "dashboard": "/api/users/{user_id}/dashboard",
+    "budget_analytics": "/api/budget-analytics/{user_id}",
+    "financial_report": "/api/financial-reports/{user_id}",
+    "transactions_list": "/api/transactions/{user_id}?limit=100",
+    "diary_list": "/api/diary/{user_id}?limit=100",
+    "categories_list": "/api/categories/{user_id}",
+    "anclas_window": "/api/anclas?user_id={user_id}&from={window_from}&to={window_to}",
+}
+MOODS = ["happy", "neutral", "sad", "excited", "stressed"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["mongomock", "mongod"], default="mongomock")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="anclora_bench")
+    parser.add_argument("--drop", action="store_true", help="Drop --db-name first if it already holds data (mongod)")
+    parser.add_argument("--users-per-profile", type=int, default=5)
+    parser.add_argument("--anclas", type=int, default=200, help="Anclas per user")
+    parser.add_argument("--transactions", type=int, default=1000, help="Transactions per user")
+    parser.add_argument("--diary", type=int, default=60, help="Diary entries per user")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per route")
+    parser.add_argument("--alloc-samples", type=int, default=20, help="Sequential requests traced per route")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--compare", help="Previous JSON report to diff against")
+    return parser.parse_args()
+
+def load_server(args):
+    # server.py reads its connection settings at import time
+    os.environ["MONGO_URL"] = args.mongo_url
+    os.environ["DB_NAME"] = args.db_name
+    import server
+
+    # httpx logs every request at INFO, which would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if args.backend == "mongomock":
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--backend mongomock needs the mongomock-motor package (pip install mongomock-motor)")
+        server.db = AsyncMongoMockClient()[args.db_name]
+    return server
+
+def synthetic_documents(server, args, rng: random.Random):
+    """Users, their predefined categories/habits/objectives and the configured volumes of data"""
+    now = datetime.utcnow()
+    documents = {name: [] for name in ("users", "categories", "habits", "objectives", "anclas", "transactions", "diary_entries")}
+    for profile in server.UserProfile:
+        budget = server.BUDGET_CATEGORIES[profile]
+        for n in range(args.users_per_profile):
+            user = server.UserCreate(email=f"{profile.value}{n}@bench.local", name=f"Bench {n}", profile=profile)
+            user_obj, categories, habits, objectives = server.build_user_documents(user)
+            user_id = user_obj.id
+            documents["users"].append(user_obj.dict())
+            documents["categories"].extend(categories)
+            documents["habits"].extend(habits)
+            documents["objectives"].extend(objectives)
+
+            category_ids = [category["id"] for category in categories] or ["general"]
+            for i in range(args.anclas):
+                start = now + timedelta(days=rng.uniform(-60, 60))
+                repeat = rng.choices(["no_repeat", "daily", "weekly", "monthly"], weights=[85, 5, 7, 3])[0]
+                status = "completed" if start < now and rng.random() < 0.6 else "active"
+                documents["anclas"].append(server.Ancla(
+                    user_id=user_id, title=f"Ancla {i}", description="Carga sintética",
+                    type=rng.choice(["task", "event"]), priority=rng.choice(["urgent", "important", "informative"]),
+                    category_id=rng.choice(category_ids), status=status, repeat_type=repeat, start_date=start,
+                    completed_at=start if status == "completed" else None, created_at=start - timedelta(days=1)
+                ).dict())
+
+            for i in range(args.transactions):
+                is_income = rng.random() < 0.2
+                created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+                transaction = server.Transaction(
+                    user_id=user_id, type="income" if is_income else "expense",
+                    category=rng.choice(budget["income"] if is_income else budget["expense"]),
+                    description=f"Movimiento {i}",
+                    amount=round(rng.uniform(800, 2000) if is_income else rng.lognormvariate(4, 1), 2),
+                    date=created_at.date(), created_at=created_at
+                ).dict()
+                transaction["date"] = transaction["date"].isoformat()
+                documents["transactions"].append(transaction)
+
+            for i in range(args.diary):
+                created_at = now - timedelta(days=i, hours=rng.randint(0, 12))
+                entry = server.DiaryEntry(
+                    user_id=user_id, content=f"Entrada {i}", mood=rng.choice(MOODS),
+                    date=created_at.date(), created_at=created_at
+                ).dict()
+                entry["date"] = entry["date"].isoformat()
+                documents["diary_entries"].append(entry)
+    return documents
+
+async def seed(server, args, rng: random.Random):
+    database = server.db
+    if args.backend == "mongod":
+        if await database.list_collection_names():
+            if not args.drop:
+                sys.exit(f"Database {args.db_name} already holds data; pass --drop to replace it")
+            await server.client.drop_database(args.db_name)
+        server.log_index_report(await server.ensure_indexes(database))
+
+    started = time.perf_counter()
+    documents = synthetic_documents(server, args, rng)
+    await asyncio.gather(*(server.insert_in_batches(database[name], docs) for name, docs in documents.items()))
+    await server.rebuild_transaction_rollups(database)
+    counts = {name: len(docs) for name, docs in documents.items()}
+    print(f"seeded {counts} in {time.perf_counter() - started:.1f}s")
+    return [user["id"] for user in documents["users"]], counts
+
+def request_path(route: str, user_id: str) -> str:
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return ROUTES[route].format(
+        user_id=user_id,
+        window_from=(today - timedelta(days=7)).isoformat(),
+        window_to=(today + timedelta(days=7)).isoformat(),
+    )
+
+async def drive(http, route: str, user_ids, args, rng: random.Random):
+    """Issue args.requests requests from args.concurrency workers; returns latencies and error count"""
+    paths = [request_path(route, rng.choice(user_ids)) for _ in range(args.requests)]
+    latencies, errors = [], 0
+    queue = iter(paths)
+
+    async def worker():
+        nonlocal errors
+        for path in queue:
+            started = time.perf_counter()
+            response = await http.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+async def allocation_peaks(http, route: str, user_ids, args, rng: random.Random):
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(args.alloc_samples):
+            path = request_path(route, rng.choice(user_ids))
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            await http.get(path)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def db_queries_per_request(server, route: str):
+    # Metrics are labelled with the route template, which is the path without its query string
+    template = ROUTES[route].split("?")[0]
+    histogram = server.metrics_registry.histograms["anclora_request_db_queries"].get(("GET", template))
+    return round(histogram.sum / histogram.count, 2) if histogram and histogram.count else None
+
+async def run(args):
+    rng = random.Random(args.seed)
+    server = load_server(args)
+    user_ids, counts = await seed(server, args, rng)
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        for route in ROUTES:
+            # Cache entries must not carry over from the previous route or run
+            server.response_cache = server.build_response_cache()
+            # One untimed request per route warms lazy imports
+            await http.get(request_path(route, user_ids[0]))
+            server.response_cache.hits.clear()
+            server.response_cache.misses.clear()
+            latencies, errors, elapsed = await drive(http, route, user_ids, args, rng)
+            cache = server.response_cache.stats()
+            cache_hit_ratio = round(cache["hit_ratio"], 3) if cache["hits"] + cache["misses"] else None
+            peaks = await allocation_peaks(http, route, user_ids, args, rng) if args.alloc_samples else []
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+            results[route] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "throughput_rps": round(len(latencies) / elapsed, 1),
+                "mean_ms": round(float(np.mean(latencies)) * 1000, 2),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "alloc_peak_kib": round(float(np.median(peaks)) / 1024, 1) if peaks else None,
+                # None when the route does not go through response_cache
+                "response_cache_hit_ratio": cache_hit_ratio,
+                # mongomock-motor publishes no command events, so only mongod runs can count queries
+                "db_queries_per_request": db_queries_per_request(server, route) if args.backend == "mongod" else None,
+            }
+            print(f"{route:<18} {results[route]['throughput_rps']:>8.1f} req/s  "
+                  f"p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms  errors {errors}"
+                  + (f"  cache hits {cache_hit_ratio:.0%}" if cache_hit_ratio is not None else ""))
+
+    if args.backend == "mongod":
+        server.client.close()
+    return {
+        "meta": {
+            "backend": args.backend,
+            "seed": args.seed,
+            "users_per_profile": args.users_per_profile,
+            "documents": counts,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+            "alloc_samples": args.alloc_samples,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.utcnow().isoformat(),
+        },
+        "routes": results,
+    }
+
+def compare(report, previous):
+    settings = ("backend", "users_per_profile", "documents", "concurrency", "requests_per_route")
+    changed = [key for key in settings if report["meta"].get(key) != previous.get("meta", {}).get(key)]
+    if changed:
+        print(f"warning: runs differ in {', '.join(changed)}; the comparison is not like for like")
+    print(f"\n{'route':<18} {'metric':<15} {'previous':>10} {'current':>10} {'change':>8}")
+    for route, current in report["routes"].items():
+        before = previous.get("routes", {}).get(route)
+        if not before:
+            print(f"{route:<18} (new route)")
+            continue
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "alloc_peak_kib"):
+            old, new = before.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{route:<18} {metric:<15} {old:>10} {new:>10} {change:>8}")
+
+def main():
+    args = parse_args()
+    report = asyncio.run(run(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"wrote {args.output}")
+    if args.compare:
+        compare(report, json.loads(Path(args.compare).read_text()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark FinancialAIEngine.analyze_spending_patterns against the original per-transaction loop.
+
+Usage (from the backend directory):
+    python benchmarks/bench_spending_patterns.py [--transactions 100000] [--repeat 5]
+
+Both implementations run over the same synthetic user history; the script fails if their
+outputs differ in value or type and prints the best-of-N timings and the speedup.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import BUDGET_CATEGORIES, FinancialAIEngine, UserProfile
+
+def reference_analyze_spending_patterns(transactions, user_profile):
+    """The pure-Python implementation analyze_spending_patterns replaced, kept as the oracle"""
+    if not transactions:
+        return {}
+
+    category_spending = {}
+    monthly_totals = {}
+
+    for transaction in transactions:
+        if transaction.get('type') == 'expense':
+            category = transaction.get('category', 'Other')
+            amount = transaction.get('amount', 0)
+            month = transaction.get('created_at', datetime.now()).strftime('%Y-%m')
+
+            if category not in category_spending:
+                category_spending[category] = []
+            category_spending[category].append(amount)
+
+            if month not in monthly_totals:
+                monthly_totals[month] = 0
+            monthly_totals[month] += amount
+
+    patterns = {
+        'category_averages': {},
+        'category_trends': {},
+        'spending_volatility': {},
+        'monthly_growth': 0
+    }
+
+    for category, amounts in category_spending.items():
+        patterns['category_averages'][category] = sum(amounts) / len(amounts)
+        patterns['spending_volatility'][category] = max(amounts) - min(amounts) if len(amounts) > 1 else 0
+
+    if len(monthly_totals) >= 2:
+        months = sorted(monthly_totals.keys())
+        last_month = monthly_totals[months[-1]]
+        prev_month = monthly_totals[months[-2]]
+        patterns['monthly_growth'] = ((last_month - prev_month) / prev_month) * 100 if prev_month > 0 else 0
+
+    return patterns
+
+def typed(value):
+    """Compare results by value and type: 5 == 5.0, but the JSON and stored insights differ"""
+    if isinstance(value, dict):
+        return {key: typed(item) for key, item in value.items()}
+    return type(value).__name__, value
+
+def synthetic_transactions(count: int, seed: int = 42, integers: bool = False):
+    rng = random.Random(seed)
+    profile = UserProfile.FREELANCER
+    expense_categories = BUDGET_CATEGORIES[profile]["expense"]
+    income_categories = BUDGET_CATEGORIES[profile]["income"]
+    now = datetime.utcnow()
+    transactions = []
+    for _ in range(count):
+        is_income = rng.random() < 0.2
+        transactions.append({
+            "type": "income" if is_income else "expense",
+            "category": rng.choice(income_categories if is_income else expense_categories),
+            "amount": round(rng.uniform(800, 2000) if is_income else rng.lognormvariate(4, 1), None if integers else 2),
+            "created_at": now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600)),
+        })
+    return transactions
+
+def best_of(repeat: int, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    transactions = synthetic_transactions(args.transactions)
+    profile = UserProfile.FREELANCER.value
+    reference_time, expected = best_of(args.repeat, reference_analyze_spending_patterns, transactions, profile)
+    vectorized_time, actual = best_of(args.repeat, FinancialAIEngine.analyze_spending_patterns, transactions, profile)
+
+    # Legacy rows can hold integer amounts; check those keep their types on a smaller history
+    integer_transactions = synthetic_transactions(1000, integers=True)
+    if typed(actual) != typed(expected) or typed(
+        FinancialAIEngine.analyze_spending_patterns(integer_transactions, profile)
+    ) != typed(reference_analyze_spending_patterns(integer_transactions, profile)):
+        print("analyze_spending_patterns output differs from the reference implementation")
+        sys.exit(1)
+
+    print(f"transactions: {args.transactions}")
+    print(f"reference:    {reference_time * 1000:.1f} ms")
+    print(f"vectorized:   {vectorized_time * 1000:.1f} ms")
+    print(f"speedup:      {reference_time / vectorized_time:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Maintenance commands for the Anclora backend.
+
+Usage (from the backend directory):
+    python cli.py ensure-indexes [--check-only]
+    python cli.py rebuild-rollups [--user-id USER_ID]
+    python cli.py rebuild-spending-stats [--user-id USER_ID]
+    python cli.py rebuild-user-stats
+    python cli.py recompute-ai-insights [--batch-size N] [--workers N] [--restart]
+    python cli.py sweep-overdue
+"""
+import asyncio
+from typing import Optional
+
+import typer
+
+from server import (
+    AI_BATCH_SIZE,
+    client,
+    db,
+    ensure_indexes,
+    log_index_report,
+    logger,
+    overdue_sweeper,
+    rebuild_spending_stats,
+    rebuild_transaction_rollups,
+    rebuild_user_stats,
+    recompute_all_ai_insights,
+)
+
+cli = typer.Typer(help="Anclora backend maintenance commands")
+
+@cli.callback()
+def main():
+    pass
+
+@cli.command("ensure-indexes")
+def ensure_indexes_command(
+    check_only: bool = typer.Option(False, "--check-only", help="Report missing indexes without creating them"),
+):
+    """Create the indexes declared in INDEX_REGISTRY. Exits with status 1 if any are missing or failed."""
+    report = asyncio.run(ensure_indexes(db, check_only=check_only))
+    client.close()
+    log_index_report(report)
+    if report["missing"] or report["failed"]:
+        raise typer.Exit(code=1)
+
+@cli.command("rebuild-rollups")
+def rebuild_rollups_command(
+    user_id: Optional[str] = typer.Option(None, "--user-id", help="Only rebuild this user's rollups"),
+):
+    """Recompute transaction_rollups from the raw transactions. Run with transaction writes paused."""
+    count = asyncio.run(rebuild_transaction_rollups(db, user_id=user_id))
+    client.close()
+    logger.info(f"Rebuilt transaction rollups: {count} documents")
+
+@cli.command("rebuild-spending-stats")
+def rebuild_spending_stats_command(
+    user_id: Optional[str] = typer.Option(None, "--user-id", help="Only rebuild this user's statistics"),
+):
+    """Replay expense history into spending_stats, e.g. after changing the anomaly model."""
+    count = asyncio.run(rebuild_spending_stats(db, user_id=user_id))
+    client.close()
+    logger.info(f"Rebuilt spending stats: {count} documents")
+
+@cli.command("rebuild-user-stats")
+def rebuild_user_stats_command():
+    """Recompute completion totals, streaks and ranks from the completed_at history. Run with completions paused."""
+    count = asyncio.run(rebuild_user_stats(db))
+    client.close()
+    logger.info(f"Rebuilt user stats: {count} users with completions")
+
+@cli.command("recompute-ai-insights")
+def recompute_ai_insights_command(
+    batch_size: int = typer.Option(AI_BATCH_SIZE, "--batch-size", min=1, help="Users loaded and written per batch"),
+    workers: Optional[int] = typer.Option(None, "--workers", min=1, help="Worker processes (defaults to the CPU count)"),
+    restart: bool = typer.Option(False, "--restart", help="Ignore the saved checkpoint and start from the first user"),
+):
+    """Recompute every user's cached AI insights and recommendations. Resumes an interrupted run by default."""
+    result = asyncio.run(recompute_all_ai_insights(db, batch_size=batch_size, workers=workers, restart=restart))
+    client.close()
+    logger.info(
+        f"Recomputed AI insights for {result['users']} users in {result['seconds']:.1f}s "
+        f"({result['users_per_second']:.1f} users/sec)"
+    )
+
+@cli.command("sweep-overdue")
+def sweep_overdue_command():
+    """Run one overdue sweep, for deployments that start the API with OVERDUE_SWEEPER=off."""
+    count = asyncio.run(overdue_sweeper.sweep())
+    client.close()
+    logger.info(f"Marked {count} anclas overdue")
+
+if __name__ == "__main__":
+    cli()
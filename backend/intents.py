@@ -0,0 +1,121 @@
+"""Intent classifier for the local financial chat.
+
+Questions are normalised (lowercase, accents stripped), reduced to 5-character stems
+and expanded with stem bigrams. INTENT_INDEX maps every feature seen in the example
+phrases to the share of its occurrences that belong to each intent, so classifying a
+question is a handful of dict lookups and needs no model or network access.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+STEM_LENGTH = 5
+BIGRAM_WEIGHT = 2.0
+FALLBACK_INTENT = "general"
+FALLBACK_CONFIDENCE = 0.3
+
+STOPWORDS = {
+    "a", "al", "como", "con", "cual", "cuales", "cuanto", "cuanta", "de", "del", "el", "en", "es",
+    "esta", "este", "estoy", "hay", "la", "las", "lo", "los", "me", "mi", "mis", "mas", "muy", "para",
+    "por", "puedo", "que", "se", "si", "son", "su", "sus", "tengo", "te", "tu", "tus", "un", "una",
+    "y", "yo",
+}
+
+INTENT_EXAMPLES = {
+    "savings": [
+        "como puedo ahorrar mas dinero",
+        "quiero ahorrar",
+        "consejos para ahorrar",
+        "donde puedo recortar gastos",
+        "cuanto podria ahorrar al mes",
+        "como guardo mas dinero",
+        "reducir gastos y ahorrar",
+    ],
+    "expenses": [
+        "cuales son mis gastos principales",
+        "analiza mis gastos del ultimo mes",
+        "en que gasto mas dinero",
+        "cuanto he gastado este mes",
+        "cuanto gaste en comida",
+        "resumen de gastos",
+        "mis gastos por categoria",
+        "donde se va mi dinero",
+    ],
+    "budget": [
+        "como esta mi presupuesto",
+        "que presupuesto me recomiendas",
+        "me he pasado del limite",
+        "limites de gasto",
+        "voy dentro del presupuesto",
+        "ajustar mi presupuesto mensual",
+    ],
+    "income": [
+        "que ingresos tengo este mes",
+        "cuanto he ganado",
+        "cuanto dinero entra",
+        "resumen de ingresos",
+        "cuanto cobre este mes",
+        "mis fuentes de ingresos",
+    ],
+    "goals": [
+        "ayudame a establecer metas",
+        "como van mis metas de ahorro",
+        "cuanto me falta para mi objetivo",
+        "progreso de mis metas",
+        "quiero crear una meta",
+        "objetivos financieros",
+    ],
+    "health": [
+        "cual es mi rumbo financiero",
+        "como navego mis finanzas",
+        "como esta mi salud financiera",
+        "como voy con mis finanzas",
+        "puntuacion financiera",
+        "estado de mis finanzas",
+        "como anclo mis gastos",
+    ],
+    "greeting": [
+        "hola",
+        "buenos dias",
+        "buenas tardes",
+        "hola capitan",
+        "que puedes hacer",
+        "ayuda",
+    ],
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+def features(text: str) -> List[str]:
+    stems = [token[:STEM_LENGTH] for token in TOKEN_PATTERN.findall(normalize(text)) if token not in STOPWORDS]
+    return stems + [f"{a} {b}" for a, b in zip(stems, stems[1:])]
+
+def build_index(examples: Dict[str, List[str]]) -> Dict[str, Dict[str, float]]:
+    counts = defaultdict(Counter)
+    for intent, phrases in examples.items():
+        for phrase in phrases:
+            for feature in features(phrase):
+                counts[feature][intent] += 1
+    return {
+        feature: {intent: n / sum(by_intent.values()) for intent, n in by_intent.items()}
+        for feature, by_intent in counts.items()
+    }
+
+INTENT_INDEX = build_index(INTENT_EXAMPLES)
+
+def classify(question: str) -> Tuple[str, float]:
+    """Return the best matching intent and a 0-1 confidence (the winner's share of the total score)"""
+    scores = Counter()
+    for feature in features(question):
+        weight = BIGRAM_WEIGHT if " " in feature else 1.0
+        for intent, share in INTENT_INDEX.get(feature, {}).items():
+            scores[intent] += weight * share
+    if not scores:
+        return FALLBACK_INTENT, FALLBACK_CONFIDENCE
+    intent, best = scores.most_common(1)[0]
+    return intent, round(best / sum(scores.values()), 2)
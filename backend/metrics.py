@@ -0,0 +1,215 @@
+"""Per-request timing and MongoDB command instrumentation.
+
+MetricsMiddleware times every HTTP request and labels it with the matched route template.
+CommandMetrics is a pymongo CommandListener: Motor runs commands on executor threads but
+copies the caller's context, so each command is charged to the request that issued it
+through the REQUEST_STATS context variable. MetricsRegistry keeps the per-route histograms
+and renders them in the Prometheus text exposition format.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+DOCUMENT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+class RequestStats:
+    """What one request spent in MongoDB and in named phases such as serialisation"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # commands of one request can finish on several executor threads
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.documents = 0
+        self.commands = Counter()
+        self.phases = Counter()
+
+    def command_started(self, name: str):
+        with self.lock:
+            self.queries += 1
+            self.commands[name] += 1
+
+    def command_finished(self, seconds: float, documents: int = 0):
+        with self.lock:
+            self.db_seconds += seconds
+            self.documents += documents
+
+    def add_phase(self, name: str, seconds: float):
+        with self.lock:
+            self.phases[name] += seconds
+
+REQUEST_STATS: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+@contextmanager
+def phase(name: str):
+    """Charge the wrapped block's wall time to `name` on the current request, if any"""
+    stats = REQUEST_STATS.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.add_phase(name, time.perf_counter() - started)
+
+def returned_documents(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:  # findAndModify
+        return int(reply["value"] is not None)
+    return 0
+
+class CommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        stats = REQUEST_STATS.get()
+        if stats is not None:
+            stats.command_started(event.command_name)
+
+    def succeeded(self, event):
+        stats = REQUEST_STATS.get()
+        if stats is not None:
+            stats.command_finished(event.duration_micros / 1e6, returned_documents(event.reply))
+
+    def failed(self, event):
+        stats = REQUEST_STATS.get()
+        if stats is not None:
+            stats.command_finished(event.duration_micros / 1e6)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: Dict[str, str]) -> str:
+    return "{" + ",".join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    HISTOGRAMS = {
+        "anclora_request_duration_seconds": ("Request latency", LATENCY_BUCKETS),
+        "anclora_request_db_queries": ("MongoDB commands issued per request", QUERY_BUCKETS),
+        "anclora_request_db_seconds": ("Time spent in MongoDB commands per request", LATENCY_BUCKETS),
+        "anclora_request_db_documents": ("Documents returned by MongoDB per request", DOCUMENT_BUCKETS),
+    }
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Tuple[str, str], Histogram]] = {name: {} for name in self.HISTOGRAMS}
+        self.requests = Counter()
+        self.phase_seconds = Counter()
+        self.n_plus_one = Counter()
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        values = {
+            "anclora_request_duration_seconds": seconds,
+            "anclora_request_db_queries": stats.queries,
+            "anclora_request_db_seconds": stats.db_seconds,
+            "anclora_request_db_documents": stats.documents,
+        }
+        for name, value in values.items():
+            by_route = self.histograms[name]
+            if key not in by_route:
+                by_route[key] = Histogram(self.HISTOGRAMS[name][1])
+            by_route[key].observe(value)
+        self.requests[(method, route, str(status))] += 1
+        for name, phase_seconds in stats.phases.items():
+            self.phase_seconds[(method, route, name)] += phase_seconds
+
+    def render(self) -> str:
+        lines = [
+            "# HELP anclora_requests_total Requests by route and status",
+            "# TYPE anclora_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f"anclora_requests_total{format_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        for name, (help_text, _) in self.HISTOGRAMS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for (method, route), histogram in sorted(self.histograms[name].items()):
+                labels = {"method": method, "route": route}
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels({**labels, 'le': f'{bound:g}'})} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels({**labels, 'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        lines += [
+            "# HELP anclora_request_phase_seconds_total Time spent in named request phases",
+            "# TYPE anclora_request_phase_seconds_total counter",
+        ]
+        for (method, route, name), seconds in sorted(self.phase_seconds.items()):
+            lines.append(f"anclora_request_phase_seconds_total{format_labels({'method': method, 'route': route, 'phase': name})} {seconds:.6f}")
+
+        lines += [
+            "# HELP anclora_n_plus_one_total Requests that issued more MongoDB commands than the N+1 threshold",
+            "# TYPE anclora_n_plus_one_total counter",
+        ]
+        for (method, route), count in sorted(self.n_plus_one.items()):
+            lines.append(f"anclora_n_plus_one_total{format_labels({'method': method, 'route': route})} {count}")
+        return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and MongoDB usage per route template"""
+
+    def __init__(self, app, registry: MetricsRegistry, query_threshold: int = 5,
+                 logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.registry = registry
+        self.query_threshold = query_threshold
+        self.logger = logger or logging.getLogger(__name__)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = REQUEST_STATS.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUEST_STATS.reset(token)
+            # The router leaves the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            self.registry.observe(method, route, status, elapsed, stats)
+            if stats.queries > self.query_threshold:
+                self.registry.n_plus_one[(method, route)] += 1
+                commands = ", ".join(f"{name}={count}" for name, count in stats.commands.most_common())
+                self.logger.warning(
+                    f"Possible N+1: {method} {route} issued {stats.queries} MongoDB commands "
+                    f"({commands}) in {elapsed * 1000:.1f} ms, {stats.db_seconds * 1000:.1f} ms in MongoDB"
+                )
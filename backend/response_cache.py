@@ -0,0 +1,93 @@
+"""Response cache for read-heavy per-user routes.
+
+ResponseCache stores serialised response bodies in a backend that speaks the small
+subset of the redis.asyncio API it needs (get, set with ex=, delete). TTLLRUCache is
+the in-process default; a redis.asyncio.Redis client can be passed in unchanged when
+several workers need to share entries and invalidations.
+
+Keys carry a per-(user, resource) generation token. Invalidating a resource writes a
+new token, so every cached page of it becomes unreachable at once and the stale
+entries simply age out.
+"""
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+class TTLLRUCache:
+    """In-process LRU map with per-entry expiry, redis.asyncio-compatible for get/set/delete"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value, ex: Optional[int] = None):
+        self.entries[key] = (time.monotonic() + ex if ex else None, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self.entries.pop(key, None) is not None for key in keys)
+
+    def __len__(self):
+        return len(self.entries)
+
+class ResponseCache:
+    def __init__(self, backend, ttl: int = 300, prefix: str = "anclora:cache"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def generation_key(self, user_id: str, resource: str) -> str:
+        return f"{self.prefix}:{user_id}:{resource}:gen"
+
+    async def generation(self, user_id: str, resource: str) -> str:
+        key = self.generation_key(user_id, resource)
+        token = await self.backend.get(key)
+        if token is None:
+            # A fresh token (never a reused counter) keeps evicted generations from resurrecting old entries
+            token = str(time.time_ns())
+            await self.backend.set(key, token)
+        return token.decode() if isinstance(token, bytes) else token
+
+    async def get(self, user_id: str, resource: str, params: str = "") -> Tuple[str, Optional[bytes]]:
+        """Look up an entry; returns the generation to pass to set() along with the cached value"""
+        generation = await self.generation(user_id, resource)
+        value = await self.backend.get(f"{self.prefix}:{user_id}:{resource}:{generation}:{params}")
+        (self.hits if value is not None else self.misses)[resource] += 1
+        return generation, value
+
+    async def set(self, user_id: str, resource: str, generation: str, value: bytes, params: str = ""):
+        # Stored under the generation read before the database query, so a write racing the
+        # query leaves this entry unreachable instead of serving it as fresh
+        await self.backend.set(f"{self.prefix}:{user_id}:{resource}:{generation}:{params}", value, ex=self.ttl)
+
+    async def invalidate(self, user_id: str, *resources: str):
+        for resource in resources:
+            await self.backend.set(self.generation_key(user_id, resource), str(time.time_ns()))
+
+    def stats(self) -> Dict[str, Any]:
+        resources = sorted(set(self.hits) | set(self.misses))
+        hits, misses = sum(self.hits.values()), sum(self.misses.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": len(self.backend) if isinstance(self.backend, TTLLRUCache) else None,
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "resources": {r: {"hits": self.hits[r], "misses": self.misses[r]} for r in resources},
+        }
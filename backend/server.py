@@ -1,35 +1,77 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response, StreamingResponse
+from fastapi.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, UpdateOne, ReplaceOne, DeleteMany, ReturnDocument, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, date, timedelta
+import asyncio
+import calendar
+import heapq
+import itertools
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+import re
+from functools import lru_cache
+from datetime import datetime, date, timedelta, timezone
 from enum import Enum
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import json
-from bson import ObjectId
-
-# Custom JSON encoder to handle ObjectId
-class JSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if isinstance(o, ObjectId):
-            return str(o)
-        return super().default(o)
+import hashlib
+import base64
+import csv
+import io
+from decimal import Decimal
+import orjson
+import numpy as np
+import pandas as pd
+from bson import ObjectId, Decimal128
+
+import anomaly
+import intents
+from metrics import CommandMetrics, MetricsMiddleware, MetricsRegistry, phase
+from response_cache import ResponseCache, TTLLRUCache
+
+# Fast JSON responses: orjson serialises datetime, date, enums and dicts natively,
+# orjson_default covers the BSON/decimal types that can come straight from MongoDB
+def orjson_default(o):
+    if isinstance(o, ObjectId):
+        return str(o)
+    if isinstance(o, Decimal128):
+        return float(o.to_decimal())
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Type is not JSON serializable: {type(o).__name__}")
+
+def dumps(content) -> bytes:
+    with phase("serialize"):
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Every MongoDB command is charged to the request that issued it (see metrics.py)
+metrics_registry = MetricsRegistry()
+client = AsyncIOMotorClient(mongo_url, event_listeners=[CommandMetrics()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -55,6 +97,11 @@ class AnclaStatus(str, Enum):
     COMPLETED = "completed"
     OVERDUE = "overdue"
 
+class RecommendationStatus(str, Enum):
+    ACTIVE = "active"
+    DISMISSED = "dismissed"
+    COMPLETED = "completed"
+
 class RepeatType(str, Enum):
     NO_REPEAT = "no_repeat"
     DAILY = "daily"
@@ -83,6 +130,7 @@ class User(BaseModel):
     total_completed: int = 0
     current_streak: int = 0
     best_streak: int = 0
+    last_completion_day: Optional[datetime] = None
 
 class UserCreate(BaseModel):
     email: str
@@ -96,6 +144,7 @@ class Category(BaseModel):
     icon: str
     profile: UserProfile
     user_id: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class CategoryCreate(BaseModel):
     name: str
@@ -124,6 +173,14 @@ class Ancla(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
 
+class AnclaOccurrence(BaseModel):
+    # Sparse per-occurrence override of a recurring ancla; only stored once an occurrence changes
+    ancla_id: str
+    user_id: str
+    occurrence_date: datetime
+    status: AnclaStatus = AnclaStatus.COMPLETED
+    completed_at: Optional[datetime] = None
+
 class AnclaCreate(BaseModel):
     title: str
     description: str
@@ -141,6 +198,29 @@ class AnclaCreate(BaseModel):
     title_color: str = "#000000"
     emoji: str = ""
 
+class AnclaUpdate(BaseModel):
+    title: Optional[str] = None
+    description: Optional[str] = None
+    type: Optional[AnclaType] = None
+    priority: Optional[Priority] = None
+    category_id: Optional[str] = None
+    repeat_type: Optional[RepeatType] = None
+    all_day: Optional[bool] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    alert_enabled: Optional[bool] = None
+    alert_time: Optional[str] = None
+    title_color: Optional[str] = None
+    emoji: Optional[str] = None
+
+class AnclaBatchUpdateItem(AnclaUpdate):
+    id: str
+
+class AnclaBatchUpdate(BaseModel):
+    anclas: List[AnclaBatchUpdateItem]
+
 class Habit(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -148,6 +228,8 @@ class Habit(BaseModel):
     frequency: int  # times per week
     current_week_count: int = 0
     completion_percentage: float = 0.0
+    week_start: Optional[datetime] = None  # Monday (UTC) of the week current_week_count belongs to
+    history: List[Dict[str, Any]] = []  # one {week_start, count, frequency} slot per past tracked week
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 class HabitCreate(BaseModel):
@@ -287,6 +369,9 @@ class AIRecommendation(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     status: str = "active"  # active, dismissed, completed
 
+class AIRecommendationAction(BaseModel):
+    action: RecommendationStatus
+
 class AIInsights(BaseModel):
     user_id: str
     analysis_period: str
@@ -432,134 +517,903 @@ BUDGET_CATEGORIES = {
     }
 }
 
+# MongoDB indexes
+# Declarative registry of the indexes every collection needs for the queries
+# issued by the routes below. Applied idempotently at startup (see INDEX_MODE).
+INDEX_REGISTRY = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+    ],
+    "anclas": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_id_status"),
+        IndexModel(
+            [("user_id", ASCENDING), ("status", ASCENDING), ("completed_at", DESCENDING)],
+            name="user_id_status_completed_at",
+        ),
+        # Dashboard: next active / latest overdue anclas
+        IndexModel(
+            [("user_id", ASCENDING), ("status", ASCENDING), ("start_date", ASCENDING)],
+            name="user_id_status_start_date",
+        ),
+        IndexModel([("user_id", ASCENDING), ("start_date", ASCENDING)], name="user_id_start_date"),
+        IndexModel(
+            [("user_id", ASCENDING), ("repeat_type", ASCENDING), ("start_date", ASCENDING)],
+            name="user_id_repeat_type_start_date",
+        ),
+        # Reminder scheduler: upcoming one-off alerts by start_date, recurring alerts by repeat_type
+        IndexModel(
+            [("alert_enabled", ASCENDING), ("status", ASCENDING), ("start_date", ASCENDING)],
+            name="alert_enabled_status_start_date",
+        ),
+        IndexModel(
+            [("alert_enabled", ASCENDING), ("status", ASCENDING), ("repeat_type", ASCENDING)],
+            name="alert_enabled_status_repeat_type",
+        ),
+        # Overdue sweeper: active anclas due (end_date, else start_date) inside the sweep window
+        IndexModel(
+            [("status", ASCENDING), ("end_date", ASCENDING), ("start_date", ASCENDING)],
+            name="status_end_date_start_date",
+        ),
+    ],
+    "ancla_occurrences": [
+        IndexModel([("ancla_id", ASCENDING), ("occurrence_date", ASCENDING)], unique=True, name="ancla_id_occurrence_date_unique"),
+        IndexModel([("user_id", ASCENDING), ("occurrence_date", ASCENDING)], name="user_id_occurrence_date"),
+    ],
+    "habits": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "objectives": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "transactions": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+        IndexModel(
+            [("user_id", ASCENDING), ("type", ASCENDING), ("created_at", DESCENDING)],
+            name="user_id_type_created_at",
+        ),
+    ],
+    "diary_entries": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+    ],
+    "budget_limits": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+    ],
+    "savings_goals": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel(
+            [("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="user_id_created_at_id",
+        ),
+    ],
+    "transaction_rollups": [
+        IndexModel(
+            [("user_id", ASCENDING), ("month", ASCENDING), ("type", ASCENDING), ("category", ASCENDING)],
+            unique=True, name="user_id_month_type_category_unique",
+        ),
+    ],
+    "spending_stats": [
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING)], unique=True, name="user_id_category_unique"),
+    ],
+    "spending_anomalies": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    "user_data_versions": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "financial_reports": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+    ],
+    # Notifications are written without an "id" field, so only the per-user feed index applies
+    "notifications": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_id_created_at"),
+        # Scheduled reminders carry a dedupe_key so several workers never deliver the same one twice
+        IndexModel(
+            [("dedupe_key", ASCENDING)], unique=True, name="dedupe_key_unique",
+            partialFilterExpression={"dedupe_key": {"$exists": True}},
+        ),
+    ],
+    "notification_settings": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "ai_insights": [
+        IndexModel([("user_id", ASCENDING)], unique=True, name="user_id_unique"),
+    ],
+    "ai_recommendations": [
+        IndexModel([("id", ASCENDING)], unique=True, name="id_unique"),
+        IndexModel([("user_id", ASCENDING), ("priority", DESCENDING)], name="user_id_priority"),
+    ],
+}
+
+async def ensure_indexes(database, check_only: bool = False) -> Dict[str, List[str]]:
+    """Apply INDEX_REGISTRY to the database and report what was done.
+
+    Indexes are matched on their key pattern, so an index that already exists
+    under a different name is reported as existing instead of being recreated.
+    With check_only=True nothing is written and absent indexes are reported as missing.
+    """
+    report = {"created": [], "existing": [], "missing": [], "failed": []}
+
+    for collection_name, models in INDEX_REGISTRY.items():
+        collection = database[collection_name]
+        existing_keys = {
+            tuple(tuple(k) for k in info["key"])
+            for info in (await collection.index_information()).values()
+        }
+
+        for model in models:
+            spec = model.document
+            label = f"{collection_name}.{spec['name']}"
+            if tuple(spec["key"].items()) in existing_keys:
+                report["existing"].append(label)
+            elif check_only:
+                report["missing"].append(label)
+            else:
+                try:
+                    await collection.create_indexes([model])
+                    report["created"].append(label)
+                except OperationFailure as e:
+                    logger.error(f"Could not create index {label}: {e}")
+                    report["failed"].append(label)
+
+    return report
+
+def log_index_report(report: Dict[str, List[str]]):
+    logger.info(
+        "MongoDB indexes: %d created, %d existing, %d missing, %d failed",
+        len(report["created"]), len(report["existing"]), len(report["missing"]), len(report["failed"])
+    )
+    for label in report["created"]:
+        logger.info(f"Index created: {label}")
+    for label in report["missing"]:
+        logger.warning(f"Index missing: {label}")
+    for label in report["failed"]:
+        logger.error(f"Index failed: {label}")
+
+# Projection used by every read that is returned to clients as-is
+NO_ID = {"_id": 0}
+
+# Keyset pagination over (created_at, id) for list routes. Calls without a limit keep the
+# 1000 rows these routes returned before paging existed; X-Next-Cursor flags anything beyond
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000
+
+def encode_cursor(doc: Dict[str, Any]) -> str:
+    created_at = doc.get("created_at")
+    payload = {"c": created_at.isoformat() if created_at else None, "i": doc["id"]}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(payload["c"]) if payload["c"] else None
+        return created_at, payload["i"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def keyset_filter(created_at: Optional[datetime], last_id: str, ascending: bool) -> Dict[str, Any]:
+    # Documents without created_at sort as null: first when ascending, last when descending
+    op = "$gt" if ascending else "$lt"
+    if created_at is None:
+        after = [{"created_at": None, "id": {op: last_id}}]
+        if ascending:
+            after.append({"created_at": {"$ne": None}})
+    else:
+        after = [{"created_at": {op: created_at}}, {"created_at": created_at, "id": {op: last_id}}]
+        if not ascending:
+            after.append({"created_at": None})
+    return {"$or": after}
+
+async def paginate(collection, query: Dict[str, Any], limit: int, cursor: Optional[str] = None,
+                   ascending: bool = False, projection: Optional[Dict[str, Any]] = None):
+    """Return one page of documents ordered by (created_at, id) and the cursor of the next page, if any."""
+    if cursor:
+        query = {"$and": [query, keyset_filter(*decode_cursor(cursor), ascending)]}
+    direction = ASCENDING if ascending else DESCENDING
+    docs = await collection.find(query, projection).sort(
+        [("created_at", direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+def page_response(items: List[Dict[str, Any]], next_cursor: Optional[str]) -> FastJSONResponse:
+    # List bodies stay plain arrays; the cursor for the following page travels in a header.
+    # Items are queried without _id and returned as-is, skipping FastAPI's jsonable_encoder walk.
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(items, headers=headers)
+
+# Response cache
+# User, settings and the small per-user lists behind every screen are served from
+# response_cache until a write handler invalidates the (user, resource) pair.
+# The in-process default only sees this worker's invalidations: with several workers, the
+# others keep serving their copy for up to RESPONSE_CACHE_TTL seconds after a write.
+# Set RESPONSE_CACHE_REDIS_URL to share entries and invalidations across workers.
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", "10000"))
+
+def build_response_cache() -> ResponseCache:
+    redis_url = os.environ.get("RESPONSE_CACHE_REDIS_URL")
+    if redis_url:
+        # Optional dependency: only needed when several workers must share entries and invalidations
+        import redis.asyncio as redis
+        return ResponseCache(redis.from_url(redis_url), ttl=RESPONSE_CACHE_TTL)
+    return ResponseCache(TTLLRUCache(RESPONSE_CACHE_SIZE), ttl=RESPONSE_CACHE_TTL)
+
+response_cache = build_response_cache()
+
+async def cached_json(resource: str, user_id: str, load, params: str = "") -> Response:
+    generation, body = await response_cache.get(user_id, resource, params)
+    if body is None:
+        body = dumps(await load())
+        await response_cache.set(user_id, resource, generation, body, params)
+    return Response(body, media_type="application/json")
+
+async def cached_page(resource: str, user_id: str, limit: int, cursor: Optional[str], load) -> Response:
+    # Entries hold "<next cursor>\n<body>" so a hit needs no decoding
+    params = f"{limit}:{cursor or ''}"
+    generation, cached = await response_cache.get(user_id, resource, params)
+    if cached is None:
+        items, next_cursor = await load()
+        response = page_response(items, next_cursor)
+        await response_cache.set(user_id, resource, generation, (next_cursor or "").encode() + b"\n" + response.body, params)
+        return response
+    next_cursor, _, body = cached.partition(b"\n")
+    headers = {"X-Next-Cursor": next_cursor.decode()} if next_cursor else None
+    return Response(body, media_type="application/json", headers=headers)
+
+# Conditional GETs
+# Every write route bumps the user's data version; dashboard and analytics responses carry an
+# ETag derived from it, so a client revalidating unchanged data gets a bodyless 304.
+async def bump_data_version(user_id: str):
+    await db.user_data_versions.update_one({"user_id": user_id}, {"$inc": {"version": 1}}, upsert=True)
+
+async def bump_data_versions(database, user_ids: Optional[List[str]] = None):
+    """Bump the data version of `user_ids`, or of every user, after a maintenance rebuild"""
+    async def bump(batch):
+        await database.user_data_versions.bulk_write(
+            [UpdateOne({"user_id": user_id}, {"$inc": {"version": 1}}, upsert=True) for user_id in batch],
+            ordered=False
+        )
+
+    if user_ids is not None:
+        for i in range(0, len(user_ids), BULK_INSERT_BATCH_SIZE):
+            await bump(user_ids[i:i + BULK_INSERT_BATCH_SIZE])
+        return
+    batch = []
+    async for user in database.users.find({}, {"_id": 0, "id": 1}):
+        batch.append(user["id"])
+        if len(batch) >= BULK_INSERT_BATCH_SIZE:
+            await bump(batch)
+            batch = []
+    if batch:
+        await bump(batch)
+
+async def get_data_version(user_id: str) -> int:
+    doc = await db.user_data_versions.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    return doc["version"] if doc else 0
+
+async def get_user_data_version(user_id: str) -> int:
+    """Data version for a conditional GET; unknown users get a 404 rather than a 304"""
+    user, version = await asyncio.gather(db.users.find_one({"id": user_id}, {"_id": 0, "id": 1}), get_data_version(user_id))
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+    return version
+
+def make_etag(user_id: str, version: int, *parts) -> str:
+    digest = hashlib.blake2b(":".join([user_id, *map(str, parts)]).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # Weak comparison (RFC 9110): W/ prefixes are ignored
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
+
+# Browsers may keep the body but must revalidate it on every use
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+@api_router.get("/_cache/stats")
+async def get_response_cache_stats():
+    return response_cache.stats()
+
+@api_router.get("/_metrics")
+async def get_metrics():
+    """Per-route latency and MongoDB usage in the Prometheus text format"""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Routes
 @api_router.get("/")
 async def root():
     return {"message": "Anclora API - Navegando hacia el éxito"}
 
 # User routes
-@api_router.post("/users", response_model=User)
-async def create_user(user: UserCreate):
-    user_dict = user.dict()
-    user_obj = User(**user_dict)
-    await db.users.insert_one(user_obj.dict())
-    
-    # Create predefined categories
-    categories = PREDEFINED_CATEGORIES.get(user.profile, [])
-    for cat_data in categories:
-        category = Category(
+# Largest batch accepted by /users/bulk and the chunk size used for its insert_many calls
+MAX_BULK_USERS = 5000
+BULK_INSERT_BATCH_SIZE = 1000
+
+def build_user_documents(user: UserCreate):
+    """Build the user document plus the predefined categories, habits and objectives for its profile"""
+    user_obj = User(**user.dict())
+    categories = [
+        Category(
             name=cat_data["name"],
             color=cat_data["color"],
             icon=cat_data["icon"],
             profile=user.profile,
             user_id=user_obj.id
-        )
-        await db.categories.insert_one(category.dict())
-    
-    # Create predefined habits
-    habits = PREDEFINED_HABITS.get(user.profile, [])
-    for habit_data in habits:
-        habit = Habit(
+        ).dict()
+        for cat_data in PREDEFINED_CATEGORIES.get(user.profile, [])
+    ]
+    habits = [
+        Habit(
             name=habit_data["name"],
             frequency=habit_data["frequency"],
             user_id=user_obj.id
-        )
-        await db.habits.insert_one(habit.dict())
-    
-    # Create predefined objectives
-    objectives = PREDEFINED_OBJECTIVES.get(user.profile, [])
-    for obj_data in objectives:
-        objective = Objective(
+        ).dict()
+        for habit_data in PREDEFINED_HABITS.get(user.profile, [])
+    ]
+    objectives = [
+        Objective(
             title=obj_data["title"],
             description=obj_data["description"],
             subtasks=obj_data["subtasks"],
             user_id=user_obj.id
-        )
-        await db.objectives.insert_one(objective.dict())
-    
+        ).dict()
+        for obj_data in PREDEFINED_OBJECTIVES.get(user.profile, [])
+    ]
+    return user_obj, categories, habits, objectives
+
+async def insert_in_batches(collection, documents: List[Dict[str, Any]]) -> Dict[int, str]:
+    """Unordered batched inserts; returns the error message of every document not written, by position"""
+    failed = {}
+    for i in range(0, len(documents), BULK_INSERT_BATCH_SIZE):
+        try:
+            await collection.insert_many(documents[i:i + BULK_INSERT_BATCH_SIZE], ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed[i + error["index"]] = error.get("errmsg", "")
+    return failed
+
+@api_router.post("/users", response_model=User)
+async def create_user(user: UserCreate):
+    user_obj, categories, habits, objectives = build_user_documents(user)
+
+    # The user goes first so a failed insert leaves no orphaned children; those are then written concurrently
+    await db.users.insert_one(user_obj.dict())
+    writes = []
+    if categories:
+        writes.append(db.categories.insert_many(categories))
+    if habits:
+        writes.append(db.habits.insert_many(habits))
+    if objectives:
+        writes.append(db.objectives.insert_many(objectives))
+    await asyncio.gather(*writes)
+
     return user_obj
 
+class BulkUserCreate(BaseModel):
+    users: List[UserCreate]
+
+@api_router.post("/users/bulk")
+async def create_users_bulk(payload: BulkUserCreate):
+    """Provision many users (team or classroom imports) with batched writes"""
+    if not payload.users:
+        raise HTTPException(status_code=400, detail="No hay usuarios para crear")
+    if len(payload.users) > MAX_BULK_USERS:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BULK_USERS} usuarios por petición")
+    # Emails are not unique in the collection (older data repeats them), so a batch may not add repeats
+    seen, duplicates = set(), set()
+    for user in payload.users:
+        email = user.email.strip().lower()
+        (duplicates if email in seen else seen).add(email)
+    if duplicates:
+        raise HTTPException(status_code=422, detail=f"Emails repetidos en la petición: {', '.join(sorted(duplicates))}")
+
+    users, children = [], {"categories": [], "habits": [], "objectives": []}
+    for user in payload.users:
+        user_obj, user_categories, user_habits, user_objectives = build_user_documents(user)
+        users.append(user_obj.dict())
+        children["categories"].extend(user_categories)
+        children["habits"].extend(user_habits)
+        children["objectives"].extend(user_objectives)
+
+    # Users first: children are only written for users that made it in
+    failed_users = await insert_in_batches(db.users, users)
+    failed = [
+        {"index": index, "email": users[index]["email"], "error": error}
+        for index, error in sorted(failed_users.items())
+    ]
+    user_ids = [u["id"] for index, u in enumerate(users) if index not in failed_users]
+    created_ids = set(user_ids)
+    children = {
+        name: [doc for doc in documents if doc["user_id"] in created_ids]
+        for name, documents in children.items()
+    }
+    child_failures = await asyncio.gather(*(insert_in_batches(db[name], docs) for name, docs in children.items()))
+
+    # Users whose predefined categories, habits or objectives were only partly written
+    incomplete = [
+        {"user_id": children[name][index]["user_id"], "collection": name, "error": error}
+        for name, failures in zip(children, child_failures)
+        for index, error in sorted(failures.items())
+    ]
+    return {
+        "created": len(user_ids),
+        "user_ids": user_ids,
+        "failed": failed,
+        "incomplete": incomplete
+    }
+
+# Gamification
+# Streaks count consecutive UTC days with at least one completion; the rank follows total completions.
+RANKS = [(0, "grumete"), (10, "marinero"), (50, "contramaestre"), (150, "capitan")]
+DAY_MS = 24 * 60 * 60 * 1000
+# Written by record_completion and rebuild_user_stats
+USER_STAT_FIELDS = ("total_completed", "current_streak", "best_streak", "last_completion_day", "rank")
+
+def completion_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def rank_expression(total) -> Dict[str, Any]:
+    return {"$switch": {
+        "branches": [{"case": {"$gte": [total, threshold]}, "then": name} for threshold, name in reversed(RANKS[1:])],
+        "default": RANKS[0][1]
+    }}
+
+def user_view(user: Dict[str, Any], today: datetime) -> Dict[str, Any]:
+    """User document as served; a streak whose last completion is before yesterday reads as broken"""
+    data = User(**user).dict()
+    last_day = data["last_completion_day"]
+    if last_day is None or last_day < today - timedelta(days=1):
+        data["current_streak"] = 0
+    return data
+
+def streak_update(day: datetime) -> List[Dict[str, Any]]:
+    """Pipeline update applying one completion on `day` to a user's totals, streaks and rank"""
+    current = {"$ifNull": ["$current_streak", 0]}
+    return [
+        # Fields read inside a stage still hold their values from before the update
+        {"$set": {
+            "total_completed": {"$add": [{"$ifNull": ["$total_completed", 0]}, 1]},
+            "current_streak": {"$switch": {
+                "branches": [
+                    {"case": {"$eq": ["$last_completion_day", day]}, "then": {"$max": [current, 1]}},
+                    {"case": {"$eq": ["$last_completion_day", day - timedelta(days=1)]}, "then": {"$add": [current, 1]}},
+                ],
+                "default": 1
+            }},
+            "last_completion_day": day
+        }},
+        {"$set": {
+            "best_streak": {"$max": [{"$ifNull": ["$best_streak", 0]}, "$current_streak"]},
+            "rank": rank_expression("$total_completed")
+        }}
+    ]
+
+async def record_completion(user_id: str, completed_at: datetime):
+    await db.users.update_one({"id": user_id}, streak_update(completion_day(completed_at)))
+    await response_cache.invalidate(user_id, "user")
+
+async def rebuild_user_stats(database) -> int:
+    """Recompute every user's totals, streaks and rank from completed anclas and occurrences.
+
+    One aggregation groups the completion history per user and day and folds each user's
+    sorted days into streaks into the user_stats_rebuild staging collection. The staged stats
+    are merged into users and only users without any completion are reset afterwards, so
+    readers never see every user at zero mid-rebuild. Run it with completions quiesced: one
+    recorded during the rebuild is overwritten by the staged state. Users whose stats change get
+    a new data version and lose their cached user. Returns how many users have at least one completion.
+    """
+    completion_fields = {"_id": 0, "user_id": 1, "completed_at": 1}
+    pipeline = [
+        {"$match": {"status": AnclaStatus.COMPLETED.value, "completed_at": {"$ne": None}}},
+        {"$project": completion_fields},
+        {"$unionWith": {"coll": "ancla_occurrences", "pipeline": [
+            {"$match": {"completed_at": {"$ne": None}}},
+            {"$project": completion_fields}
+        ]}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "day": {"$dateFromParts": {
+                "year": {"$year": "$completed_at"},
+                "month": {"$month": "$completed_at"},
+                "day": {"$dayOfMonth": "$completed_at"}
+            }}},
+            "completions": {"$sum": 1}
+        }},
+        {"$sort": {"_id.user_id": 1, "_id.day": 1}},
+        {"$group": {"_id": "$_id.user_id", "total_completed": {"$sum": "$completions"}, "days": {"$push": "$_id.day"}}},
+        {"$set": {"streaks": {"$reduce": {
+            "input": "$days",
+            "initialValue": {"last": None, "current": 0, "best": 0},
+            "in": {"$let": {
+                "vars": {"current": {"$cond": [
+                    {"$eq": [{"$subtract": ["$$this", "$$value.last"]}, DAY_MS]}, {"$add": ["$$value.current", 1]}, 1
+                ]}},
+                "in": {"last": "$$this", "current": "$$current", "best": {"$max": ["$$value.best", "$$current"]}}
+            }}
+        }}}},
+        {"$project": {
+            "_id": 0, "id": "$_id", "total_completed": 1,
+            "current_streak": "$streaks.current", "best_streak": "$streaks.best",
+            "last_completion_day": "$streaks.last", "rank": rank_expression("$total_completed")
+        }},
+        {"$out": "user_stats_rebuild"}
+    ]
+    # $out keeps the target's indexes, and the id index serves the $lookup below
+    await database.user_stats_rebuild.create_index("id", unique=True)
+    await database.anclas.aggregate(pipeline).to_list(None)
+
+    # Only users whose stats move get a new data version, so other dashboards keep their ETags
+    changed = [doc["id"] async for doc in database.user_stats_rebuild.aggregate([
+        {"$lookup": {"from": "users", "localField": "id", "foreignField": "id", "as": "user"}},
+        {"$unwind": "$user"},
+        {"$match": {"$expr": {"$or": [{"$ne": [f"${field}", f"$user.{field}"]} for field in USER_STAT_FIELDS]}}},
+        {"$project": {"_id": 0, "id": 1}}
+    ])]
+    await database.user_stats_rebuild.aggregate([
+        {"$project": {"_id": 0}},
+        {"$merge": {"into": "users", "on": "id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+    ]).to_list(None)
+
+    # Users with no completion left keep stale stats unless reset explicitly; this includes
+    # counters from before last_completion_day was tracked
+    stale = [doc["id"] async for doc in database.users.aggregate([
+        {"$match": {"$or": [
+            {"total_completed": {"$gt": 0}}, {"current_streak": {"$gt": 0}}, {"best_streak": {"$gt": 0}},
+            {"last_completion_day": {"$ne": None}}, {"rank": {"$ne": RANKS[0][1]}}
+        ]}},
+        {"$lookup": {"from": "user_stats_rebuild", "localField": "id", "foreignField": "id", "as": "rebuilt"}},
+        {"$match": {"rebuilt": []}},
+        {"$project": {"_id": 0, "id": 1}}
+    ])]
+    reset = {"total_completed": 0, "current_streak": 0, "best_streak": 0, "rank": RANKS[0][1], "last_completion_day": None}
+    for i in range(0, len(stale), BULK_INSERT_BATCH_SIZE):
+        await database.users.update_many({"id": {"$in": stale[i:i + BULK_INSERT_BATCH_SIZE]}}, {"$set": reset})
+    await database.user_stats_rebuild.drop()
+
+    await bump_data_versions(database, changed + stale)
+    # Run from the CLI this only reaches the API's cached users through a shared (redis) cache
+    for user_id in changed + stale:
+        await response_cache.invalidate(user_id, "user")
+    return await database.users.count_documents({"last_completion_day": {"$ne": None}})
+
 @api_router.get("/users/{user_id}", response_model=User)
 async def get_user(user_id: str):
-    user = await db.users.find_one({"id": user_id})
-    if not user:
-        raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    return User(**user)
+    today = completion_day(datetime.utcnow())
+    async def load():
+        user = await db.users.find_one({"id": user_id})
+        if not user:
+            raise HTTPException(status_code=404, detail="Usuario no encontrado")
+        return user_view(user, today)
+    return await cached_json("user", user_id, load, params=today.date().isoformat())
+
+# Fields the Puente de Mando renders; everything else stays in MongoDB
+DASHBOARD_PROJECTIONS = {
+    "anclas": {
+        "_id": 0, "id": 1, "title": 1, "description": 1, "type": 1, "priority": 1,
+        "category_id": 1, "status": 1, "repeat_type": 1, "all_day": 1,
+        "start_date": 1, "end_date": 1, "start_time": 1, "end_time": 1,
+        "alert_enabled": 1, "alert_time": 1, "title_color": 1, "emoji": 1, "completed_at": 1
+    },
+    "habits": {
+        "_id": 0, "id": 1, "name": 1, "frequency": 1, "current_week_count": 1,
+        "completion_percentage": 1, "week_start": 1
+    },
+    "objectives": {"_id": 0, "id": 1, "title": 1, "description": 1, "completion_percentage": 1, "subtasks": 1},
+    "transactions": {"_id": 0, "id": 1, "type": 1, "category": 1, "description": 1, "amount": 1, "date": 1, "created_at": 1},
+    "diary_entries": {"_id": 0, "id": 1, "content": 1, "mood": 1, "date": 1, "created_at": 1},
+}
+
+# The dashboard is a summary: ancla lists are capped and the totals come from the per-status
+# counts; the timeline reads whole weeks from GET /anclas and the list routes page with cursors
+DASHBOARD_LIST_LIMIT = 50
+DASHBOARD_COMPLETED_LIMIT = 20
+
+async def count_anclas_by_status(user_id: str) -> Dict[str, int]:
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ]
+    counts = {status.value: 0 for status in AnclaStatus}
+    async for row in db.anclas.aggregate(pipeline):
+        counts[row["_id"]] = row["count"]
+    return counts
 
 @api_router.get("/users/{user_id}/dashboard")
-async def get_dashboard(user_id: str):
-    user = await db.users.find_one({"id": user_id})
+async def get_dashboard(user_id: str, request: Request):
+    today = completion_day(datetime.utcnow())
+    # The user is read with the version so an unknown user gets a 404 even with a matching ETag
+    user, version = await asyncio.gather(db.users.find_one({"id": user_id}, NO_ID), get_data_version(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="Usuario no encontrado")
-    
-    # Get anclas
-    anclas = await db.anclas.find({"user_id": user_id}).to_list(1000)
-    active_anclas = [a for a in anclas if a["status"] == "active"]
-    completed_anclas = [a for a in anclas if a["status"] == "completed"]
-    overdue_anclas = [a for a in anclas if a["status"] == "overdue"]
-    
-    # Get habits
-    habits = await db.habits.find({"user_id": user_id}).to_list(1000)
-    
-    # Get objectives
-    objectives = await db.objectives.find({"user_id": user_id}).to_list(1000)
-    
-    # Get recent transactions
-    transactions = await db.transactions.find({"user_id": user_id}).sort("created_at", -1).limit(10).to_list(10)
-    
-    # Get recent diary entries
-    diary_entries = await db.diary_entries.find({"user_id": user_id}).sort("created_at", -1).limit(5).to_list(5)
-    
-    # Convert ObjectId to string in all documents
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    # Convert all ObjectId to string
-    user = convert_objectid(user)
-    active_anclas = convert_objectid(active_anclas)
-    completed_anclas = convert_objectid(completed_anclas)
-    overdue_anclas = convert_objectid(overdue_anclas)
-    habits = convert_objectid(habits)
-    objectives = convert_objectid(objectives)
-    transactions = convert_objectid(transactions)
-    diary_entries = convert_objectid(diary_entries)
-    
-    return {
-        "user": User(**user),
+    etag = make_etag(user_id, version, "dashboard", today.date().isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    projections = DASHBOARD_PROJECTIONS
+
+    # All reads are independent, so they run concurrently in a single round trip of latency
+    (
+        active_anclas, overdue_anclas, completed_anclas, ancla_counts,
+        habits, objectives, transactions, diary_entries
+    ) = await asyncio.gather(
+        # Next active anclas first, the most recently missed overdue ones, the latest completed
+        db.anclas.find({"user_id": user_id, "status": "active"}, projections["anclas"])
+            .sort("start_date", 1).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        db.anclas.find({"user_id": user_id, "status": "overdue"}, projections["anclas"])
+            .sort("start_date", -1).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        db.anclas.find({"user_id": user_id, "status": "completed"}, projections["anclas"])
+            .sort("completed_at", -1).limit(DASHBOARD_COMPLETED_LIMIT).to_list(DASHBOARD_COMPLETED_LIMIT),
+        count_anclas_by_status(user_id),
+        db.habits.find({"user_id": user_id}, projections["habits"])
+            .sort("created_at", 1).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        db.objectives.find({"user_id": user_id}, projections["objectives"])
+            .sort("created_at", 1).limit(DASHBOARD_LIST_LIMIT).to_list(DASHBOARD_LIST_LIMIT),
+        db.transactions.find({"user_id": user_id}, projections["transactions"]).sort("created_at", -1).limit(10).to_list(10),
+        db.diary_entries.find({"user_id": user_id}, projections["diary_entries"]).sort("created_at", -1).limit(5).to_list(5),
+    )
+
+    return FastJSONResponse({
+        "user": user_view(user, today),
         "anclas": {
             "active": active_anclas,
             "completed": completed_anclas,
             "overdue": overdue_anclas,
-            "total": len(anclas)
+            "counts": ancla_counts,
+            "total": sum(ancla_counts.values())
         },
-        "habits": habits,
+        "habits": [habit_view(habit, habit_week_start(today)) for habit in habits],
         "objectives": objectives,
         "transactions": transactions,
         "diary_entries": diary_entries,
         "budget_categories": BUDGET_CATEGORIES.get(user["profile"], {})
-    }
+    }, headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
 
 # Ancla routes
 @api_router.post("/anclas", response_model=Ancla)
 async def create_ancla(ancla: AnclaCreate, user_id: str):
     ancla_dict = ancla.dict()
     ancla_dict["user_id"] = user_id
+    ancla_dict["status"] = ancla_due_status(ancla_dict, datetime.utcnow())
     ancla_obj = Ancla(**ancla_dict)
     await db.anclas.insert_one(ancla_obj.dict())
+    await asyncio.gather(reminder_scheduler.schedule_ancla(ancla_obj.dict()), bump_data_version(user_id))
     return ancla_obj
 
+# Timeline (Marea de Tiempo) window queries
+MAX_TIMELINE_DAYS = 366
+
+# Fields a timeline card needs
+TIMELINE_ANCLA_FIELDS = {
+    "id": "$id", "title": "$title", "type": "$type", "priority": "$priority", "status": "$status",
+    "category_id": "$category_id", "start_date": "$start_date", "end_date": "$end_date",
+    "start_time": "$start_time", "end_time": "$end_time", "all_day": "$all_day",
+    "repeat_type": "$repeat_type", "emoji": "$emoji", "title_color": "$title_color"
+}
+
+# Recurrence engine
+# Recurring anclas are stored once and expanded lazily for the requested window.
+RECURRING_TYPES = [RepeatType.DAILY.value, RepeatType.WEEKLY.value, RepeatType.MONTHLY.value]
+RECURRENCE_CACHE_SIZE = 4096
+
+def to_naive_utc(moment: datetime) -> datetime:
+    # MongoDB hands back naive UTC datetimes; normalise client input to match
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+def add_months(moment: datetime, months: int) -> datetime:
+    # Clamp to the last day of shorter months (Jan 31 -> Feb 28) without drifting later occurrences
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    day = min(moment.day, calendar.monthrange(year, month)[1])
+    return moment.replace(year=year, month=month, day=day)
+
+def iter_occurrences(start: datetime, repeat_type: str, window_start: datetime, window_end: datetime):
+    """Yield the occurrence starts of a series beginning at `start` that fall in [window_start, window_end)"""
+    if repeat_type in (RepeatType.DAILY, RepeatType.WEEKLY):
+        step = timedelta(days=1 if repeat_type == RepeatType.DAILY else 7)
+        # Jump straight to the first occurrence inside the window
+        skipped = max(0, -(-(window_start - start) // step))
+        occurrence = start + step * skipped
+        while occurrence < window_end:
+            yield occurrence
+            occurrence += step
+    elif repeat_type == RepeatType.MONTHLY:
+        months = max(0, (window_start.year - start.year) * 12 + window_start.month - start.month - 1)
+        while True:
+            occurrence = add_months(start, months)
+            if occurrence >= window_end:
+                break
+            if occurrence >= window_start:
+                yield occurrence
+            months += 1
+    elif window_start <= start < window_end:
+        yield start
+
+@lru_cache(maxsize=RECURRENCE_CACHE_SIZE)
+def occurrence_starts(ancla_id: str, start: datetime, repeat_type: str,
+                      window_start: datetime, window_end: datetime) -> tuple:
+    # start and repeat_type are part of the key so edited anclas never hit a stale entry
+    return tuple(iter_occurrences(start, repeat_type, window_start, window_end))
+
+def expand_ancla(ancla: Dict[str, Any], window_start: datetime, window_end: datetime,
+                 overrides: Dict[tuple, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    duration = ancla["end_date"] - ancla["start_date"] if ancla.get("end_date") else None
+    occurrences = []
+    for occurrence in occurrence_starts(ancla["id"], ancla["start_date"], ancla.get("repeat_type"), window_start, window_end):
+        item = dict(ancla)
+        item["start_date"] = occurrence
+        item["end_date"] = occurrence + duration if duration is not None else None
+        item["occurrence_date"] = occurrence
+        override = overrides.get((ancla["id"], occurrence))
+        if override:
+            item["status"] = override["status"]
+        occurrences.append(item)
+    return occurrences
+
+async def get_recurring_occurrences(user_id: str, window_start: datetime, window_end: datetime) -> List[Dict[str, Any]]:
+    """Occurrences of the user's recurring anclas in [window_start, window_end) with their overrides applied"""
+    projection = {field: 1 for field in TIMELINE_ANCLA_FIELDS}
+    projection["_id"] = 0
+    recurring, overrides = await asyncio.gather(
+        db.anclas.find(
+            {"user_id": user_id, "repeat_type": {"$in": RECURRING_TYPES}, "start_date": {"$lt": window_end}},
+            projection
+        ).to_list(None),
+        db.ancla_occurrences.find(
+            {"user_id": user_id, "occurrence_date": {"$gte": window_start, "$lt": window_end}},
+            {"_id": 0, "ancla_id": 1, "occurrence_date": 1, "status": 1}
+        ).to_list(None)
+    )
+    overrides_by_key = {(o["ancla_id"], o["occurrence_date"]): o for o in overrides}
+
+    occurrences = []
+    for ancla in recurring:
+        occurrences.extend(expand_ancla(ancla, window_start, window_end, overrides_by_key))
+    return occurrences
+
+def parse_occurrence_date(occurrence_date: datetime) -> datetime:
+    # Stored dates carry millisecond precision
+    occurrence_date = to_naive_utc(occurrence_date)
+    return occurrence_date.replace(microsecond=occurrence_date.microsecond // 1000 * 1000)
+
+async def find_recurring_ancla(ancla_id: str, occurrence_date: datetime) -> Dict[str, Any]:
+    ancla = await db.anclas.find_one({"id": ancla_id}, {"_id": 0, "id": 1, "user_id": 1, "start_date": 1, "repeat_type": 1})
+    if not ancla:
+        raise HTTPException(status_code=404, detail="Ancla no encontrada")
+    if ancla.get("repeat_type") not in RECURRING_TYPES:
+        raise HTTPException(status_code=400, detail="El ancla no es recurrente")
+    if not occurrence_starts(ancla_id, ancla["start_date"], ancla["repeat_type"],
+                             occurrence_date, occurrence_date + timedelta(milliseconds=1)):
+        raise HTTPException(status_code=400, detail="Fecha de ocurrencia inválida")
+    return ancla
+
+@api_router.post("/anclas/{ancla_id}/occurrences/complete")
+async def complete_ancla_occurrence(ancla_id: str, occurrence_date: datetime):
+    """Mark a single occurrence of a recurring ancla as completed"""
+    occurrence_date = parse_occurrence_date(occurrence_date)
+    ancla = await find_recurring_ancla(ancla_id, occurrence_date)
+
+    occurrence = AnclaOccurrence(
+        ancla_id=ancla_id,
+        user_id=ancla["user_id"],
+        occurrence_date=occurrence_date,
+        completed_at=datetime.utcnow()
+    )
+    result = await db.ancla_occurrences.update_one(
+        {"ancla_id": ancla_id, "occurrence_date": occurrence_date},
+        {"$setOnInsert": occurrence.dict()},
+        upsert=True
+    )
+    pending = [bump_data_version(ancla["user_id"])]
+    if result.upserted_id is not None:
+        pending.append(record_completion(ancla["user_id"], occurrence.completed_at))
+    await asyncio.gather(*pending)
+    reminder_scheduler.cancel_occurrence(ancla_id, occurrence_date)
+    return {"message": "Ocurrencia completada exitosamente"}
+
+@api_router.delete("/anclas/{ancla_id}/occurrences")
+async def reset_ancla_occurrence(ancla_id: str, occurrence_date: datetime):
+    """Drop the override of an occurrence so it follows its recurring ancla again"""
+    occurrence_date = parse_occurrence_date(occurrence_date)
+    ancla = await find_recurring_ancla(ancla_id, occurrence_date)
+    await db.ancla_occurrences.delete_one({"ancla_id": ancla_id, "occurrence_date": occurrence_date})
+    # Re-arm the alert the completion cancelled
+    current = await db.anclas.find_one({"id": ancla_id}, ReminderScheduler.ANCLA_FIELDS | {"status": 1, "alert_enabled": 1})
+    pending = [bump_data_version(ancla["user_id"])]
+    if current:
+        pending.append(reminder_scheduler.schedule_ancla(current))
+    await asyncio.gather(*pending)
+    return {"message": "Ocurrencia restablecida exitosamente"}
+
+@api_router.get("/anclas")
+async def get_anclas_in_range(
+    user_id: str,
+    from_date: datetime = Query(..., alias="from"),
+    to_date: datetime = Query(..., alias="to"),
+    tz: str = "UTC"
+):
+    """Anclas with start_date in [from, to), bucketed per calendar day in the given time zone.
+
+    One-off anclas are grouped in MongoDB; recurring anclas are expanded into their
+    occurrences inside the window and merged into the same day buckets.
+    """
+    from_date, to_date = to_naive_utc(from_date), to_naive_utc(to_date)
+    if to_date <= from_date:
+        raise HTTPException(status_code=400, detail="'to' debe ser posterior a 'from'")
+    if to_date - from_date > timedelta(days=MAX_TIMELINE_DAYS):
+        raise HTTPException(status_code=400, detail=f"La ventana máxima es de {MAX_TIMELINE_DAYS} días")
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Zona horaria desconocida: {tz}")
+
+    day_of = {"format": "%Y-%m-%d", "date": "$start_date"}
+    if tz != "UTC":
+        day_of["timezone"] = tz
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "repeat_type": {"$nin": RECURRING_TYPES},
+            "start_date": {"$gte": from_date, "$lt": to_date}
+        }},
+        {"$sort": {"start_date": 1}},
+        {"$group": {
+            "_id": {"$dateToString": day_of},
+            "anclas": {"$push": TIMELINE_ANCLA_FIELDS}
+        }},
+        {"$sort": {"_id": 1}}
+    ]
+    buckets, occurrences = await asyncio.gather(
+        db.anclas.aggregate(pipeline).to_list(None),
+        get_recurring_occurrences(user_id, from_date, to_date)
+    )
+    days = {bucket["_id"]: bucket["anclas"] for bucket in buckets}
+    for occurrence in occurrences:
+        day = occurrence["start_date"].replace(tzinfo=timezone.utc).astimezone(zone).date().isoformat()
+        days.setdefault(day, []).append(occurrence)
+    if occurrences:
+        for anclas in days.values():
+            anclas.sort(key=lambda a: a["start_date"])
+
+    return FastJSONResponse({
+        "from": from_date,
+        "to": to_date,
+        "tz": tz,
+        "total": sum(len(anclas) for anclas in days.values()),
+        "days": [{"date": day, "anclas": days[day]} for day in sorted(days)]
+    })
+
 @api_router.get("/anclas/{ancla_id}", response_model=Ancla)
 async def get_ancla(ancla_id: str):
     ancla = await db.anclas.find_one({"id": ancla_id})
@@ -570,62 +1424,124 @@ async def get_ancla(ancla_id: str):
 @api_router.put("/anclas/{ancla_id}", response_model=Ancla)
 async def update_ancla(ancla_id: str, ancla: AnclaCreate):
     ancla_dict = ancla.dict()
-    result = await db.anclas.update_one({"id": ancla_id}, {"$set": ancla_dict})
-    if result.matched_count == 0:
+    updated_ancla = await db.anclas.find_one_and_update(
+        {"id": ancla_id}, rescheduling_update(ancla_dict, datetime.utcnow()),
+        projection=NO_ID, return_document=ReturnDocument.AFTER
+    )
+    if not updated_ancla:
         raise HTTPException(status_code=404, detail="Ancla no encontrada")
     
-    updated_ancla = await db.anclas.find_one({"id": ancla_id})
+    await asyncio.gather(reminder_scheduler.schedule_ancla(updated_ancla), bump_data_version(updated_ancla["user_id"]))
     return Ancla(**updated_ancla)
 
-@api_router.post("/anclas/{ancla_id}/complete")
-async def complete_ancla(ancla_id: str):
-    result = await db.anclas.update_one(
-        {"id": ancla_id}, 
-        {"$set": {"status": "completed", "completed_at": datetime.utcnow()}}
+# Partial updates (timeline drag-and-drop sends only the fields that moved)
+MAX_BATCH_ANCLA_UPDATES = 500
+REQUIRED_ANCLA_FIELDS = {
+    "title", "description", "type", "priority", "category_id", "repeat_type",
+    "all_day", "start_date", "alert_enabled", "title_color", "emoji"
+}
+# Changing any of these can move, drop or reword a pending reminder; end_date and all_day are here
+# because they can move an ancla between overdue and active, and only active anclas get reminders
+REMINDER_FIELDS = {"title", "start_date", "end_date", "all_day", "repeat_type", "alert_enabled", "alert_time"}
+
+def ancla_changes(update: AnclaUpdate) -> Dict[str, Any]:
+    """Fields explicitly sent by the client, rejecting nulls for fields an ancla must have"""
+    changes = update.dict(exclude_unset=True, exclude={"id"})
+    if not changes:
+        raise HTTPException(status_code=400, detail="No hay campos para actualizar")
+    nulls = sorted(field for field, value in changes.items() if value is None and field in REQUIRED_ANCLA_FIELDS)
+    if nulls:
+        raise HTTPException(status_code=400, detail=f"Campos obligatorios sin valor: {', '.join(nulls)}")
+    return changes
+
+@api_router.patch("/anclas/{ancla_id}", response_model=Ancla)
+async def patch_ancla(ancla_id: str, update: AnclaUpdate):
+    changes = ancla_changes(update)
+    updated_ancla = await db.anclas.find_one_and_update(
+        {"id": ancla_id}, rescheduling_update(changes, datetime.utcnow()),
+        projection=NO_ID, return_document=ReturnDocument.AFTER
     )
-    if result.matched_count == 0:
+    if not updated_ancla:
         raise HTTPException(status_code=404, detail="Ancla no encontrada")
     
-    # Update user stats
-    ancla = await db.anclas.find_one({"id": ancla_id})
-    if ancla:
-        await db.users.update_one(
-            {"id": ancla["user_id"]},
-            {"$inc": {"total_completed": 1, "current_streak": 1}}
-        )
+    pending = [bump_data_version(updated_ancla["user_id"])]
+    if REMINDER_FIELDS & changes.keys():
+        pending.append(reminder_scheduler.schedule_ancla(updated_ancla))
+    await asyncio.gather(*pending)
+    return Ancla(**updated_ancla)
+
+@api_router.patch("/anclas")
+async def patch_anclas(payload: AnclaBatchUpdate, user_id: str):
+    """Apply several partial updates (multi-select drags) in one bulk write"""
+    if len(payload.anclas) > MAX_BATCH_ANCLA_UPDATES:
+        raise HTTPException(status_code=400, detail=f"Máximo {MAX_BATCH_ANCLA_UPDATES} anclas por petición")
+    # Keyed by id, so a repeated id would silently keep only its last update
+    seen, duplicates = set(), set()
+    for item in payload.anclas:
+        (duplicates if item.id in seen else seen).add(item.id)
+    if duplicates:
+        raise HTTPException(status_code=422, detail=f"Anclas repetidas en la petición: {', '.join(sorted(duplicates))}")
+    changes = {item.id: ancla_changes(item) for item in payload.anclas}
+    if not changes:
+        raise HTTPException(status_code=400, detail="No hay campos para actualizar")
+    
+    now = datetime.utcnow()
+    result = await db.anclas.bulk_write(
+        [UpdateOne({"id": ancla_id, "user_id": user_id}, rescheduling_update(fields, now))
+         for ancla_id, fields in changes.items()],
+        ordered=False
+    )
+    
+    pending = [bump_data_version(user_id)]
+    rescheduled = [ancla_id for ancla_id, fields in changes.items() if REMINDER_FIELDS & fields.keys()]
+    if rescheduled:
+        async def reschedule():
+            anclas = await db.anclas.find(
+                {"id": {"$in": rescheduled}, "user_id": user_id},
+                {"_id": 0, "id": 1, "user_id": 1, "title": 1, "status": 1, "start_date": 1,
+                 "repeat_type": 1, "alert_enabled": 1, "alert_time": 1}
+            ).to_list(None)
+            await reminder_scheduler.schedule_anclas(anclas)
+        pending.append(reschedule())
+    await asyncio.gather(*pending)
+    return {"matched": result.matched_count, "modified": result.modified_count}
+
+@api_router.post("/anclas/{ancla_id}/complete")
+async def complete_ancla(ancla_id: str):
+    completed_at = datetime.utcnow()
+    # Only the transition into completed counts towards the user's stats
+    ancla = await db.anclas.find_one_and_update(
+        {"id": ancla_id, "status": {"$ne": AnclaStatus.COMPLETED.value}},
+        {"$set": {"status": AnclaStatus.COMPLETED.value, "completed_at": completed_at}},
+        projection={"_id": 0, "user_id": 1}
+    )
+    if not ancla:
+        if not await db.anclas.find_one({"id": ancla_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Ancla no encontrada")
+        return {"message": "Ancla completada exitosamente"}
+    reminder_scheduler.cancel(ancla_id)
     
+    await asyncio.gather(record_completion(ancla["user_id"], completed_at), bump_data_version(ancla["user_id"]))
     return {"message": "Ancla completada exitosamente"}
 
 @api_router.delete("/anclas/{ancla_id}")
 async def delete_ancla(ancla_id: str):
-    result = await db.anclas.delete_one({"id": ancla_id})
-    if result.deleted_count == 0:
+    deleted = await db.anclas.find_one_and_delete({"id": ancla_id}, projection={"_id": 0, "user_id": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Ancla no encontrada")
+    await asyncio.gather(
+        db.ancla_occurrences.delete_many({"ancla_id": ancla_id}),
+        bump_data_version(deleted["user_id"])
+    )
+    reminder_scheduler.cancel(ancla_id)
     return {"message": "Ancla eliminada exitosamente"}
 
 # Category routes
 @api_router.get("/categories/{user_id}")
-async def get_categories(user_id: str):
-    categories = await db.categories.find({"user_id": user_id}).to_list(1000)
-    
-    # Convert ObjectId to string in all categories
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    categories = convert_objectid(categories)
-    return categories
+async def get_categories(user_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    return await cached_page("categories", user_id, limit, cursor, lambda: paginate(
+        db.categories, {"user_id": user_id}, limit, cursor, ascending=True, projection=NO_ID
+    ))
 
 @api_router.post("/categories", response_model=Category)
 async def create_category(category: CategoryCreate, user_id: str, profile: UserProfile):
@@ -634,6 +1550,7 @@ async def create_category(category: CategoryCreate, user_id: str, profile: UserP
     category_dict["profile"] = profile
     category_obj = Category(**category_dict)
     await db.categories.insert_one(category_obj.dict())
+    await asyncio.gather(response_cache.invalidate(user_id, "categories"), bump_data_version(user_id))
     return category_obj
 
 # Habit routes
@@ -643,23 +1560,107 @@ async def create_habit(habit: HabitCreate, user_id: str):
     habit_dict["user_id"] = user_id
     habit_obj = Habit(**habit_dict)
     await db.habits.insert_one(habit_obj.dict())
+    await bump_data_version(user_id)
     return habit_obj
 
+# Weeks roll over lazily: a habit keeps the week its count belongs to, reads treat an older
+# week as empty, and the next track moves the finished week into history. No job ever has
+# to reset every habit when a week starts.
+HABIT_HISTORY_WEEKS = 52
+DEFAULT_HABIT_HISTORY_WEEKS = 12
+
+def habit_week_start(moment: datetime) -> datetime:
+    day = completion_day(moment)
+    return day - timedelta(days=day.weekday())
+
+def habit_percentage(count: int, frequency: int) -> float:
+    return min(count / frequency * 100, 100) if frequency > 0 else 100
+
+def habit_view(habit: Dict[str, Any], week: datetime) -> Dict[str, Any]:
+    """Habit as of `week`; counts left over from an earlier week read as zero"""
+    if habit.get("week_start") != week:
+        habit = {**habit, "week_start": week, "current_week_count": 0,
+                 "completion_percentage": habit_percentage(0, habit["frequency"])}
+    return habit
+
+def habit_track_update(week: datetime) -> List[Dict[str, Any]]:
+    """Pipeline update recording one completion in `week`, archiving the previous week first"""
+    same_week = {"$eq": ["$week_start", week]}
+    finished_week = {"$and": [
+        {"$ne": ["$week_start", week]},
+        {"$eq": [{"$type": "$week_start"}, "date"]},
+        {"$gt": ["$current_week_count", 0]}
+    ]}
+    history = {"$ifNull": ["$history", []]}
+    return [
+        {"$set": {
+            "history": {"$cond": [
+                finished_week,
+                {"$slice": [
+                    {"$concatArrays": [history, [
+                        {"week_start": "$week_start", "count": "$current_week_count", "frequency": "$frequency"}
+                    ]]},
+                    -HABIT_HISTORY_WEEKS
+                ]},
+                history
+            ]},
+            "current_week_count": {"$add": [
+                {"$cond": [same_week, {"$ifNull": ["$current_week_count", 0]}, 0]}, 1
+            ]},
+            "week_start": week
+        }},
+        {"$set": {"completion_percentage": {"$cond": [
+            {"$gt": ["$frequency", 0]},
+            {"$min": [{"$multiply": [{"$divide": ["$current_week_count", "$frequency"]}, 100]}, 100]},
+            100
+        ]}}}
+    ]
+
 @api_router.post("/habits/{habit_id}/track")
 async def track_habit(habit_id: str):
-    habit = await db.habits.find_one({"id": habit_id})
+    # One atomic pipeline update: concurrent taps each add exactly one completion
+    habit = await db.habits.find_one_and_update(
+        {"id": habit_id},
+        habit_track_update(habit_week_start(datetime.utcnow())),
+        projection={"_id": 0, "user_id": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not habit:
         raise HTTPException(status_code=404, detail="Hábito no encontrado")
+    await bump_data_version(habit["user_id"])
     
-    new_count = habit["current_week_count"] + 1
-    percentage = min((new_count / habit["frequency"]) * 100, 100)
-    
-    await db.habits.update_one(
+    return {"message": "Hábito registrado exitosamente"}
+
+@api_router.get("/habits/{habit_id}/history")
+async def get_habit_history(habit_id: str, weeks: int = Query(DEFAULT_HABIT_HISTORY_WEEKS, ge=1, le=HABIT_HISTORY_WEEKS)):
+    """Completions per ISO week for the last `weeks` weeks (current week included), oldest first"""
+    habit = await db.habits.find_one(
         {"id": habit_id},
-        {"$set": {"current_week_count": new_count, "completion_percentage": percentage}}
+        {"_id": 0, "frequency": 1, "week_start": 1, "current_week_count": 1, "history": {"$slice": -weeks}}
     )
-    
-    return {"message": "Hábito registrado exitosamente"}
+    if not habit:
+        raise HTTPException(status_code=404, detail="Hábito no encontrado")
+
+    by_week = {entry["week_start"]: entry for entry in habit.get("history", [])}
+    if habit.get("week_start") and habit.get("current_week_count"):
+        # The latest tracked week is still on the habit until the next track archives it
+        by_week[habit["week_start"]] = {"count": habit["current_week_count"], "frequency": habit["frequency"]}
+
+    current_week = habit_week_start(datetime.utcnow())
+    history = []
+    for offset in range(weeks - 1, -1, -1):
+        week = current_week - timedelta(weeks=offset)
+        entry = by_week.get(week, {})
+        count, frequency = entry.get("count", 0), entry.get("frequency", habit["frequency"])
+        iso_year, iso_week, _ = week.isocalendar()
+        history.append({
+            "week": f"{iso_year}-W{iso_week:02d}",
+            "week_start": week,
+            "count": count,
+            "frequency": frequency,
+            "completion_percentage": habit_percentage(count, frequency)
+        })
+    return {"habit_id": habit_id, "weeks": history}
 
 # Objective routes
 @api_router.post("/objectives", response_model=Objective)
@@ -668,28 +1669,44 @@ async def create_objective(objective: ObjectiveCreate, user_id: str):
     objective_dict["user_id"] = user_id
     objective_obj = Objective(**objective_dict)
     await db.objectives.insert_one(objective_obj.dict())
+    await bump_data_version(user_id)
     return objective_obj
 
 @api_router.post("/objectives/{objective_id}/subtask/{subtask_index}/toggle")
 async def toggle_subtask(objective_id: str, subtask_index: int):
-    objective = await db.objectives.find_one({"id": objective_id})
-    if not objective:
-        raise HTTPException(status_code=404, detail="Objetivo no encontrado")
-    
-    if subtask_index >= len(objective["subtasks"]):
+    if subtask_index < 0:
         raise HTTPException(status_code=400, detail="Subtarea no encontrada")
     
-    objective["subtasks"][subtask_index]["completed"] = not objective["subtasks"][subtask_index]["completed"]
-    
-    # Calculate completion percentage
-    completed_count = sum(1 for st in objective["subtasks"] if st["completed"])
-    total_count = len(objective["subtasks"])
-    percentage = (completed_count / total_count) * 100 if total_count > 0 else 0
-    
-    await db.objectives.update_one(
-        {"id": objective_id},
-        {"$set": {"subtasks": objective["subtasks"], "completion_percentage": percentage}}
+    # Flip the flag and recompute the percentage inside MongoDB, so concurrent toggles never
+    # overwrite each other's subtasks
+    objective = await db.objectives.find_one_and_update(
+        {"id": objective_id, f"subtasks.{subtask_index}": {"$exists": True}},
+        [
+            {"$set": {"subtasks": {"$let": {
+                "vars": {"subtask": {"$arrayElemAt": ["$subtasks", subtask_index]}},
+                "in": {"$concatArrays": [
+                    {"$slice": ["$subtasks", subtask_index]} if subtask_index else [],
+                    [{"$mergeObjects": ["$$subtask", {"completed": {"$not": ["$$subtask.completed"]}}]}],
+                    {"$slice": ["$subtasks", subtask_index + 1, {"$size": "$subtasks"}]}
+                ]}
+            }}}},
+            {"$set": {"completion_percentage": {"$multiply": [
+                {"$divide": [
+                    {"$size": {"$filter": {"input": "$subtasks", "cond": "$$this.completed"}}},
+                    {"$size": "$subtasks"}
+                ]},
+                100
+            ]}}}
+        ],
+        projection={"_id": 0, "user_id": 1},
+        return_document=ReturnDocument.AFTER
     )
+    if not objective:
+        # Only the failure path pays for a second read, to tell a missing objective from a bad index
+        if not await db.objectives.find_one({"id": objective_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Objetivo no encontrado")
+        raise HTTPException(status_code=400, detail="Subtarea no encontrada")
+    await bump_data_version(objective["user_id"])
     
     return {"message": "Subtarea actualizada exitosamente"}
 
@@ -706,30 +1723,260 @@ async def create_transaction(transaction: TransactionCreate, user_id: str):
         trans_dict["date"] = trans_dict["date"].isoformat()
     
     await db.transactions.insert_one(trans_dict)
+    await asyncio.gather(
+        apply_transaction_to_rollups(trans_dict),
+        record_spending(trans_dict),
+        bump_data_version(user_id)
+    )
+    # After record_spending, so a flagged anomaly is part of the next insights read
+    await invalidate_ai_insights(user_id)
     return transaction_obj
 
 @api_router.get("/transactions/{user_id}")
-async def get_transactions(user_id: str):
-    transactions = await db.transactions.find({"user_id": user_id}).sort("created_at", -1).to_list(1000)
-    
-    # Convert ObjectId to string in all transactions
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    transactions = convert_objectid(transactions)
-    return transactions
+async def get_transactions(user_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    transactions, next_cursor = await paginate(db.transactions, {"user_id": user_id}, limit, cursor, projection=NO_ID)
+    return page_response(transactions, next_cursor)
+
+# Transaction rollups
+# One document per (user_id, month, type, category) holding the running total and count,
+# keyed on the month of created_at so analytics windows line up with the raw transactions.
+def month_key(moment: datetime) -> str:
+    return moment.strftime("%Y-%m")
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+def next_month_start(moment: datetime) -> datetime:
+    if moment.month == 12:
+        return datetime(moment.year + 1, 1, 1)
+    return datetime(moment.year, moment.month + 1, 1)
+
+async def apply_transaction_to_rollups(transaction: Dict[str, Any]):
+    await db.transaction_rollups.update_one(
+        {
+            "user_id": transaction["user_id"],
+            "month": month_key(transaction["created_at"]),
+            "type": transaction["type"],
+            "category": transaction["category"]
+        },
+        {"$inc": {"total": transaction["amount"], "count": 1}},
+        upsert=True
+    )
+
+async def rebuild_transaction_rollups(database, user_id: Optional[str] = None) -> int:
+    """Recompute transaction_rollups from the raw transactions and return the number of rollup documents.
+
+    Readers never see a missing or half-built rollup: a full rebuild is staged by $out and swapped
+    in atomically, a per-user rebuild replaces its groups in place before dropping leftovers.
+    Run it with transaction writes quiesced all the same: a transaction inserted while the
+    aggregation reads can be overwritten by the rebuilt totals or counted twice. It is also the
+    repair path for a rollup that missed its $inc because the process died after the insert.
+    """
+    rebuild_id = str(uuid.uuid4())
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+                "type": "$type",
+                "category": {"$ifNull": ["$category", "Sin categoría"]}
+            },
+            "total": {"$sum": {"$ifNull": ["$amount", 0]}},
+            "count": {"$sum": 1}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_id": "$_id.user_id",
+            "month": "$_id.month",
+            "type": "$_id.type",
+            "category": "$_id.category",
+            "total": 1,
+            "count": 1,
+            "rebuild_id": rebuild_id
+        }}
+    ]
+
+    if user_id is None:
+        # $out swaps the collection in atomically and keeps its indexes
+        pipeline.append({"$out": "transaction_rollups"})
+        await database.transactions.aggregate(pipeline).to_list(None)
+        # Budget analytics and reports read the rollups, so their ETags must change too
+        await bump_data_versions(database)
+        return await database.transaction_rollups.count_documents({})
+
+    pipeline.insert(0, {"$match": {"user_id": user_id}})
+    pipeline.append({"$merge": {
+        "into": "transaction_rollups",
+        "on": ["user_id", "month", "type", "category"],
+        "whenMatched": "replace",
+        "whenNotMatched": "insert"
+    }})
+    await database.transactions.aggregate(pipeline).to_list(None)
+    # Groups this rebuild did not produce no longer have any transactions behind them
+    await database.transaction_rollups.delete_many({"user_id": user_id, "rebuild_id": {"$ne": rebuild_id}})
+    await bump_data_versions(database, [user_id])
+    return await database.transaction_rollups.count_documents({"user_id": user_id})
+
+async def summarize_transactions(user_id: str, start: datetime, end: datetime) -> Dict[tuple, float]:
+    """Totals per (type, category) for transactions created in [start, end].
+
+    Calendar months fully inside the window are read from transaction_rollups; only the
+    partial months at either edge are aggregated from the raw transactions.
+    """
+    first_full = start if start == month_start(start) else next_month_start(start)
+    full_months = []
+    cursor = first_full
+    while next_month_start(cursor) <= end:
+        full_months.append(month_key(cursor))
+        cursor = next_month_start(cursor)
+
+    if full_months:
+        raw_ranges = [{"created_at": {"$gte": start, "$lt": first_full}},
+                      {"created_at": {"$gte": cursor, "$lte": end}}]
+    else:
+        raw_ranges = [{"created_at": {"$gte": start, "$lte": end}}]
+
+    totals = {}
+    raw_pipeline = [
+        {"$match": {"user_id": user_id, "$or": raw_ranges}},
+        {"$group": {
+            "_id": {"type": "$type", "category": {"$ifNull": ["$category", "Sin categoría"]}},
+            "total": {"$sum": {"$ifNull": ["$amount", 0]}}
+        }}
+    ]
+    async for row in db.transactions.aggregate(raw_pipeline):
+        key = (row["_id"]["type"], row["_id"]["category"])
+        totals[key] = totals.get(key, 0) + row["total"]
+
+    if full_months:
+        rollups = db.transaction_rollups.find(
+            {"user_id": user_id, "month": {"$in": full_months}},
+            {"_id": 0, "type": 1, "category": 1, "total": 1}
+        )
+        async for rollup in rollups:
+            key = (rollup["type"], rollup["category"])
+            totals[key] = totals.get(key, 0) + rollup["total"]
+
+    return totals
+
+# Spending anomaly detection
+# spending_stats holds one anomaly.update_stats state per (user, category). Every expense is
+# scored against the state before it and then folded in, so detection never rescans history.
+STATS_FIELDS = ("count", "mean", "m2", "ewma", "median", "mad")
+STATS_UPDATE_RETRIES = 5
+ANOMALY_ALERT_DAYS = 30
+
+async def record_spending(transaction: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Update the category's streaming statistics with an expense and store it if it is an outlier"""
+    if transaction.get("type") != TransactionType.EXPENSE.value:
+        return None
+    user_id, category, amount = transaction["user_id"], transaction.get("category"), transaction.get("amount", 0)
+    key = {"user_id": user_id, "category": category}
+
+    # Optimistic update: the write only applies if nobody folded in another expense since the read
+    for _ in range(STATS_UPDATE_RETRIES):
+        current = await db.spending_stats.find_one(key, {"_id": 0, **{f: 1 for f in STATS_FIELDS}})
+        stats = current or anomaly.empty_stats()
+        updated = anomaly.update_stats(stats, amount)
+        if current is None:
+            try:
+                await db.spending_stats.insert_one({**key, **updated, "updated_at": datetime.utcnow()})
+                break
+            except DuplicateKeyError:
+                continue
+        result = await db.spending_stats.update_one(
+            {**key, "count": stats["count"]},
+            {"$set": {**updated, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count:
+            break
+    else:
+        logger.warning(f"Spending stats for {user_id}/{category} not updated after {STATS_UPDATE_RETRIES} attempts")
+        return None
+
+    scores = anomaly.anomaly_score(stats, amount)
+    if not scores:
+        return None
+    flagged = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "category": category,
+        "transaction_id": transaction.get("id"),
+        "amount": amount,
+        **scores,
+        "created_at": transaction.get("created_at") or datetime.utcnow()
+    }
+    await db.spending_anomalies.insert_one(flagged.copy())
+    return flagged
+
+async def replay_spending_stats(database, query: Dict[str, Any]):
+    """Yield (user_id, {category: state}) for each user in turn, replaying their expenses in chronological order.
+
+    The cursor is sorted by user first, so only one user's states are held at a time.
+    """
+    # Per-user chronological order; this is the user_id_created_at_id index walked backwards
+    cursor = database.transactions.find(query, {"_id": 0, "user_id": 1, "category": 1, "amount": 1}) \
+        .sort([("user_id", DESCENDING), ("created_at", ASCENDING), ("id", ASCENDING)])
+    current_user, states = None, {}
+    async for t in cursor:
+        if t["user_id"] != current_user:
+            if states:
+                yield current_user, states
+            current_user, states = t["user_id"], {}
+        category = t.get("category")
+        states[category] = anomaly.update_stats(states.get(category) or anomaly.empty_stats(), t.get("amount", 0))
+    if states:
+        yield current_user, states
+
+async def rebuild_spending_stats(database, user_id: Optional[str] = None) -> int:
+    """Replay expenses in chronological order into fresh spending_stats and return the number of documents.
+
+    A full rebuild is written to a staging collection in batches and renamed over spending_stats;
+    a per-user rebuild replaces the user's documents in place. Run it with transaction writes
+    quiesced, since an expense recorded during the replay is overwritten by the rebuilt state.
+    """
+    query = {"type": TransactionType.EXPENSE.value}
+    if user_id is not None:
+        query["user_id"] = user_id
+    now = datetime.utcnow()
+
+    if user_id is None:
+        staging = database["spending_stats_rebuild"]
+        await staging.drop()
+        await staging.create_indexes(INDEX_REGISTRY["spending_stats"])
+        written, batch = 0, []
+        async for uid, states in replay_spending_stats(database, query):
+            batch.extend({"user_id": uid, "category": category, **state, "updated_at": now}
+                         for category, state in states.items())
+            if len(batch) >= BULK_INSERT_BATCH_SIZE:
+                await staging.insert_many(batch, ordered=False)
+                written, batch = written + len(batch), []
+        if batch:
+            await staging.insert_many(batch, ordered=False)
+            written += len(batch)
+        await staging.rename("spending_stats", dropTarget=True)
+        return written
+
+    documents = [
+        {"user_id": uid, "category": category, **state, "updated_at": now}
+        async for uid, states in replay_spending_stats(database, query)
+        for category, state in states.items()
+    ]
+    if documents:
+        await database.spending_stats.bulk_write(
+            [ReplaceOne({"user_id": doc["user_id"], "category": doc["category"]}, doc, upsert=True) for doc in documents],
+            ordered=False
+        )
+    await database.spending_stats.delete_many(
+        {"user_id": user_id, "category": {"$nin": [doc["category"] for doc in documents]}}
+    )
+    return len(documents)
+
+async def recent_anomalies(database, user_ids: List[str], now: datetime) -> List[Dict[str, Any]]:
+    since = now - timedelta(days=ANOMALY_ALERT_DAYS)
+    return await database.spending_anomalies.find(
+        {"user_id": {"$in": user_ids}, "created_at": {"$gte": since}}, NO_ID
+    ).sort("created_at", DESCENDING).to_list(None)
 
 # Diary routes
 @api_router.post("/diary", response_model=DiaryEntry)
@@ -745,30 +1992,13 @@ async def create_diary_entry(entry: DiaryEntryCreate, user_id: str):
         diary_dict["date"] = diary_dict["date"].isoformat()
     
     await db.diary_entries.insert_one(diary_dict)
+    await bump_data_version(user_id)
     return entry_obj
 
 @api_router.get("/diary/{user_id}")
-async def get_diary_entries(user_id: str):
-    entries = await db.diary_entries.find({"user_id": user_id}).sort("created_at", -1).to_list(1000)
-    
-    # Convert ObjectId to string in all entries
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    entries = convert_objectid(entries)
-    return entries
+async def get_diary_entries(user_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    entries, next_cursor = await paginate(db.diary_entries, {"user_id": user_id}, limit, cursor, projection=NO_ID)
+    return page_response(entries, next_cursor)
 
 # Budget Limits routes
 @api_router.post("/budget-limits", response_model=BudgetLimit)
@@ -777,37 +2007,32 @@ async def create_budget_limit(limit: BudgetLimitCreate, user_id: str):
     limit_dict["user_id"] = user_id
     limit_obj = BudgetLimit(**limit_dict)
     await db.budget_limits.insert_one(limit_obj.dict())
+    await asyncio.gather(
+        invalidate_ai_insights(user_id),
+        response_cache.invalidate(user_id, "budget_limits"),
+        bump_data_version(user_id)
+    )
     return limit_obj
 
 @api_router.get("/budget-limits/{user_id}")
-async def get_budget_limits(user_id: str):
-    limits = await db.budget_limits.find({"user_id": user_id}).to_list(1000)
-    
-    # Convert ObjectId to string in all limits
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    limits = convert_objectid(limits)
-    return limits
+async def get_budget_limits(user_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    return await cached_page("budget_limits", user_id, limit, cursor, lambda: paginate(
+        db.budget_limits, {"user_id": user_id}, limit, cursor, ascending=True, projection=NO_ID
+    ))
 
 @api_router.put("/budget-limits/{limit_id}")
 async def update_budget_limit(limit_id: str, limit: BudgetLimitCreate):
     limit_dict = limit.dict()
-    result = await db.budget_limits.update_one({"id": limit_id}, {"$set": limit_dict})
-    if result.matched_count == 0:
+    updated = await db.budget_limits.find_one_and_update(
+        {"id": limit_id}, {"$set": limit_dict}, projection={"_id": 0, "user_id": 1}
+    )
+    if not updated:
         raise HTTPException(status_code=404, detail="Budget limit not found")
+    await asyncio.gather(
+        invalidate_ai_insights(updated["user_id"]),
+        response_cache.invalidate(updated["user_id"], "budget_limits"),
+        bump_data_version(updated["user_id"])
+    )
     return {"message": "Budget limit updated successfully"}
 
 # Savings Goals routes
@@ -828,52 +2053,99 @@ async def create_savings_goal(goal: SavingsGoalCreate, user_id: str):
         savings_dict["target_date"] = savings_dict["target_date"].isoformat()
     
     await db.savings_goals.insert_one(savings_dict)
+    await asyncio.gather(
+        invalidate_ai_insights(user_id),
+        response_cache.invalidate(user_id, "savings_goals"),
+        bump_data_version(user_id)
+    )
     return goal_obj
 
 @api_router.get("/savings-goals/{user_id}")
-async def get_savings_goals(user_id: str):
-    goals = await db.savings_goals.find({"user_id": user_id}).to_list(1000)
-    
-    # Convert ObjectId to string in all goals
-    def convert_objectid(item):
-        if isinstance(item, dict):
-            for k, v in list(item.items()):
-                if isinstance(v, ObjectId):
-                    item[k] = str(v)
-                elif isinstance(v, (dict, list)):
-                    convert_objectid(v)
-        elif isinstance(item, list):
-            for i in range(len(item)):
-                if isinstance(item[i], ObjectId):
-                    item[i] = str(item[i])
-                elif isinstance(item[i], (dict, list)):
-                    convert_objectid(item[i])
-        return item
-    
-    goals = convert_objectid(goals)
-    return goals
+async def get_savings_goals(user_id: str, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
+    return await cached_page("savings_goals", user_id, limit, cursor, lambda: paginate(
+        db.savings_goals, {"user_id": user_id}, limit, cursor, ascending=True, projection=NO_ID
+    ))
 
 @api_router.put("/savings-goals/{goal_id}/add-money")
 async def add_money_to_savings_goal(goal_id: str, amount: float):
-    goal = await db.savings_goals.find_one({"id": goal_id})
+    goal = await db.savings_goals.find_one_and_update(
+        {"id": goal_id},
+        {"$inc": {"current_amount": amount}},
+        projection={"_id": 0, "user_id": 1, "current_amount": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not goal:
         raise HTTPException(status_code=404, detail="Savings goal not found")
     
-    new_amount = goal.get("current_amount", 0) + amount
-    result = await db.savings_goals.update_one(
-        {"id": goal_id}, 
-        {"$set": {"current_amount": new_amount}}
+    new_amount = goal["current_amount"]
+    await asyncio.gather(
+        invalidate_ai_insights(goal["user_id"]),
+        response_cache.invalidate(goal["user_id"], "savings_goals"),
+        bump_data_version(goal["user_id"])
     )
     return {"message": "Money added to savings goal", "new_amount": new_amount}
 
 # Budget Analytics routes
+async def expense_trend_buckets(user_id: str, end: datetime, bucket_days: int = 30, buckets: int = 6) -> List[Dict[str, Any]]:
+    """Expense totals for `buckets` consecutive windows of `bucket_days` ending at `end`, newest first.
+
+    Each window includes its start and excludes its end, so windows ending at midnight hold whole days.
+    A single $group pipeline assigns each transaction its bucket index, replacing one query per window.
+    """
+    bucket_ms = bucket_days * 24 * 60 * 60 * 1000
+    start = end - timedelta(days=bucket_days * buckets)
+    pipeline = [
+        {"$match": {
+            "user_id": user_id,
+            "type": "expense",
+            "created_at": {"$gte": start, "$lt": end}
+        }},
+        {"$group": {
+            "_id": {"$floor": {"$divide": [{"$subtract": ["$created_at", start]}, bucket_ms]}},
+            "amount": {"$sum": {"$ifNull": ["$amount", 0]}}
+        }}
+    ]
+    amounts = {}
+    async for row in db.transactions.aggregate(pipeline):
+        # Buckets are counted from the oldest; the list is newest first
+        amounts[buckets - 1 - int(row["_id"])] = row["amount"]
+
+    # Month-sized buckets keep the historical "YYYY-MM" label; shorter ones are labelled by day
+    label_format = "%Y-%m" if bucket_days >= 28 else "%Y-%m-%d"
+    trends = []
+    for i in range(buckets):
+        bucket_start = end - timedelta(days=bucket_days * (i + 1))
+        trends.append({
+            "month": bucket_start.strftime(label_format),
+            "period_start": bucket_start.isoformat(),
+            "amount": amounts.get(i, 0)
+        })
+    return trends
+
 @api_router.get("/budget-analytics/{user_id}")
-async def get_budget_analytics(user_id: str, period: str = "monthly"):
+async def get_budget_analytics(
+    user_id: str,
+    request: Request,
+    response: Response,
+    period: str = "monthly",
+    trend_bucket_days: int = Query(30, ge=1, le=366),
+    trend_buckets: int = Query(6, ge=1, le=104)
+):
     """Get comprehensive budget analytics"""
     from datetime import datetime, timedelta
     
-    # Calculate date range based on period
-    end_date = datetime.now()
+    # The windows are whole UTC days ending with today, so they only move when this date does
+    today = datetime.utcnow().date()
+    etag = make_etag(user_id, await get_user_data_version(user_id), "budget-analytics",
+                     period, trend_bucket_days, trend_buckets, today.isoformat())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CONDITIONAL_CACHE_CONTROL
+    
+    # Calculate date range based on period; created_at and the rollup months are UTC.
+    # The range ends at the next UTC midnight, so a window of N days is today and the N - 1 before it.
+    end_date = datetime.combine(today + timedelta(days=1), datetime.min.time())
     if period == "weekly":
         start_date = end_date - timedelta(weeks=1)
     elif period == "monthly":
@@ -883,29 +2155,24 @@ async def get_budget_analytics(user_id: str, period: str = "monthly"):
     else:
         start_date = end_date - timedelta(days=30)
     
-    # Get transactions for the period
-    transactions = await db.transactions.find({
-        "user_id": user_id,
-        "created_at": {"$gte": start_date, "$lte": end_date}
-    }).to_list(1000)
-    
-    # Get budget limits
-    budget_limits = await db.budget_limits.find({"user_id": user_id}).to_list(1000)
-    
-    # Get savings goals
-    savings_goals = await db.savings_goals.find({"user_id": user_id}).to_list(1000)
+    # Period totals, budget limits, savings goals and expense trends are independent reads
+    totals, budget_limits, savings_goals, expense_trends = await asyncio.gather(
+        summarize_transactions(user_id, start_date, end_date),
+        db.budget_limits.find({"user_id": user_id}).to_list(1000),
+        db.savings_goals.find({"user_id": user_id}).to_list(1000),
+        expense_trend_buckets(user_id, end_date, trend_bucket_days, trend_buckets)
+    )
     
     # Calculate analytics
-    total_income = sum(t.get("amount", 0) for t in transactions if t.get("type") == "income")
-    total_expenses = sum(t.get("amount", 0) for t in transactions if t.get("type") == "expense")
+    total_income = sum(amount for (kind, _), amount in totals.items() if kind == "income")
+    total_expenses = sum(amount for (kind, _), amount in totals.items() if kind == "expense")
     net_balance = total_income - total_expenses
     
     # Category breakdown
     category_breakdown = {}
-    for transaction in transactions:
-        if transaction.get("type") == "expense":
-            category = transaction.get("category", "Sin categoría")
-            category_breakdown[category] = category_breakdown.get(category, 0) + transaction.get("amount", 0)
+    for (kind, category), amount in totals.items():
+        if kind == "expense":
+            category_breakdown[category] = category_breakdown.get(category, 0) + amount
     
     # Budget alerts
     budget_alerts = []
@@ -924,23 +2191,6 @@ async def get_budget_analytics(user_id: str, period: str = "monthly"):
                 "severity": "high" if percentage >= 100 else "medium"
             })
     
-    # Expense trends (last 6 months)
-    expense_trends = []
-    for i in range(6):
-        month_start = end_date - timedelta(days=30*(i+1))
-        month_end = end_date - timedelta(days=30*i)
-        month_transactions = await db.transactions.find({
-            "user_id": user_id,
-            "type": "expense",
-            "created_at": {"$gte": month_start, "$lte": month_end}
-        }).to_list(1000)
-        
-        month_total = sum(t.get("amount", 0) for t in month_transactions)
-        expense_trends.append({
-            "month": month_start.strftime("%Y-%m"),
-            "amount": month_total
-        })
-    
     # Savings progress
     savings_progress = []
     for goal in savings_goals:
@@ -978,8 +2228,8 @@ async def generate_financial_report(user_id: str, report_type: str = "monthly"):
     """Generate financial reports"""
     from datetime import datetime, timedelta
     
-    # Calculate date range
-    end_date = datetime.now()
+    # Calculate date range; created_at and the rollup months are UTC
+    end_date = datetime.utcnow()
     if report_type == "weekly":
         start_date = end_date - timedelta(weeks=1)
     elif report_type == "monthly":
@@ -989,22 +2239,18 @@ async def generate_financial_report(user_id: str, report_type: str = "monthly"):
     else:
         start_date = end_date - timedelta(days=30)
     
-    # Get transactions
-    transactions = await db.transactions.find({
-        "user_id": user_id,
-        "created_at": {"$gte": start_date, "$lte": end_date}
-    }).to_list(1000)
+    # Totals per (type, category)
+    totals = await summarize_transactions(user_id, start_date, end_date)
     
     # Calculate totals
-    total_income = sum(t.get("amount", 0) for t in transactions if t.get("type") == "income")
-    total_expenses = sum(t.get("amount", 0) for t in transactions if t.get("type") == "expense")
+    total_income = sum(amount for (kind, _), amount in totals.items() if kind == "income")
+    total_expenses = sum(amount for (kind, _), amount in totals.items() if kind == "expense")
     net_balance = total_income - total_expenses
     
     # Category breakdown
     category_breakdown = {}
-    for transaction in transactions:
-        category = transaction.get("category", "Sin categoría")
-        category_breakdown[category] = category_breakdown.get(category, 0) + transaction.get("amount", 0)
+    for (_, category), amount in totals.items():
+        category_breakdown[category] = category_breakdown.get(category, 0) + amount
     
     # Create report
     report = FinancialReport(
@@ -1045,20 +2291,23 @@ async def create_notification_settings(settings: NotificationSettingsCreate, use
             {"user_id": user_id}, 
             {"$set": settings_dict}
         )
-        return settings_obj
     else:
         # Create new settings
         await db.notification_settings.insert_one(settings_obj.dict())
-        return settings_obj
+    reminder_scheduler.update_settings(user_id, settings_dict)
+    # Invalidate only after the write, so a concurrent read cannot re-cache the old settings
+    await asyncio.gather(response_cache.invalidate(user_id, "notification_settings"), bump_data_version(user_id))
+    return settings_obj
 
 @api_router.get("/notification-settings/{user_id}")
 async def get_notification_settings(user_id: str):
-    settings = await db.notification_settings.find_one({"user_id": user_id})
-    if not settings:
-        # Return default settings if none exist
-        default_settings = NotificationSettings(user_id=user_id)
-        return default_settings
-    return NotificationSettings(**settings)
+    async def load():
+        settings = await db.notification_settings.find_one({"user_id": user_id})
+        if not settings:
+            # Return default settings if none exist
+            return NotificationSettings(user_id=user_id).dict()
+        return NotificationSettings(**settings).dict()
+    return await cached_json("notification_settings", user_id, load)
 
 @api_router.put("/notification-settings/{user_id}")
 async def update_notification_settings(user_id: str, settings: NotificationSettingsCreate):
@@ -1069,6 +2318,8 @@ async def update_notification_settings(user_id: str, settings: NotificationSetti
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Notification settings not found")
+    reminder_scheduler.update_settings(user_id, settings_dict)
+    await asyncio.gather(response_cache.invalidate(user_id, "notification_settings"), bump_data_version(user_id))
     return {"message": "Notification settings updated successfully"}
 
 # Notification trigger endpoints
@@ -1090,7 +2341,7 @@ async def trigger_budget_alert(user_id: str, category: str, percentage: float, l
         "created_at": datetime.utcnow()
     }
     
-    await db.notifications.insert_one(notification_data)
+    await asyncio.gather(db.notifications.insert_one(notification_data.copy()), bump_data_version(user_id))
     return {"message": "Budget alert triggered", "notification": notification_data}
 
 @api_router.post("/notifications/trigger-ancla-reminder")
@@ -1114,7 +2365,7 @@ async def trigger_ancla_reminder(user_id: str, ancla_id: str, minutes_before: in
         "created_at": datetime.utcnow()
     }
     
-    await db.notifications.insert_one(notification_data)
+    await asyncio.gather(db.notifications.insert_one(notification_data.copy()), bump_data_version(user_id))
     return {"message": "Ancla reminder triggered", "notification": notification_data}
 
 @api_router.post("/notifications/trigger-savings-goal")
@@ -1149,17 +2400,537 @@ async def trigger_savings_goal_notification(user_id: str, goal_id: str, mileston
         "created_at": datetime.utcnow()
     }
     
-    await db.notifications.insert_one(notification_data)
+    await asyncio.gather(db.notifications.insert_one(notification_data.copy()), bump_data_version(user_id))
     return {"message": "Savings goal notification triggered", "notification": notification_data}
 
 @api_router.get("/notifications/{user_id}")
 async def get_user_notifications(user_id: str, limit: int = 50):
     """Get user's recent notifications"""
     notifications = await db.notifications.find(
-        {"user_id": user_id}
+        {"user_id": user_id}, NO_ID
     ).sort("created_at", -1).limit(limit).to_list(limit)
     
-    return notifications
+    return FastJSONResponse(notifications)
+
+# Ancla reminder scheduler
+REMINDER_LEAD_PATTERN = re.compile(r"(\d+)\s*(minuto|hora|d[ií]a)", re.IGNORECASE)
+REMINDER_LEAD_UNITS = {"minuto": 1, "hora": 60, "dia": 1440, "día": 1440}
+# Longer leads are clamped so the scheduler knows how far past its window to look
+MAX_REMINDER_LEAD = timedelta(days=7)
+
+def reminder_lead_minutes(ancla: Dict[str, Any], settings: Optional[Dict[str, Any]]) -> int:
+    # alert_time comes from the form ("10 minutos antes", "1 hora antes", "1 día antes");
+    # without it the user's NotificationSettings.reminder_time applies
+    match = REMINDER_LEAD_PATTERN.search(ancla.get("alert_time") or "")
+    if match:
+        lead = int(match.group(1)) * REMINDER_LEAD_UNITS[match.group(2).lower()]
+    else:
+        lead = (settings or {}).get("reminder_time", 30)
+    return min(lead, int(MAX_REMINDER_LEAD.total_seconds() // 60))
+
+def format_lead(minutes: int) -> str:
+    """A lead time in its largest whole unit, e.g. 10 minutos, 1 hora, 3 días"""
+    for unit_minutes, singular, plural in ((1440, "día", "días"), (60, "hora", "horas"), (1, "minuto", "minutos")):
+        if minutes % unit_minutes == 0:
+            count = minutes // unit_minutes
+            return f"{count} {singular if count == 1 else plural}"
+
+class ReminderScheduler:
+    """In-process scheduler that writes ancla reminders to db.notifications.
+
+    Upcoming alerts live in a min-heap ordered by fire time (O(log n) insert); cancelling
+    only drops the entry from a dict and the stale heap node is skipped when it surfaces.
+    The heap holds alerts that fire within LOOKAHEAD; since an alert fires up to
+    MAX_REMINDER_LEAD before its ancla starts, anclas starting that much later are considered
+    too. One-off anclas are refilled incrementally with an indexed range query; alerting
+    recurring anclas are read once at startup into `recurring` and expanded from memory.
+    Route handlers keep both in sync. Cancelled nodes are compacted away once they
+    outnumber the live ones.
+
+    Each worker process has its own heap, so an edit served by another worker is not seen
+    here: every due alert is checked against the database before it is delivered.
+    """
+    LOOKAHEAD = timedelta(days=2)
+    REFILL_INTERVAL = timedelta(hours=1)
+    BATCH_SIZE = 500
+    ANCLA_FIELDS = {"_id": 0, "id": 1, "user_id": 1, "title": 1, "start_date": 1, "repeat_type": 1, "alert_time": 1}
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.keys_by_ancla = {}
+        self.recurring = {}  # ancla id -> alerting recurring ancla
+        self.settings = {}  # user id -> notification settings of users in `recurring`
+        self.sequence = itertools.count()
+        self.loaded_until = None
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def push(self, ancla: Dict[str, Any], occurrence: datetime, lead_minutes: int):
+        key = (ancla["id"], occurrence)
+        fire_at = occurrence - timedelta(minutes=lead_minutes)
+        entry = {
+            "fire_at": fire_at,
+            "user_id": ancla["user_id"],
+            "ancla_id": ancla["id"],
+            "title": ancla["title"],
+            "occurrence": occurrence,
+            "lead_minutes": lead_minutes
+        }
+        self.entries[key] = entry
+        self.keys_by_ancla.setdefault(ancla["id"], set()).add(key)
+        heapq.heappush(self.heap, (fire_at, next(self.sequence), key, entry))
+        if self.heap[0][3] is entry:
+            self.wakeup.set()
+
+    def cancel(self, ancla_id: str):
+        self.recurring.pop(ancla_id, None)
+        for key in self.keys_by_ancla.pop(ancla_id, ()):
+            self.entries.pop(key, None)
+        self.compact()
+
+    def cancel_occurrence(self, ancla_id: str, occurrence: datetime):
+        key = (ancla_id, occurrence)
+        self.entries.pop(key, None)
+        keys = self.keys_by_ancla.get(ancla_id)
+        if keys:
+            keys.discard(key)
+        self.compact()
+
+    def compact(self):
+        """Rebuild the heap without cancelled nodes once they make up most of it"""
+        if len(self.heap) > 2 * len(self.entries) + self.BATCH_SIZE:
+            self.heap = [node for node in self.heap if self.entries.get(node[2]) is node[3]]
+            heapq.heapify(self.heap)
+
+    def update_settings(self, user_id: str, settings: Dict[str, Any]):
+        """Recurring anclas in memory use the user's new lead time from the next refill"""
+        self.settings[user_id] = settings
+
+    @staticmethod
+    async def load_settings(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        settings = {}
+        for i in range(0, len(user_ids), ReminderScheduler.BATCH_SIZE):
+            async for doc in db.notification_settings.find(
+                {"user_id": {"$in": user_ids[i:i + ReminderScheduler.BATCH_SIZE]}}, {"_id": 0, "user_id": 1, "reminder_time": 1}
+            ):
+                settings[doc["user_id"]] = doc
+        return settings
+
+    async def load_recurring(self):
+        """Stream every alerting recurring ancla once; afterwards handlers keep `recurring` current"""
+        self.recurring = {}
+        async for ancla in db.anclas.find(
+            {"alert_enabled": True, "status": "active", "repeat_type": {"$in": RECURRING_TYPES}}, self.ANCLA_FIELDS
+        ).batch_size(self.BATCH_SIZE):
+            self.recurring[ancla["id"]] = ancla
+        self.settings = await self.load_settings(list({a["user_id"] for a in self.recurring.values()}))
+
+    def add_ancla(self, ancla: Dict[str, Any], settings: Optional[Dict[str, Any]],
+                  window_start: datetime, window_end: datetime, now: datetime):
+        """Push the upcoming occurrences whose alert fires in [window_start, window_end).
+
+        A window starting at or before now also takes alerts whose fire time has already
+        passed while the ancla has not started yet; they are delivered straight away.
+        """
+        lead = timedelta(minutes=reminder_lead_minutes(ancla, settings))
+        start = to_naive_utc(ancla["start_date"])
+        for occurrence in occurrence_starts(ancla["id"], start, ancla.get("repeat_type"),
+                                            window_start, window_end + MAX_REMINDER_LEAD):
+            fire_at = occurrence - lead
+            if occurrence <= now or fire_at >= window_end:
+                continue
+            if fire_at < window_start and window_start > now:
+                continue  # an earlier window already queued it
+            self.push(ancla, occurrence, int(lead.total_seconds() // 60))
+
+    async def schedule_ancla(self, ancla: Dict[str, Any]):
+        """(Re)schedule one ancla after it was created or edited"""
+        await self.schedule_anclas([ancla])
+
+    async def schedule_anclas(self, anclas: List[Dict[str, Any]]):
+        """(Re)schedule edited anclas, reading each owner's notification settings once"""
+        for ancla in anclas:
+            self.cancel(ancla["id"])
+        if self.loaded_until is None:
+            return
+        alerting = [a for a in anclas if a.get("alert_enabled") and a.get("status") == AnclaStatus.ACTIVE]
+        user_ids = list({a["user_id"] for a in alerting})
+        if not user_ids:
+            return
+        settings = {
+            doc["user_id"]: doc
+            async for doc in db.notification_settings.find(
+                {"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "reminder_time": 1}
+            )
+        }
+        now = datetime.utcnow()
+        for ancla in alerting:
+            if ancla.get("repeat_type") in RECURRING_TYPES:
+                self.recurring[ancla["id"]] = {field: ancla.get(field) for field in self.ANCLA_FIELDS if field != "_id"}
+                self.settings[ancla["user_id"]] = settings.get(ancla["user_id"])
+            self.add_ancla(ancla, settings.get(ancla["user_id"]), now, self.loaded_until, now)
+
+    async def refill(self):
+        """Load alerts firing in [loaded_until, now + LOOKAHEAD)"""
+        now = datetime.utcnow()
+        if self.loaded_until is None:
+            await self.load_recurring()
+        window_start = self.loaded_until or now
+        window_end = now + self.LOOKAHEAD
+
+        one_off = []
+        async for ancla in db.anclas.find(
+            {"alert_enabled": True, "status": "active", "repeat_type": {"$nin": RECURRING_TYPES},
+             "start_date": {"$gte": window_start, "$lt": window_end + MAX_REMINDER_LEAD}},
+            self.ANCLA_FIELDS
+        ).batch_size(self.BATCH_SIZE):
+            one_off.append(ancla)
+        settings = await self.load_settings(list({a["user_id"] for a in one_off}))
+        for ancla in one_off:
+            self.add_ancla(ancla, settings.get(ancla["user_id"]), window_start, window_end, now)
+        for ancla in self.recurring.values():
+            self.add_ancla(ancla, self.settings.get(ancla["user_id"]), window_start, window_end, now)
+        self.loaded_until = window_end
+
+    def pop_due(self, now: datetime) -> List[Dict[str, Any]]:
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.BATCH_SIZE:
+            _, _, key, entry = heapq.heappop(self.heap)
+            if self.entries.get(key) is not entry:
+                continue  # cancelled or rescheduled
+            del self.entries[key]
+            keys = self.keys_by_ancla.get(entry["ancla_id"])
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.keys_by_ancla[entry["ancla_id"]]
+            due.append(entry)
+        return due
+
+    async def still_due(self, due: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop alerts whose ancla was moved, disabled, completed or deleted (possibly by another
+        worker) and refresh the title of the rest"""
+        ancla_ids = list({entry["ancla_id"] for entry in due})
+        anclas, completed = await asyncio.gather(
+            db.anclas.find(
+                {"id": {"$in": ancla_ids}},
+                {"_id": 0, "id": 1, "title": 1, "alert_enabled": 1, "status": 1, "start_date": 1, "repeat_type": 1}
+            ).to_list(len(ancla_ids)),
+            db.ancla_occurrences.find(
+                {"ancla_id": {"$in": ancla_ids}, "occurrence_date": {"$in": list({e["occurrence"] for e in due})}},
+                {"_id": 0, "ancla_id": 1, "occurrence_date": 1}
+            ).to_list(None)
+        )
+        current = {a["id"]: a for a in anclas}
+        done = {(o["ancla_id"], o["occurrence_date"]) for o in completed}
+
+        def valid(entry):
+            ancla = current.get(entry["ancla_id"])
+            if not ancla or not ancla.get("alert_enabled") or ancla.get("status") != AnclaStatus.ACTIVE.value:
+                return False
+            if (entry["ancla_id"], entry["occurrence"]) in done:
+                return False
+            # BSON dates keep milliseconds, so the stored start can trail the scheduled one by <1 ms
+            occurrence = entry["occurrence"]
+            return bool(occurrence_starts(
+                ancla["id"], to_naive_utc(ancla["start_date"]), ancla.get("repeat_type"),
+                occurrence - timedelta(milliseconds=1), occurrence + timedelta(milliseconds=1)
+            ))
+        due = [entry for entry in due if valid(entry)]
+        for entry in due:
+            entry["title"] = current[entry["ancla_id"]].get("title", entry["title"])
+        return due
+
+    async def deliver(self, due: List[Dict[str, Any]]):
+        due = await self.still_due(due)
+        if not due:
+            return
+        user_ids = list({entry["user_id"] for entry in due})
+        enabled = {
+            s["user_id"]
+            async for s in db.notification_settings.find(
+                {"user_id": {"$in": user_ids}, "ancla_reminders": {"$ne": False}}, {"_id": 0, "user_id": 1}
+            )
+        }
+        notifications = [
+            {
+                "user_id": entry["user_id"],
+                "type": "ancla_reminder",
+                "title": "⚓ Recordatorio de Ancla",
+                "body": f"\"{entry['title']}\" comienza en {format_lead(entry['lead_minutes'])}",
+                "data": {"url": "/dashboard", "ancla_id": entry["ancla_id"]},
+                "dedupe_key": f"ancla_reminder:{entry['ancla_id']}:{entry['occurrence'].isoformat()}",
+                "created_at": datetime.utcnow()
+            }
+            for entry in due if entry["user_id"] in enabled
+        ]
+        if not notifications:
+            return
+        try:
+            await db.notifications.insert_many(notifications, ordered=False)
+        except BulkWriteError as e:
+            # Duplicates mean another worker already delivered those reminders
+            errors = [err for err in e.details.get("writeErrors", []) if err.get("code") != 11000]
+            if errors:
+                logger.error(f"Reminder delivery failed for {len(errors)} notifications: {errors[0].get('errmsg')}")
+
+    async def run(self):
+        next_refill = datetime.utcnow()
+        while True:
+            try:
+                now = datetime.utcnow()
+                if now >= next_refill:
+                    await self.refill()
+                    next_refill = now + self.REFILL_INTERVAL
+                while True:
+                    due = self.pop_due(datetime.utcnow())
+                    if not due:
+                        break
+                    await self.deliver(due)
+
+                wake_at = min(self.heap[0][0], next_refill) if self.heap else next_refill
+                timeout = max((wake_at - datetime.utcnow()).total_seconds(), 0)
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Reminder scheduler error: {e}")
+                await asyncio.sleep(30)
+
+reminder_scheduler = ReminderScheduler()
+
+# Overdue sweeper
+# An ancla is due at its end_date, or its start_date when it has none; all_day anclas only at the
+# end of that day. Recurring anclas never go overdue.
+OVERDUE_JOB = "overdue_sweeper"
+DUE_FIELDS = {"start_date", "end_date", "repeat_type", "all_day"}
+ALL_DAY_LENGTH = timedelta(days=1)
+
+def ancla_due_status(ancla: Dict[str, Any], now: datetime) -> str:
+    """Status a new or rescheduled ancla should have at `now`"""
+    status = ancla.get("status", AnclaStatus.ACTIVE.value)
+    if status not in (AnclaStatus.ACTIVE.value, AnclaStatus.OVERDUE.value):
+        return status
+    due = ancla.get("end_date") or ancla.get("start_date")
+    if ancla.get("repeat_type") in RECURRING_TYPES or due is None:
+        return AnclaStatus.ACTIVE.value
+    due = to_naive_utc(due) + (ALL_DAY_LENGTH if ancla.get("all_day") else timedelta(0))
+    return AnclaStatus.ACTIVE.value if due > now else AnclaStatus.OVERDUE.value
+
+def rescheduling_update(fields: Dict[str, Any], now: datetime):
+    """Update document for an ancla edit; date edits also re-derive active/overdue in the same write.
+
+    The sweeper only looks at due dates past its high-water mark, so an edit that moves an
+    ancla into the past (or an overdue one back into the future) has to settle the status itself.
+    """
+    if not DUE_FIELDS & fields.keys():
+        return {"$set": fields}
+    due = {"$ifNull": ["$end_date", "$start_date"]}
+    # all_day anclas are due a day after their date, so their date is compared with a day earlier
+    cutoff = {"$cond": [{"$eq": ["$all_day", True]}, now - ALL_DAY_LENGTH, now]}
+    open_status = {"$in": ["$status", [AnclaStatus.ACTIVE.value, AnclaStatus.OVERDUE.value]]}
+    return [
+        {"$set": {field: {"$literal": value} for field, value in fields.items()}},
+        {"$set": {"status": {"$switch": {
+            "branches": [
+                {"case": {"$not": [open_status]}, "then": "$status"},
+                {"case": {"$in": ["$repeat_type", RECURRING_TYPES]}, "then": AnclaStatus.ACTIVE.value},
+                {"case": {"$lte": [due, cutoff]}, "then": AnclaStatus.OVERDUE.value},
+            ],
+            "default": AnclaStatus.ACTIVE.value
+        }}}}
+    ]
+
+class OverdueSweeper:
+    """Periodically flips active anclas whose due date has passed to overdue.
+
+    Each tick covers only the window between the previous tick's high-water mark and now,
+    read from the (status, end_date, start_date) index and flipped with a single update_many,
+    so the dashboard can list overdue anclas by status alone. The mark is checkpointed in
+    batch_checkpoints; without one the first tick catches up on everything already due.
+    """
+    INTERVAL = timedelta(seconds=int(os.environ.get("OVERDUE_SWEEP_SECONDS", "60")))
+
+    def __init__(self, database):
+        self.database = database
+        self.high_water = None
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    @staticmethod
+    def due_query(since: Optional[datetime], until: datetime) -> Dict[str, Any]:
+        def window(shift: timedelta) -> Dict[str, Any]:
+            return {"$gt": since - shift, "$lte": until - shift} if since else {"$lte": until - shift}
+        # all_day anclas fall due a day after their date, so their window is a day earlier
+        timed, all_day = window(timedelta(0)), window(ALL_DAY_LENGTH)
+        return {
+            "status": AnclaStatus.ACTIVE.value,
+            "repeat_type": {"$nin": RECURRING_TYPES},
+            "$or": [
+                {"all_day": {"$ne": True}, "end_date": timed},
+                {"all_day": {"$ne": True}, "end_date": None, "start_date": timed},
+                {"all_day": True, "end_date": all_day},
+                {"all_day": True, "end_date": None, "start_date": all_day},
+            ]
+        }
+
+    async def sweep(self, now: Optional[datetime] = None) -> int:
+        """Flip anclas that fell due since the last sweep; returns how many changed"""
+        now = now or datetime.utcnow()
+        if self.high_water is None:
+            checkpoint = await self.database.batch_checkpoints.find_one({"_id": OVERDUE_JOB})
+            self.high_water = checkpoint["high_water"] if checkpoint else None
+
+        query = self.due_query(self.high_water, now)
+        user_ids = await self.database.anclas.distinct("user_id", query)
+        modified = 0
+        if user_ids:
+            result = await self.database.anclas.update_many(query, {"$set": {"status": AnclaStatus.OVERDUE.value}})
+            modified = result.modified_count
+            # Dashboards cached under the old data version must not revalidate as unchanged
+            await self.database.user_data_versions.bulk_write(
+                [UpdateOne({"user_id": user_id}, {"$inc": {"version": 1}}, upsert=True) for user_id in user_ids],
+                ordered=False
+            )
+        await self.database.batch_checkpoints.update_one(
+            {"_id": OVERDUE_JOB}, {"$set": {"high_water": now, "updated_at": now}}, upsert=True
+        )
+        self.high_water = now
+        return modified
+
+    async def run(self):
+        while True:
+            try:
+                modified = await self.sweep()
+                if modified:
+                    logger.info(f"Overdue sweeper: {modified} anclas marked overdue")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Overdue sweeper error: {e}")
+            await asyncio.sleep(self.INTERVAL.total_seconds())
+
+overdue_sweeper = OverdueSweeper(db)
+
+# Export routes
+EXPORT_BATCH_SIZE = 500
+# The first chunk is flushed early so the download starts before a whole batch is read
+EXPORT_FIRST_BATCH_SIZE = 10
+
+# Columns written per collection; NDJSON exports every stored field except _id
+EXPORT_FIELDS = {
+    "transactions": ["id", "type", "category", "description", "amount", "date", "created_at"],
+    "anclas": [
+        "id", "title", "description", "type", "priority", "category_id", "status", "repeat_type",
+        "all_day", "start_date", "end_date", "start_time", "end_time", "alert_enabled", "alert_time",
+        "created_at", "completed_at"
+    ],
+    "diary_entries": ["id", "content", "mood", "date", "created_at"],
+}
+
+def export_cell(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def export_ndjson_batches(user_id: str, collections: List[str]):
+    lines = []
+    flush_at = EXPORT_FIRST_BATCH_SIZE
+    for name in collections:
+        cursor = db[name].find({"user_id": user_id}, NO_ID).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+        async for doc in cursor:
+            lines.append(dumps({"collection": name, "document": doc}))
+            if len(lines) >= flush_at:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+                flush_at = EXPORT_BATCH_SIZE
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+async def export_csv_batches(user_id: str, collection: str):
+    fields = EXPORT_FIELDS[collection]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    # The header goes out before the query runs
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    rows = 0
+
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    cursor = db[collection].find({"user_id": user_id}, projection).sort("created_at", 1).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        writer.writerow({k: export_cell(v) for k, v in doc.items()})
+        rows += 1
+        if rows == EXPORT_FIRST_BATCH_SIZE or rows % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+@api_router.get("/export/{user_id}")
+async def export_user_data(user_id: str, format: str = "ndjson", collections: str = "transactions,anclas,diary_entries"):
+    """Stream a user's history as NDJSON (all collections) or CSV (one collection)"""
+    requested = [name.strip() for name in collections.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in EXPORT_FIELDS]
+    if not requested or unknown:
+        raise HTTPException(status_code=400, detail=f"Colecciones no exportables: {', '.join(unknown) or collections}")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Formato no soportado, usa ndjson o csv")
+    if format == "csv" and len(requested) != 1:
+        raise HTTPException(status_code=400, detail="La exportación CSV admite una sola colección")
+
+    user = await db.users.find_one({"id": user_id}, {"_id": 0, "id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    if format == "csv":
+        filename = f"anclora-{requested[0]}-{user_id}.csv"
+        body = export_csv_batches(user_id, requested[0])
+        media_type = "text/csv"
+    else:
+        filename = f"anclora-export-{user_id}.ndjson"
+        body = export_ndjson_batches(user_id, requested)
+        media_type = "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 # AI Financial Recommendations Engine
 class FinancialAIEngine:
@@ -1170,29 +2941,15 @@ class FinancialAIEngine:
     
     @staticmethod
     def analyze_spending_patterns(transactions, user_profile):
-        """Analyze user spending patterns and detect anomalies"""
+        """Analyze user spending patterns and detect anomalies
+
+        Columnar implementation: expenses are loaded once into amount, category-code and
+        month-ordinal arrays and every statistic is a grouped reduction over them.
+        np.bincount accumulates in input order, so sums match a left-to-right Python loop exactly.
+        """
         if not transactions:
             return {}
         
-        # Calculate category totals and averages
-        category_spending = {}
-        monthly_totals = {}
-        
-        for transaction in transactions:
-            if transaction.get('type') == 'expense':
-                category = transaction.get('category', 'Other')
-                amount = transaction.get('amount', 0)
-                month = transaction.get('created_at', datetime.now()).strftime('%Y-%m')
-                
-                if category not in category_spending:
-                    category_spending[category] = []
-                category_spending[category].append(amount)
-                
-                if month not in monthly_totals:
-                    monthly_totals[month] = 0
-                monthly_totals[month] += amount
-        
-        # Calculate statistics
         patterns = {
             'category_averages': {},
             'category_trends': {},
@@ -1200,15 +2957,48 @@ class FinancialAIEngine:
             'monthly_growth': 0
         }
         
-        for category, amounts in category_spending.items():
-            patterns['category_averages'][category] = sum(amounts) / len(amounts)
-            patterns['spending_volatility'][category] = max(amounts) - min(amounts) if len(amounts) > 1 else 0
+        expenses = [t for t in transactions if t.get('type') == 'expense']
+        if not expenses:
+            return patterns
+        
+        now = datetime.now()
+        amounts = np.fromiter((t.get('amount', 0) for t in expenses), dtype=np.float64, count=len(expenses))
+        # factorize keeps categories in order of first appearance, like the dicts it replaces
+        codes, categories = pd.factorize(
+            np.array([t.get('category', 'Other') for t in expenses], dtype=object), use_na_sentinel=False
+        )
+        # year * 12 + month orders exactly like the '%Y-%m' keys, without formatting a string per row
+        months = np.fromiter(
+            (moment.year * 12 + moment.month for moment in (t.get('created_at', now) for t in expenses)),
+            dtype=np.int64, count=len(expenses)
+        )
+        
+        # Category averages and ranges
+        counts = np.bincount(codes)
+        sums = np.bincount(codes, weights=amounts)
+        order = np.argsort(codes, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        maxima = np.maximum.reduceat(amounts[order], starts)
+        minima = np.minimum.reduceat(amounts[order], starts)
+        volatility = np.where(counts > 1, maxima - minima, 0.0)
+        # The loop returned ints for categories stored with integer amounts (and a plain 0 for
+        # single-row categories); keep those types so stored insights and JSON stay the same
+        float_rows = np.fromiter((not isinstance(t.get('amount', 0), int) for t in expenses), dtype=bool, count=len(expenses))
+        integral = (np.bincount(codes, weights=float_rows) == 0) | (counts == 1)
+
+        categories = list(categories)
+        patterns['category_averages'] = dict(zip(categories, (sums / counts).tolist()))
+        patterns['spending_volatility'] = {
+            category: int(value) if is_integral else value
+            for category, value, is_integral in zip(categories, volatility.tolist(), integral.tolist())
+        }
         
         # Calculate monthly growth
-        if len(monthly_totals) >= 2:
-            months = sorted(monthly_totals.keys())
-            last_month = monthly_totals[months[-1]]
-            prev_month = monthly_totals[months[-2]]
+        month_ordinals, month_codes = np.unique(months, return_inverse=True)
+        if len(month_ordinals) >= 2:
+            monthly_totals = np.bincount(month_codes, weights=amounts)
+            last_month = float(monthly_totals[-1])
+            prev_month = float(monthly_totals[-2])
             patterns['monthly_growth'] = ((last_month - prev_month) / prev_month) * 100 if prev_month > 0 else 0
         
         return patterns
@@ -1259,8 +3049,11 @@ class FinancialAIEngine:
         return recommendations
     
     @staticmethod
-    def generate_alert_recommendations(current_spending, budget_limits, user_profile):
-        """Generate intelligent spending alerts"""
+    def generate_alert_recommendations(current_spending, budget_limits, user_profile, anomalies=None):
+        """Generate intelligent spending alerts
+
+        `anomalies` are recent outliers flagged by record_spending, newest first; each category alerts once.
+        """
         recommendations = []
         
         for limit in budget_limits:
@@ -1284,6 +3077,25 @@ class FinancialAIEngine:
                     maritime_theme="⚠️ Marea alta detectada"
                 ))
         
+        alerted = set()
+        for flagged in anomalies or []:
+            category = flagged.get('category', '')
+            if category in alerted:
+                continue
+            alerted.add(category)
+            
+            recommendations.append(AIRecommendation(
+                user_id="",
+                type="alert",
+                category=category,
+                title=f"🌊 Ola de Gasto Inusual en {category}",
+                message=f"Un gasto de ${flagged.get('amount', 0):.0f} en '{category}' se sale de tu rumbo habitual (lo normal ronda ${flagged.get('median', 0):.0f})",
+                action_suggestion="Revisar si fue un gasto puntual o ajustar el presupuesto de la categoría",
+                priority=4,
+                confidence_score=0.8,
+                maritime_theme="🌊 Ola inesperada"
+            ))
+        
         return recommendations
     
     @staticmethod
@@ -1383,6 +3195,411 @@ class FinancialAIEngine:
         
         return profile_recommendations.get(user_profile, profile_recommendations['professional'])
 
+# AI recommendation pipeline
+# Insights are computed once per data change and cached in ai_insights; every write that can
+# change them bumps data_version, and a read recomputes only when computed_version lags behind.
+AI_ANALYSIS_DAYS = 90
+AI_TOP_RECOMMENDATIONS = 5
+AI_TRANSACTION_FIELDS = {"_id": 0, "type": 1, "category": 1, "amount": 1, "created_at": 1}
+
+async def invalidate_ai_insights(user_id: str):
+    await db.ai_insights.update_one({"user_id": user_id}, {"$inc": {"data_version": 1}}, upsert=True)
+
+def ai_insights_stale(cache: Optional[Dict[str, Any]]) -> bool:
+    if not cache or "insights" not in cache:
+        return True
+    return cache.get("computed_version", 0) != cache.get("data_version", 0)
+
+def recommendation_id(user_id: str, recommendation: Dict[str, Any]) -> str:
+    # Stable ids let a recomputation keep the status the user already gave a recommendation
+    key = f"{user_id}:{recommendation['type']}:{recommendation['category']}:{recommendation['title']}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+def build_ai_insights(profile: str, transactions: List[Dict[str, Any]], budget_limits: List[Dict[str, Any]],
+                      savings_goals: List[Dict[str, Any]], anomalies: List[Dict[str, Any]], now: datetime):
+    """Run FinancialAIEngine over one user's data. Pure and picklable, so batch jobs can run it in worker processes.
+
+    Returns the cached insights document and the recommendations as plain dicts.
+    """
+    patterns = FinancialAIEngine.analyze_spending_patterns(transactions, profile)
+    current_month = month_start(now)
+    current_spending = {}
+    income_data = []
+    expenses = 0
+    for t in transactions:
+        amount = t.get("amount", 0)
+        if t.get("type") == "income":
+            income_data.append(amount)
+        elif t.get("type") == "expense":
+            expenses += amount
+            if t.get("created_at") and t["created_at"] >= current_month:
+                category = t.get("category")
+                current_spending[category] = current_spending.get(category, 0) + amount
+    budget_data = {"net_balance": sum(income_data) - expenses}
+    # Goals without a target would divide by zero in the engine
+    measurable_goals = [g for g in savings_goals if g.get("target_amount")]
+
+    recommendations = (
+        FinancialAIEngine.generate_savings_recommendations(patterns, profile, budget_limits)
+        + FinancialAIEngine.generate_alert_recommendations(current_spending, budget_limits, profile, anomalies)
+        + FinancialAIEngine.generate_goal_recommendations(measurable_goals, income_data, profile)
+    )
+    insights = {
+        "analysis_period": f"{AI_ANALYSIS_DAYS}d",
+        "spending_health_score": FinancialAIEngine.calculate_financial_health_score(patterns, budget_data, savings_goals),
+        "spending_patterns": patterns,
+        "financial_goals_analysis": FinancialAIEngine.generate_personalized_insights(profile, {
+            "transactions": transactions, "budget_limits": budget_limits, "savings_goals": savings_goals
+        }),
+        "created_at": now
+    }
+    return insights, [r.dict(exclude={"id", "status", "created_at"}) for r in recommendations]
+
+def ai_insights_operations(user_id: str, insights: Dict[str, Any], recommendations: List[Dict[str, Any]],
+                           data_version: int, now: datetime):
+    """Bulk write operations persisting one user's result: (ai_recommendations ops, ai_insights op)"""
+    operations, ids = [], []
+    for recommendation in recommendations:
+        content = dict(recommendation, user_id=user_id)
+        ids.append(recommendation_id(user_id, recommendation))
+        operations.append(UpdateOne(
+            {"id": ids[-1]},
+            {"$set": content, "$setOnInsert": {"status": RecommendationStatus.ACTIVE.value, "created_at": now}},
+            upsert=True
+        ))
+    # Active recommendations that no longer apply are dropped; acted-on ones stay as history
+    operations.append(DeleteMany({
+        "user_id": user_id,
+        "status": RecommendationStatus.ACTIVE.value,
+        "id": {"$nin": ids}
+    }))
+    insights_operation = UpdateOne(
+        {"user_id": user_id},
+        {"$set": {"insights": insights, "computed_version": data_version}},
+        upsert=True
+    )
+    return operations, insights_operation
+
+async def compute_ai_insights(user_id: str, profile: str) -> Dict[str, Any]:
+    """Run FinancialAIEngine over the user's recent data and persist the result"""
+    cache = await db.ai_insights.find_one({"user_id": user_id}, {"_id": 0, "data_version": 1})
+    data_version = (cache or {}).get("data_version", 0)
+
+    now = datetime.utcnow()
+    since = now - timedelta(days=AI_ANALYSIS_DAYS)
+    transactions, budget_limits, savings_goals, anomalies = await asyncio.gather(
+        db.transactions.find({"user_id": user_id, "created_at": {"$gte": since}}, AI_TRANSACTION_FIELDS).to_list(None),
+        db.budget_limits.find({"user_id": user_id}, NO_ID).to_list(1000),
+        db.savings_goals.find({"user_id": user_id}, NO_ID).to_list(1000),
+        recent_anomalies(db, [user_id], now)
+    )
+    insights, recommendations = build_ai_insights(profile, transactions, budget_limits, savings_goals, anomalies, now)
+
+    recommendation_ops, insights_op = ai_insights_operations(user_id, insights, recommendations, data_version, now)
+    await db.ai_recommendations.bulk_write(recommendation_ops, ordered=False)
+    await db.ai_insights.bulk_write([insights_op])
+    return insights
+
+async def get_user_recommendations(user_id: str) -> List[Dict[str, Any]]:
+    return await db.ai_recommendations.find({"user_id": user_id}, NO_ID).sort("priority", DESCENDING).to_list(1000)
+
+@api_router.get("/ai-recommendations/{user_id}")
+async def get_ai_recommendations(user_id: str):
+    """Serve the cached AIInsights for a user, recomputing them only after their financial data changed"""
+    user, cache, recommendations = await asyncio.gather(
+        db.users.find_one({"id": user_id}, {"_id": 0, "profile": 1}),
+        db.ai_insights.find_one({"user_id": user_id}, NO_ID),
+        get_user_recommendations(user_id)
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    if ai_insights_stale(cache):
+        insights = await compute_ai_insights(user_id, user.get("profile"))
+        recommendations = await get_user_recommendations(user_id)
+    else:
+        insights = cache["insights"]
+
+    active = [r for r in recommendations if r.get("status") == RecommendationStatus.ACTIVE.value]
+    ai_insights = AIInsights(
+        user_id=user_id,
+        analysis_period=insights["analysis_period"],
+        total_recommendations=len(active),
+        high_priority_count=sum(1 for r in active if r.get("priority", 0) >= 4),
+        potential_monthly_savings=sum(r.get("potential_savings", 0) for r in active if r.get("type") == "savings"),
+        spending_health_score=insights["spending_health_score"],
+        top_recommendations=[AIRecommendation(**r) for r in active[:AI_TOP_RECOMMENDATIONS]],
+        spending_patterns=insights["spending_patterns"],
+        financial_goals_analysis=insights["financial_goals_analysis"],
+        created_at=insights["created_at"]
+    )
+
+    result = ai_insights.dict()
+    result["recommendations"] = recommendations
+    result["financial_health_score"] = ai_insights.spending_health_score
+    result["insights"] = ai_insights.financial_goals_analysis
+    return result
+
+@api_router.post("/ai-recommendations/{recommendation_id}/action")
+async def update_ai_recommendation(recommendation_id: str, payload: AIRecommendationAction):
+    recommendation = await db.ai_recommendations.find_one_and_update(
+        {"id": recommendation_id},
+        {"$set": {"status": payload.action.value, "updated_at": datetime.utcnow()}},
+        projection=NO_ID,
+        return_document=ReturnDocument.AFTER
+    )
+    if not recommendation:
+        raise HTTPException(status_code=404, detail="Recommendation not found")
+    await bump_data_version(recommendation["user_id"])
+    return {"message": "Recommendation updated successfully", "recommendation": recommendation}
+
+# AI chat
+# Local responder: intents.classify picks the topic, and the answer is filled in from the current
+# month's transaction rollups and the cached AI insights. Nothing is recomputed on a chat request.
+CHAT_SUGGESTIONS = {
+    "savings": ["¿Cuáles son mis gastos principales?", "¿Cómo está mi presupuesto?", "Ayúdame a establecer metas"],
+    "expenses": ["¿Cómo puedo ahorrar más dinero?", "¿Cómo está mi presupuesto?", "¿Qué ingresos tengo este mes?"],
+    "budget": ["¿Cuáles son mis gastos principales?", "¿Cómo puedo ahorrar más dinero?", "¿Cuál es mi rumbo financiero?"],
+    "income": ["¿Cuáles son mis gastos principales?", "¿Cómo puedo ahorrar más dinero?", "Ayúdame a establecer metas"],
+    "goals": ["¿Cómo puedo ahorrar más dinero?", "¿Qué ingresos tengo este mes?", "¿Cuál es mi rumbo financiero?"],
+    "health": ["¿Cómo puedo ahorrar más dinero?", "¿Cuáles son mis gastos principales?", "¿Cómo está mi presupuesto?"],
+    "greeting": ["¿Cuál es mi rumbo financiero?", "¿Cómo puedo ahorrar más dinero?", "¿Cuáles son mis gastos principales?"],
+    "general": ["¿Cuál es mi rumbo financiero?", "¿Cuáles son mis gastos principales?", "¿Cómo está mi presupuesto?"],
+}
+CHAT_THEMES = {
+    "savings": "⚓ Anclar ahorros",
+    "expenses": "🧭 Carta de navegación",
+    "budget": "⛵ Ajustar velas",
+    "income": "🌊 Marea de ingresos",
+    "goals": "🏝️ Rumbo a puerto",
+    "health": "🧭 Rumbo financiero",
+    "greeting": "⚓ Bienvenido a bordo",
+    "general": "🧭 Rumbo financiero",
+}
+
+def chat_month_totals(rollups: List[Dict[str, Any]], kind: str) -> List[tuple]:
+    totals = {}
+    for row in rollups:
+        if row["type"] == kind:
+            totals[row["category"]] = totals.get(row["category"], 0) + row["total"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+def compose_chat_answer(intent: str, user: Dict[str, Any], data: Dict[str, Any]) -> str:
+    rollups = data.get("rollups", [])
+    insights = (data.get("insights") or {}).get("insights")
+    expenses = chat_month_totals(rollups, TransactionType.EXPENSE.value)
+    total_expenses = sum(amount for _, amount in expenses)
+
+    if intent == "savings":
+        savings = data.get("recommendations", [])
+        if savings:
+            top = savings[0]
+            total = sum(r.get("potential_savings", 0) for r in savings)
+            return (f"⚓ Tu mejor puerto para ahorrar está en '{top['category']}': podrías anclar unos "
+                    f"${top.get('potential_savings', 0):.0f} al mes. En total veo ${total:.0f} de ahorro posible "
+                    f"en {len(savings)} categorías.")
+        if total_expenses:
+            return (f"⚓ Este mes llevas ${total_expenses:.0f} en gastos. Apartar un 10% (${total_expenses * 0.1:.0f}) "
+                    f"al empezar el mes es la forma más segura de navegar hacia el ahorro.")
+        return "⚓ Aún no tengo gastos tuyos este mes. Registra tus movimientos y te diré dónde anclar ahorros."
+
+    if intent == "expenses":
+        if not expenses:
+            return "🧭 No hay gastos registrados este mes: el mar está en calma."
+        top = ", ".join(f"{category} (${amount:.0f})" for category, amount in expenses[:3])
+        return f"🧭 Este mes has gastado ${total_expenses:.0f}. Tus gastos principales son: {top}."
+
+    if intent == "budget":
+        limits = data.get("budget_limits", [])
+        if not limits:
+            return "⛵ Todavía no tienes límites de presupuesto. Fija uno por categoría para navegar con rumbo claro."
+        spent = dict(expenses)
+        lines = []
+        for limit in limits:
+            limit_amount = limit.get("limit_amount", 0)
+            used = spent.get(limit.get("category"), 0)
+            percentage = (used / limit_amount * 100) if limit_amount > 0 else 0
+            marker = "⚠️ " if percentage >= 80 else ""
+            lines.append(f"{marker}{limit.get('category')}: {percentage:.0f}% (${used:.0f}/${limit_amount:.0f})")
+        return "⛵ Así va tu presupuesto este mes: " + "; ".join(lines) + "."
+
+    if intent == "income":
+        income = chat_month_totals(rollups, TransactionType.INCOME.value)
+        if not income:
+            return "🌊 Aún no hay ingresos registrados este mes."
+        total_income = sum(amount for _, amount in income)
+        sources = ", ".join(f"{category} (${amount:.0f})" for category, amount in income[:3])
+        return (f"🌊 Este mes han entrado ${total_income:.0f}: {sources}. "
+                f"Tu balance del mes es de ${total_income - total_expenses:.0f}.")
+
+    if intent == "goals":
+        goals = data.get("savings_goals", [])
+        if not goals:
+            return "🏝️ No tienes metas de ahorro. Un fondo de emergencia de 3 meses de gastos es un buen primer puerto."
+        progress = "; ".join(
+            f"{g.get('title')}: {g.get('current_amount', 0) / g['target_amount'] * 100:.0f}%"
+            for g in goals if g.get("target_amount")
+        )
+        return f"🏝️ Así navegas hacia tus metas: {progress}."
+
+    if insights:
+        score = insights.get("spending_health_score", 0)
+        # Stored advice may or may not end with a period; end the answer with exactly one
+        advice = insights.get("financial_goals_analysis", {}).get("advice", "").strip().rstrip(".")
+        advice = f" {advice}." if advice else ""
+        if intent == "greeting":
+            return f"⚓ ¡Hola, {user.get('name', 'capitán')}! Tu salud financiera está en {score:.0f}/100.{advice}"
+        return f"🧭 Tu rumbo financiero marca {score:.0f}/100.{advice}"
+    return (f"⚓ ¡Hola, {user.get('name', 'capitán')}! Puedo contarte tus gastos, ingresos, presupuesto "
+            f"y metas de ahorro. Abre tus recomendaciones para que analice tu rumbo.")
+
+@api_router.get("/ai-chat/{user_id}")
+async def ai_chat(user_id: str, question: str = Query("", max_length=500)):
+    """Answer a financial question locally from rollups and cached insights"""
+    intent, confidence = intents.classify(question)
+    now = datetime.utcnow()
+    reads = {"user": db.users.find_one({"id": user_id}, {"_id": 0, "name": 1})}
+    if intent in ("savings", "expenses", "budget", "income"):
+        reads["rollups"] = db.transaction_rollups.find(
+            {"user_id": user_id, "month": month_key(now)}, {"_id": 0, "type": 1, "category": 1, "total": 1}
+        ).to_list(None)
+    if intent == "savings":
+        reads["recommendations"] = db.ai_recommendations.find(
+            {"user_id": user_id, "type": "savings", "status": RecommendationStatus.ACTIVE.value}, NO_ID
+        ).sort("potential_savings", DESCENDING).to_list(AI_TOP_RECOMMENDATIONS)
+    if intent == "budget":
+        reads["budget_limits"] = db.budget_limits.find({"user_id": user_id}, NO_ID).to_list(1000)
+    if intent == "goals":
+        reads["savings_goals"] = db.savings_goals.find({"user_id": user_id}, NO_ID).to_list(1000)
+    if intent in ("health", "greeting", "general"):
+        reads["insights"] = db.ai_insights.find_one({"user_id": user_id}, {"_id": 0, "insights": 1})
+
+    data = dict(zip(reads, await asyncio.gather(*reads.values())))
+    if not data["user"]:
+        raise HTTPException(status_code=404, detail="Usuario no encontrado")
+
+    return {
+        "response": compose_chat_answer(intent, data["user"], data),
+        "suggestions": CHAT_SUGGESTIONS[intent],
+        "maritime_theme": CHAT_THEMES[intent],
+        "confidence": confidence,
+        "intent": intent
+    }
+
+# Batch AI insight recomputation
+# Nightly job: stream users in id order, load each batch's data with one $in query per
+# collection, run build_ai_insights in a process pool and write results back in bulk.
+# Progress is checkpointed per batch, so an interrupted run resumes after the last stored user.
+AI_BATCH_JOB = "ai_insights"
+AI_BATCH_SIZE = 500
+
+def analyze_users_chunk(chunk: List[Dict[str, Any]]) -> List[tuple]:
+    return [
+        (entry["user_id"], *build_ai_insights(
+            entry["profile"], entry["transactions"], entry["budget_limits"], entry["savings_goals"],
+            entry["anomalies"], entry["now"]
+        ))
+        for entry in chunk
+    ]
+
+async def load_ai_batch(database, users: List[Dict[str, Any]], now: datetime) -> List[Dict[str, Any]]:
+    user_ids = [u["id"] for u in users]
+    since = now - timedelta(days=AI_ANALYSIS_DAYS)
+    transactions, budget_limits, savings_goals, anomalies = await asyncio.gather(
+        database.transactions.find(
+            {"user_id": {"$in": user_ids}, "created_at": {"$gte": since}},
+            dict(AI_TRANSACTION_FIELDS, user_id=1)
+        ).to_list(None),
+        database.budget_limits.find({"user_id": {"$in": user_ids}}, NO_ID).to_list(None),
+        database.savings_goals.find({"user_id": {"$in": user_ids}}, NO_ID).to_list(None),
+        recent_anomalies(database, user_ids, now)
+    )
+    loaded = {
+        "transactions": transactions,
+        "budget_limits": budget_limits,
+        "savings_goals": savings_goals,
+        "anomalies": anomalies
+    }
+    grouped = {name: defaultdict(list) for name in loaded}
+    for name, docs in loaded.items():
+        for doc in docs:
+            grouped[name][doc["user_id"]].append(doc)
+    return [
+        {
+            "user_id": u["id"],
+            "profile": u.get("profile"),
+            "transactions": grouped["transactions"][u["id"]],
+            "budget_limits": grouped["budget_limits"][u["id"]],
+            "savings_goals": grouped["savings_goals"][u["id"]],
+            "anomalies": grouped["anomalies"][u["id"]],
+            "now": now
+        }
+        for u in users
+    ]
+
+async def recompute_ai_batch(database, pool: ProcessPoolExecutor, workers: int, users: List[Dict[str, Any]]) -> int:
+    now = datetime.utcnow()
+    user_ids = [u["id"] for u in users]
+    # Versions are read before the data, so writes landing mid-run leave those users stale
+    versions = {
+        doc["user_id"]: doc.get("data_version", 0)
+        async for doc in database.ai_insights.find({"user_id": {"$in": user_ids}}, {"_id": 0, "user_id": 1, "data_version": 1})
+    }
+    entries = await load_ai_batch(database, users, now)
+
+    loop = asyncio.get_running_loop()
+    chunk_size = -(-len(entries) // workers)
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+    results = await asyncio.gather(*(loop.run_in_executor(pool, analyze_users_chunk, chunk) for chunk in chunks))
+
+    recommendation_ops, insights_ops = [], []
+    for user_id, insights, recommendations in itertools.chain.from_iterable(results):
+        ops, insights_op = ai_insights_operations(user_id, insights, recommendations, versions.get(user_id, 0), now)
+        recommendation_ops.extend(ops)
+        insights_ops.append(insights_op)
+    await asyncio.gather(
+        database.ai_recommendations.bulk_write(recommendation_ops, ordered=False),
+        database.ai_insights.bulk_write(insights_ops, ordered=False)
+    )
+    await database.batch_checkpoints.update_one(
+        {"_id": AI_BATCH_JOB},
+        {"$set": {"last_user_id": user_ids[-1], "updated_at": now}, "$inc": {"processed": len(users)}},
+        upsert=True
+    )
+    return len(users)
+
+async def recompute_all_ai_insights(database, batch_size: int = AI_BATCH_SIZE, workers: Optional[int] = None,
+                                    restart: bool = False) -> Dict[str, Any]:
+    """Recompute cached AI insights for every user, resuming from the last checkpoint unless restart is set"""
+    workers = workers or os.cpu_count() or 1
+    if restart:
+        await database.batch_checkpoints.delete_one({"_id": AI_BATCH_JOB})
+    checkpoint = await database.batch_checkpoints.find_one({"_id": AI_BATCH_JOB})
+    query = {"id": {"$gt": checkpoint["last_user_id"]}} if checkpoint else {}
+    if checkpoint:
+        logger.info(f"Resuming AI insight recomputation after user {checkpoint['last_user_id']}")
+
+    processed = 0
+    started = time.perf_counter()
+    # spawn keeps workers free of the parent's Motor threads and sockets
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        cursor = database.users.find(query, {"_id": 0, "id": 1, "profile": 1}).sort("id", ASCENDING).batch_size(batch_size)
+        batch = []
+        async for user in cursor:
+            batch.append(user)
+            if len(batch) == batch_size:
+                processed += await recompute_ai_batch(database, pool, workers, batch)
+                batch = []
+                elapsed = time.perf_counter() - started
+                logger.info(f"AI insights: {processed} users, {processed / elapsed:.1f} users/sec")
+        if batch:
+            processed += await recompute_ai_batch(database, pool, workers, batch)
+
+    # A finished run clears its checkpoint so the next one starts from the first user
+    await database.batch_checkpoints.delete_one({"_id": AI_BATCH_JOB})
+    elapsed = time.perf_counter() - started
+    return {"users": processed, "seconds": elapsed, "users_per_second": processed / elapsed if elapsed else 0.0}
+
 # Include the router in the main app
 app.include_router(api_router)
 
@@ -1392,6 +3609,15 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
+# Outermost, so latency covers CORS handling too. Requests issuing more MongoDB commands
+# than N_PLUS_ONE_QUERY_THRESHOLD are logged as possible N+1 patterns.
+app.add_middleware(
+    MetricsMiddleware,
+    registry=metrics_registry,
+    query_threshold=int(os.environ.get("N_PLUS_ONE_QUERY_THRESHOLD", "5")),
 )
 
 # Configure logging
@@ -1401,6 +3627,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def provision_indexes():
+    # INDEX_MODE: "apply" (default) creates missing indexes, "check" only reports them, "off" skips
+    index_mode = os.environ.get("INDEX_MODE", "apply").lower()
+    if index_mode == "off":
+        return
+    try:
+        report = await ensure_indexes(db, check_only=(index_mode == "check"))
+    except Exception as e:
+        logger.error(f"Index provisioning skipped: {e}")
+        return
+    log_index_report(report)
+
+@app.on_event("startup")
+async def bootstrap_transaction_rollups():
+    # First deploy with rollups: build them once so analytics see existing history
+    try:
+        if await db.transaction_rollups.estimated_document_count() == 0 \
+                and await db.transactions.estimated_document_count() > 0:
+            count = await rebuild_transaction_rollups(db)
+            logger.info(f"Built transaction rollups: {count} documents")
+    except Exception as e:
+        logger.error(f"Transaction rollup bootstrap skipped: {e}")
+
+@app.on_event("startup")
+async def start_reminder_scheduler():
+    # REMINDER_SCHEDULER=off disables server-side reminders (e.g. for one-off maintenance processes)
+    if os.environ.get("REMINDER_SCHEDULER", "on").lower() != "off":
+        reminder_scheduler.start()
+
+@app.on_event("startup")
+async def start_overdue_sweeper():
+    # OVERDUE_SWEEPER=off leaves status changes to another process running the sweeper
+    if os.environ.get("OVERDUE_SWEEPER", "on").lower() != "off":
+        overdue_sweeper.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await asyncio.gather(reminder_scheduler.stop(), overdue_sweeper.stop())
     client.close()
\ No newline at end of file
@@ -1053,35 +1053,30 @@ class AncloraBackendTest(unittest.TestCase):
         
         logger.info("Error handling tests completed")
 
-    def test_35_ai_recommendations_endpoints_missing(self):
-        """Test AI Financial Recommendations endpoints - CRITICAL: These endpoints are not implemented"""
-        logger.info("Testing AI Financial Recommendations endpoints...")
+    def test_35_ai_recommendations_unknown_ids(self):
+        """Test AI Financial Recommendations endpoints reject unknown users and recommendations"""
+        logger.info("Testing AI Financial Recommendations endpoints with unknown ids...")
         
-        # Use a test user ID - doesn't matter since endpoints don't exist
         test_user_id = "test-user-id"
         
-        # Test GET /api/ai-recommendations/{user_id} - Should exist but doesn't
+        # GET /api/ai-recommendations/{user_id} - unknown user
         response = requests.get(f"{API_URL}/ai-recommendations/{test_user_id}")
-        self.assertEqual(response.status_code, 404, f"AI recommendations endpoint should not exist yet but got {response.status_code}")
-        logger.error(f"CRITICAL: GET /api/ai-recommendations/{test_user_id} endpoint is not implemented")
+        self.assertEqual(response.status_code, 404, f"Expected 404 for unknown user but got {response.status_code}")
         
-        # Test GET /api/ai-chat/{user_id} - Should exist but doesn't  
-        response = requests.get(f"{API_URL}/ai-chat/{test_user_id}")
-        self.assertEqual(response.status_code, 404, f"AI chat endpoint should not exist yet but got {response.status_code}")
-        logger.error(f"CRITICAL: GET /api/ai-chat/{test_user_id} endpoint is not implemented")
+        # GET /api/ai-chat/{user_id} - unknown user
+        response = requests.get(f"{API_URL}/ai-chat/{test_user_id}", params={"question": "hola"})
+        self.assertEqual(response.status_code, 404, f"Expected 404 for unknown user but got {response.status_code}")
         
-        # Test POST /api/ai-recommendations/{recommendation_id}/action - Should exist but doesn't
+        # POST /api/ai-recommendations/{recommendation_id}/action - unknown recommendation
         fake_recommendation_id = "test-recommendation-id"
         response = requests.post(f"{API_URL}/ai-recommendations/{fake_recommendation_id}/action", json={"action": "completed"})
-        self.assertEqual(response.status_code, 404, f"AI recommendation action endpoint should not exist yet but got {response.status_code}")
-        logger.error(f"CRITICAL: POST /api/ai-recommendations/{fake_recommendation_id}/action endpoint is not implemented")
-        
-        logger.error("CRITICAL FINDING: All AI Financial Recommendations endpoints are missing from the backend implementation")
-        logger.error("The FinancialAIEngine class is defined but no API routes use it")
-        logger.error("Required endpoints to implement:")
-        logger.error("1. GET /api/ai-recommendations/{user_id} - Generate financial recommendations")
-        logger.error("2. GET /api/ai-chat/{user_id} - AI chat system with financial questions")
-        logger.error("3. POST /api/ai-recommendations/{recommendation_id}/action - Update recommendation status")
+        self.assertEqual(response.status_code, 404, f"Expected 404 for unknown recommendation but got {response.status_code}")
+        
+        # Unknown actions are rejected by validation
+        response = requests.post(f"{API_URL}/ai-recommendations/{fake_recommendation_id}/action", json={"action": "archived"})
+        self.assertEqual(response.status_code, 422)
+        
+        logger.info("AI recommendation endpoints reject unknown ids")
 
     def test_36_comprehensive_ai_system_testing(self):
         """Comprehensive test for AI Financial Recommendations system when implemented"""
@@ -1397,6 +1392,152 @@ class AncloraBackendTest(unittest.TestCase):
         
         logger.info("AI personalized insights testing completed")
 
+    def test_39_transactions_cursor_pagination(self):
+        """Test keyset pagination of transactions with limit and cursor"""
+        user_id = self.user_ids["freelancer"]
+        for i in range(5):
+            transaction_data = {
+                "type": "expense",
+                "category": "Herramientas",
+                "description": f"Pagination test {i}",
+                "amount": 10.0 + i,
+                "date": date.today().isoformat()
+            }
+            response = requests.post(f"{API_URL}/transactions?user_id={user_id}", json=transaction_data)
+            self.assertEqual(response.status_code, 200, f"Failed to create transaction: {response.text}")
+
+        seen_ids = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = requests.get(f"{API_URL}/transactions/{user_id}", params=params)
+            self.assertEqual(response.status_code, 200, f"Failed to page transactions: {response.text}")
+            page = response.json()
+            self.assertLessEqual(len(page), 2, "Page is larger than the requested limit")
+            seen_ids.extend(t["id"] for t in page)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        self.assertGreaterEqual(len(seen_ids), 5, "Expected to page through all transactions")
+        self.assertEqual(len(seen_ids), len(set(seen_ids)), "Pages returned duplicate transactions")
+
+        response = requests.get(f"{API_URL}/transactions/{user_id}", params={"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400, "Expected 400 for an invalid cursor")
+        logger.info(f"Paged through {len(seen_ids)} transactions for freelancer")
+
+    def test_40_timeline_window_query(self):
+        """Test fetching anclas for a timeline window bucketed per day"""
+        user_id = self.user_ids["student"]
+        category_key = next(key for key in self.category_ids.keys() if key.startswith("student"))
+        window_start = datetime(2030, 3, 1)
+
+        for day in (3, 3, 10):
+            ancla_data = {
+                "title": f"Window ancla day {day}",
+                "description": "Timeline window test",
+                "type": "event",
+                "priority": "informative",
+                "category_id": self.category_ids[category_key],
+                "start_date": datetime(2030, 3, day, 9, 0).isoformat()
+            }
+            response = requests.post(f"{API_URL}/anclas?user_id={user_id}", json=ancla_data)
+            self.assertEqual(response.status_code, 200, f"Failed to create ancla: {response.text}")
+
+        params = {"user_id": user_id, "from": window_start.isoformat(), "to": datetime(2030, 4, 1).isoformat()}
+        response = requests.get(f"{API_URL}/anclas", params=params)
+        self.assertEqual(response.status_code, 200, f"Failed to query timeline window: {response.text}")
+
+        window = response.json()
+        self.assertEqual(window["total"], 3, "Expected 3 anclas in the window")
+        self.assertEqual([day["date"] for day in window["days"]], ["2030-03-03", "2030-03-10"])
+        self.assertEqual(len(window["days"][0]["anclas"]), 2, "Expected 2 anclas on 2030-03-03")
+
+        # One bound with an offset and one without are both read as UTC instead of failing to compare
+        mixed = {**params, "to": "2030-04-01T00:00:00+00:00"}
+        response = requests.get(f"{API_URL}/anclas", params=mixed)
+        self.assertEqual(response.status_code, 200, f"Mixed naive/aware bounds failed: {response.text}")
+        self.assertEqual(response.json()["total"], 3)
+
+        params["to"] = params["from"]
+        response = requests.get(f"{API_URL}/anclas", params=params)
+        self.assertEqual(response.status_code, 400, "Expected 400 for an empty window")
+        logger.info("Timeline window query verified")
+
+    def test_41_recurring_ancla_occurrences(self):
+        """Test that recurring anclas are expanded in timeline windows with per-occurrence completion"""
+        user_id = self.user_ids["professional"]
+        category_key = next(key for key in self.category_ids.keys() if key.startswith("professional"))
+        ancla_data = {
+            "title": "Daily stand-up",
+            "description": "Recurring ancla test",
+            "type": "event",
+            "priority": "important",
+            "category_id": self.category_ids[category_key],
+            "repeat_type": "daily",
+            "start_date": datetime(2031, 1, 1, 9, 0).isoformat()
+        }
+        response = requests.post(f"{API_URL}/anclas?user_id={user_id}", json=ancla_data)
+        self.assertEqual(response.status_code, 200, f"Failed to create recurring ancla: {response.text}")
+        ancla_id = response.json()["id"]
+
+        occurrence_date = datetime(2031, 2, 3, 9, 0).isoformat()
+        response = requests.post(f"{API_URL}/anclas/{ancla_id}/occurrences/complete",
+                                 params={"occurrence_date": occurrence_date})
+        self.assertEqual(response.status_code, 200, f"Failed to complete occurrence: {response.text}")
+
+        params = {"user_id": user_id, "from": datetime(2031, 2, 1).isoformat(), "to": datetime(2031, 2, 8).isoformat()}
+        response = requests.get(f"{API_URL}/anclas", params=params)
+        self.assertEqual(response.status_code, 200, f"Failed to query timeline window: {response.text}")
+
+        occurrences = [a for day in response.json()["days"] for a in day["anclas"] if a["id"] == ancla_id]
+        self.assertEqual(len(occurrences), 7, "Expected one occurrence per day in the window")
+        completed = [a["occurrence_date"] for a in occurrences if a["status"] == "completed"]
+        self.assertEqual(completed, [occurrence_date], "Only the completed occurrence should be marked")
+
+        response = requests.post(f"{API_URL}/anclas/{ancla_id}/occurrences/complete",
+                                 params={"occurrence_date": datetime(2031, 2, 3, 10, 0).isoformat()})
+        self.assertEqual(response.status_code, 400, "Expected 400 for a date that is not an occurrence")
+        logger.info("Recurring ancla expansion verified")
+
+    def test_42_dashboard_conditional_get(self):
+        """Test that the dashboard answers 304 for an unchanged ETag and a fresh body after a write"""
+        user_id = self.user_ids["student"]
+        response = requests.get(f"{API_URL}/users/{user_id}/dashboard")
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag, "Dashboard response should carry an ETag")
+
+        response = requests.get(f"{API_URL}/users/{user_id}/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304, "Unchanged dashboard should not be resent")
+
+        diary_data = {"content": "ETag check", "mood": "happy"}
+        response = requests.post(f"{API_URL}/diary?user_id={user_id}", json=diary_data)
+        self.assertEqual(response.status_code, 200, f"Failed to create diary entry: {response.text}")
+
+        response = requests.get(f"{API_URL}/users/{user_id}/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200, "A write should change the dashboard ETag")
+        self.assertNotEqual(response.headers.get("ETag"), etag)
+        logger.info("Dashboard conditional GET verified")
+
+    def test_43_habit_weekly_history(self):
+        """Test that habit history returns one slot per week ending with this week's tracking"""
+        habit_id = self.habit_ids.get("new_student")
+        self.assertIsNotNone(habit_id, "Habit from test_05 is required")
+
+        response = requests.get(f"{API_URL}/habits/{habit_id}/history?weeks=4")
+        self.assertEqual(response.status_code, 200, f"Failed to get habit history: {response.text}")
+        weeks = response.json()["weeks"]
+        self.assertEqual(len(weeks), 4)
+        self.assertGreater(weeks[-1]["count"], 0, "Current week should include the tracking from test_06")
+        self.assertLessEqual(weeks[-1]["completion_percentage"], 100)
+
+        response = requests.get(f"{API_URL}/habits/nonexistent-habit/history")
+        self.assertEqual(response.status_code, 404)
+        logger.info("Habit weekly history verified")
+
 if __name__ == "__main__":
     # Run the tests in order
     unittest.main(verbosity=2)
\ No newline at end of file
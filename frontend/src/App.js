@@ -187,7 +187,7 @@ function App() {
 
   const handleUpdateAnclaDate = async (anclaId, newDate) => {
     try {
-      await axios.put(`${API}/anclas/${anclaId}`, { start_date: newDate });
+      await axios.patch(`${API}/anclas/${anclaId}`, { start_date: newDate });
       await loadDashboardData(currentUser.id);
     } catch (error) {
       console.error('Error updating ancla date:', error);
@@ -563,15 +563,15 @@ export const Dashboard = ({
         {/* Stats Cards */}
         <div className="grid grid-cols-1 md:grid-cols-4 gap-4 mt-6">
           <div className="stats-card stats-card-active">
-            <div className="text-2xl font-bold">{data?.anclas?.active?.length || 0}</div>
+            <div className="text-2xl font-bold">{data?.anclas?.counts?.active ?? data?.anclas?.active?.length ?? 0}</div>
             <div className="text-sm opacity-90">Anclas Activas</div>
           </div>
           <div className="stats-card stats-card-completed">
-            <div className="text-2xl font-bold">{data?.anclas?.completed?.length || 0}</div>
+            <div className="text-2xl font-bold">{data?.anclas?.counts?.completed ?? data?.anclas?.completed?.length ?? 0}</div>
             <div className="text-sm opacity-90">Completadas</div>
           </div>
           <div className="stats-card stats-card-overdue">
-            <div className="text-2xl font-bold">{data?.anclas?.overdue?.length || 0}</div>
+            <div className="text-2xl font-bold">{data?.anclas?.counts?.overdue ?? data?.anclas?.overdue?.length ?? 0}</div>
             <div className="text-sm opacity-90">Vencidas</div>
           </div>
           <div className="stats-card stats-card-total">
@@ -647,6 +647,14 @@ export const Dashboard = ({
               {[...data.anclas.completed, ...data.anclas.overdue].map((ancla) => (
                 <AnclaItem key={ancla.id} ancla={ancla} onComplete={onCompleteAncla} />
               ))}
+              {data.anclas.total > data.anclas.active.length + data.anclas.completed.length + data.anclas.overdue.length && (
+                <button
+                  onClick={() => onViewChange('timeline')}
+                  className="btn-secondary w-full mt-2"
+                >
+                  🌊 Ver todas en la Marea de Tiempo
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -828,15 +836,15 @@ export const MobileDashboard = ({
           <div className="mobile-tab-content">
             <div className="mobile-stats-grid">
               <div className="mobile-stat-card active">
-                <div className="stat-number">{data?.anclas?.active?.length || 0}</div>
+                <div className="stat-number">{data?.anclas?.counts?.active ?? data?.anclas?.active?.length ?? 0}</div>
                 <div className="stat-label">Activas</div>
               </div>
               <div className="mobile-stat-card completed">
-                <div className="stat-number">{data?.anclas?.completed?.length || 0}</div>
+                <div className="stat-number">{data?.anclas?.counts?.completed ?? data?.anclas?.completed?.length ?? 0}</div>
                 <div className="stat-label">Completadas</div>
               </div>
               <div className="mobile-stat-card overdue">
-                <div className="stat-number">{data?.anclas?.overdue?.length || 0}</div>
+                <div className="stat-number">{data?.anclas?.counts?.overdue ?? data?.anclas?.overdue?.length ?? 0}</div>
                 <div className="stat-label">Vencidas</div>
               </div>
             </div>
@@ -1979,31 +1987,37 @@ export const Timeline = ({
     weekDays.push(addDays(weekStart, i));
   }
 
-  // Group anclas by date
-  const groupAnclasByDate = (anclas) => {
-    const grouped = {};
-    weekDays.forEach(day => {
-      const dateKey = format(day, 'yyyy-MM-dd');
-      grouped[dateKey] = [];
-    });
+  // The dashboard only carries the latest anclas, so the week is loaded from the window
+  // endpoint, already bucketed per day in the browser's time zone (recurring ones expanded)
+  const [weekBuckets, setWeekBuckets] = useState([]);
 
-    anclas.forEach(ancla => {
-      const anclaDate = format(parseISO(ancla.start_date), 'yyyy-MM-dd');
-      if (grouped[anclaDate]) {
-        grouped[anclaDate].push(ancla);
-      }
+  useEffect(() => {
+    if (!user?.id) return;
+    const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+    const params = new URLSearchParams({
+      user_id: user.id,
+      from: weekStart.toISOString(),
+      to: addDays(weekStart, 7).toISOString(),
+      tz: Intl.DateTimeFormat().resolvedOptions().timeZone || 'UTC'
     });
-
-    return grouped;
-  };
-
-  const allAnclas = [
-    ...(data?.anclas?.active || []),
-    ...(data?.anclas?.completed || []),
-    ...(data?.anclas?.overdue || [])
-  ];
-
-  const groupedAnclas = groupAnclasByDate(allAnclas);
+    let cancelled = false;
+    fetch(`${BACKEND_URL}/api/anclas?${params}`)
+      .then(response => response.json())
+      .then(result => { if (!cancelled) setWeekBuckets(result.days || []); })
+      .catch(error => console.error('Error loading timeline:', error));
+    return () => { cancelled = true; };
+    // data changes after every write, which refreshes the week too
+  }, [user?.id, weekStart.getTime(), data]); // eslint-disable-line react-hooks/exhaustive-deps
+
+  const groupedAnclas = {};
+  weekDays.forEach(day => {
+    groupedAnclas[format(day, 'yyyy-MM-dd')] = [];
+  });
+  weekBuckets.forEach(bucket => {
+    if (groupedAnclas[bucket.date]) {
+      groupedAnclas[bucket.date] = bucket.anclas;
+    }
+  });
 
   const handleDragEnd = (result) => {
     if (!result.destination) return;
@@ -2016,8 +2030,8 @@ export const Timeline = ({
       return;
     }
 
-    // Find the ancla being moved
-    const anclaId = draggableId;
+    // Find the ancla being moved; ids carry the day so recurring occurrences stay unique
+    const anclaId = draggableId.split('@')[0];
     const newDate = destination.droppableId;
 
     // Update the ancla date
@@ -2121,8 +2135,8 @@ export const Timeline = ({
                     >
                       {dayAnclas.map((ancla, anclaIndex) => (
                         <Draggable
-                          key={ancla.id}
-                          draggableId={ancla.id}
+                          key={`${ancla.id}@${dateKey}`}
+                          draggableId={`${ancla.id}@${dateKey}`}
                           index={anclaIndex}
                         >
                           {(provided, snapshot) => (
@@ -2211,11 +2225,11 @@ export const Timeline = ({
       {/* Quick Stats */}
       <div className="timeline-stats">
         <div className="stat-item">
-          <div className="stat-number">{data?.anclas?.active?.length || 0}</div>
+          <div className="stat-number">{data?.anclas?.counts?.active ?? data?.anclas?.active?.length ?? 0}</div>
           <div className="stat-label">Anclas Activas</div>
         </div>
         <div className="stat-item">
-          <div className="stat-number">{data?.anclas?.completed?.length || 0}</div>
+          <div className="stat-number">{data?.anclas?.counts?.completed ?? data?.anclas?.completed?.length ?? 0}</div>
           <div className="stat-label">Completadas</div>
         </div>
         <div className="stat-item">
@@ -0,0 +1,62 @@
+"""Shared setup for the in-process backend tests.
+
+The API runs inside the test process through httpx's ASGI transport (no server, no
+startup hooks) against a scratch database on the MongoDB at TEST_MONGO_URL, which
+defaults to MONGO_URL from backend/.env. The database is dropped before every test;
+tests are skipped when no MongoDB answers.
+"""
+import os
+import sys
+import unittest
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+import server  # noqa: E402
+
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL", server.mongo_url)
+TEST_DB_NAME = os.environ.get("TEST_DB_NAME", "anclora_test")
+
+class ServerTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Motor clients stick to the event loop that first uses them and every test gets a new loop
+        self.mongo = AsyncIOMotorClient(TEST_MONGO_URL, serverSelectionTimeoutMS=2000)
+        try:
+            await self.mongo.admin.command("ping")
+        except PyMongoError:
+            self.mongo.close()
+            self.skipTest(f"No MongoDB at {TEST_MONGO_URL}")
+        await self.mongo.drop_database(TEST_DB_NAME)
+        self.db = self.mongo[TEST_DB_NAME]
+        await server.ensure_indexes(self.db)
+
+        self.saved = server.db, server.response_cache, server.reminder_scheduler
+        server.db = self.db
+        server.response_cache = server.build_response_cache()
+        server.reminder_scheduler = server.ReminderScheduler()
+        self.http = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        await self.http.aclose()
+        server.db, server.response_cache, server.reminder_scheduler = self.saved
+        self.mongo.close()
+
+    async def create_user(self, profile: str = "freelancer") -> str:
+        response = await self.http.post("/api/users", json={
+            "email": f"{uuid.uuid4().hex[:8]}@anclora.test", "name": "Test", "profile": profile
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()["id"]
+
+    async def create_ancla(self, user_id: str, start_date: datetime, **fields) -> dict:
+        response = await self.http.post(f"/api/anclas?user_id={user_id}", json={
+            "title": "Ancla", "description": "", "type": "task", "priority": "important",
+            "category_id": "general", "start_date": start_date.isoformat(), **fields
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
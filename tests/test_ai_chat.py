@@ -0,0 +1,81 @@
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+
+from tests.helpers import ServerTestCase, server
+
+intents = server.intents
+
+class IntentClassifierTest(unittest.TestCase):
+    def test_suggested_questions_map_to_their_intent(self):
+        expected = {
+            "¿Cómo puedo ahorrar más dinero?": "savings",
+            "¿Cuáles son mis gastos principales?": "expenses",
+            "¿Cómo está mi presupuesto?": "budget",
+            "¿Qué ingresos tengo este mes?": "income",
+            "Ayúdame a establecer metas": "goals",
+            "¿Cuál es mi rumbo financiero?": "health",
+            "¡Hola!": "greeting",
+        }
+        for question, intent in expected.items():
+            self.assertEqual(intents.classify(question)[0], intent, question)
+
+    def test_unknown_words_fall_back_to_general(self):
+        self.assertEqual(intents.classify("xyzzy plugh"), (intents.FALLBACK_INTENT, intents.FALLBACK_CONFIDENCE))
+        self.assertEqual(intents.classify(""), (intents.FALLBACK_INTENT, intents.FALLBACK_CONFIDENCE))
+
+class AIChatTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        for kind, category, amount in [("expense", "Ocio", 120.0), ("expense", "Comida", 80.0),
+                                       ("expense", "Ocio", 30.0), ("income", "Nómina", 1000.0)]:
+            response = await self.http.post(f"/api/transactions?user_id={self.user_id}", json={
+                "type": kind, "category": category, "description": category, "amount": amount,
+                "date": date.today().isoformat()
+            })
+            self.assertEqual(response.status_code, 200, response.text)
+
+    async def ask(self, question: str) -> dict:
+        response = await self.http.get(f"/api/ai-chat/{self.user_id}", params={"question": question})
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertEqual(len(body["suggestions"]), 3)
+        return body
+
+    async def test_answers_come_from_the_month_rollups(self):
+        answer = (await self.ask("¿Cuáles son mis gastos principales?"))["response"]
+        self.assertIn("$230", answer)
+        self.assertLess(answer.index("Ocio ($150)"), answer.index("Comida ($80)"))
+
+        answer = (await self.ask("¿Qué ingresos tengo este mes?"))["response"]
+        self.assertIn("Nómina ($1000)", answer)
+        self.assertIn("balance del mes es de $770", answer)
+
+    async def test_budget_and_goals_answers_use_the_user_limits(self):
+        await self.http.post(f"/api/budget-limits?user_id={self.user_id}", json={"category": "Ocio", "limit_amount": 160.0})
+        answer = (await self.ask("¿Cómo está mi presupuesto?"))["response"]
+        self.assertIn("⚠️ Ocio: 94% ($150/$160)", answer)
+
+        await self.http.post(f"/api/savings-goals?user_id={self.user_id}", json={
+            "title": "Viaje", "target_amount": 400.0, "target_date": (date.today() + timedelta(days=90)).isoformat()
+        })
+        goal = (await self.db.savings_goals.find_one({"user_id": self.user_id}))["id"]
+        await self.http.put(f"/api/savings-goals/{goal}/add-money", params={"amount": 100.0})
+        self.assertIn("Viaje: 25%", (await self.ask("¿Cómo van mis metas de ahorro?"))["response"])
+
+    async def test_health_answer_reads_cached_insights_without_recomputing(self):
+        insights = (await self.http.get(f"/api/ai-recommendations/{self.user_id}")).json()
+        with mock.patch.object(server, "build_ai_insights", wraps=server.build_ai_insights) as build:
+            body = await self.ask("¿Cuál es mi rumbo financiero?")
+        build.assert_not_called()
+        self.assertEqual(body["maritime_theme"], server.CHAT_THEMES["health"])
+        self.assertIn(f"{insights['spending_health_score']:.0f}/100", body["response"])
+        self.assertTrue(body["response"].endswith(".") and not body["response"].endswith(".."))
+
+    async def test_unknown_user_is_404(self):
+        response = await self.http.get("/api/ai-chat/missing", params={"question": "hola"})
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from tests.helpers import ServerTestCase, server
+
+class AIRecommendationCacheTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        await self.add_expense(500.0)
+        self.path = f"/api/ai-recommendations/{self.user_id}"
+
+    async def add_expense(self, amount: float):
+        response = await self.http.post(f"/api/transactions?user_id={self.user_id}", json={
+            "type": "expense", "category": "Ocio", "description": "Cena", "amount": amount,
+            "date": date.today().isoformat()
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+
+    async def read(self):
+        response = await self.http.get(self.path)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    async def test_insights_are_computed_once_per_data_change(self):
+        with mock.patch.object(server, "build_ai_insights", wraps=server.build_ai_insights) as build:
+            first = await self.read()
+            await self.read()
+            self.assertEqual(build.call_count, 1, "Unchanged data must be served from ai_insights")
+
+            # Writes outside the financial inputs leave the cache alone
+            await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(days=1))
+            await self.http.post(f"/api/diary?user_id={self.user_id}", json={"content": "Hoy", "mood": "happy"})
+            await self.read()
+            self.assertEqual(build.call_count, 1)
+
+            writes = [
+                lambda: self.add_expense(900.0),
+                lambda: self.http.post(f"/api/budget-limits?user_id={self.user_id}",
+                                       json={"category": "Ocio", "limit_amount": 200.0}),
+                lambda: self.http.post(f"/api/savings-goals?user_id={self.user_id}", json={
+                    "title": "Viaje", "target_amount": 1000.0,
+                    "target_date": (date.today() + timedelta(days=90)).isoformat()
+                }),
+            ]
+            for count, write in enumerate(writes, start=2):
+                await write()
+                await self.read()
+                await self.read()
+                self.assertEqual(build.call_count, count)
+
+        self.assertEqual(first["analysis_period"], f"{server.AI_ANALYSIS_DAYS}d")
+        self.assertTrue(any(r["category"] == "Ocio" and r["type"] == "savings" for r in first["recommendations"]))
+
+    async def test_action_keeps_its_status_across_recomputations(self):
+        recommendation = next(r for r in (await self.read())["top_recommendations"] if r["category"] == "Ocio")
+
+        response = await self.http.post(f"/api/ai-recommendations/{recommendation['id']}/action",
+                                        json={"action": "dismissed"})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["recommendation"]["status"], "dismissed")
+
+        await self.add_expense(900.0)
+        body = await self.read()
+        self.assertNotIn(recommendation["id"], [r["id"] for r in body["top_recommendations"]])
+        statuses = {r["id"]: r["status"] for r in body["recommendations"]}
+        self.assertEqual(statuses[recommendation["id"]], "dismissed")
+
+    async def test_action_on_unknown_recommendation_is_404(self):
+        response = await self.http.post("/api/ai-recommendations/missing/action", json={"action": "completed"})
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == "__main__":
+    unittest.main()
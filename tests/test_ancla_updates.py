@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class AnclaPatchTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        response = await self.http.post(f"/api/notification-settings?user_id={self.user_id}", json={"reminder_time": 10})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.scheduler = server.reminder_scheduler
+        await self.scheduler.refill()
+
+    async def patch(self, ancla_id: str, **fields):
+        response = await self.http.patch(f"/api/anclas/{ancla_id}", json=fields)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    async def test_patch_changes_only_the_sent_fields(self):
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(days=1),
+                                        description="Original", emoji="⚓")
+        before = await self.db.anclas.find_one({"id": ancla["id"]}, {"_id": 0})
+        patched = await self.patch(ancla["id"], title="Nuevo", end_time=None)
+        self.assertEqual(patched["title"], "Nuevo")
+
+        after = await self.db.anclas.find_one({"id": ancla["id"]}, {"_id": 0})
+        self.assertEqual(after, dict(before, title="Nuevo", end_time=None))
+
+    async def test_patch_rejects_empty_and_null_required_fields(self):
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(days=1))
+        self.assertEqual((await self.http.patch(f"/api/anclas/{ancla['id']}", json={})).status_code, 400)
+        response = await self.http.patch(f"/api/anclas/{ancla['id']}", json={"title": None, "start_date": None})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("start_date, title", response.json()["detail"])
+        self.assertEqual((await self.http.patch("/api/anclas/missing", json={"title": "x"})).status_code, 404)
+
+    async def test_moving_the_due_date_settles_status_and_reminder(self):
+        now = datetime.utcnow()
+        ancla = await self.create_ancla(self.user_id, now + timedelta(minutes=30), alert_enabled=True)
+        self.assertEqual(len(self.scheduler), 1)
+
+        # end_date alone moves the ancla into the past: overdue, and its reminder is dropped
+        patched = await self.patch(ancla["id"], end_date=(now - timedelta(hours=1)).isoformat())
+        self.assertEqual(patched["status"], "overdue")
+        self.assertEqual(len(self.scheduler), 0)
+
+        # ...and back into the future: active again, with the reminder rescheduled
+        patched = await self.patch(ancla["id"], end_date=(now + timedelta(hours=2)).isoformat())
+        self.assertEqual(patched["status"], "active")
+        self.assertEqual(len(self.scheduler), 1)
+
+    async def test_completed_anclas_keep_their_status_when_moved(self):
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(days=1))
+        await self.http.post(f"/api/anclas/{ancla['id']}/complete")
+        patched = await self.patch(ancla["id"], start_date=(datetime.utcnow() - timedelta(days=3)).isoformat())
+        self.assertEqual(patched["status"], "completed")
+
+class AnclaBatchPatchTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+
+    async def test_batch_applies_each_update_and_settles_status(self):
+        now = datetime.utcnow()
+        moved = await self.create_ancla(self.user_id, now + timedelta(days=1))
+        renamed = await self.create_ancla(self.user_id, now + timedelta(days=1))
+        response = await self.http.patch(f"/api/anclas?user_id={self.user_id}", json={"anclas": [
+            {"id": moved["id"], "start_date": (now - timedelta(days=1)).isoformat()},
+            {"id": renamed["id"], "title": "Renombrada"},
+        ]})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json(), {"matched": 2, "modified": 2})
+
+        stored = {a["id"]: a async for a in self.db.anclas.find({"user_id": self.user_id})}
+        self.assertEqual(stored[moved["id"]]["status"], "overdue")
+        self.assertEqual((stored[renamed["id"]]["title"], stored[renamed["id"]]["status"]), ("Renombrada", "active"))
+
+    async def test_batch_rejects_repeated_ids(self):
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(days=1))
+        response = await self.http.patch(f"/api/anclas?user_id={self.user_id}", json={"anclas": [
+            {"id": ancla["id"], "title": "Primera"},
+            {"id": ancla["id"], "title": "Segunda"},
+        ]})
+        self.assertEqual(response.status_code, 422)
+        self.assertIn(ancla["id"], response.json()["detail"])
+        self.assertEqual((await self.db.anclas.find_one({"id": ancla["id"]}))["title"], "Ancla")
+
+    async def test_batch_only_touches_the_users_anclas(self):
+        other = await self.create_user()
+        ancla = await self.create_ancla(other, datetime.utcnow() + timedelta(days=1))
+        response = await self.http.patch(f"/api/anclas?user_id={self.user_id}", json={"anclas": [
+            {"id": ancla["id"], "title": "Ajena"},
+        ]})
+        self.assertEqual(response.json(), {"matched": 0, "modified": 0})
+
+if __name__ == "__main__":
+    unittest.main()
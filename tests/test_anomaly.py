@@ -0,0 +1,109 @@
+import statistics
+import unittest
+import uuid
+from datetime import datetime, timedelta
+from unittest import mock
+
+from tests.helpers import ServerTestCase, server
+
+anomaly = server.anomaly
+
+def fold(amounts):
+    stats = anomaly.empty_stats()
+    for amount in amounts:
+        stats = anomaly.update_stats(stats, amount)
+    return stats
+
+class StreamingStatsTest(unittest.TestCase):
+    SERIES = [10.0, 12.0, 11.0, 13.0, 12.0, 11.0, 10.0, 12.0, 14.0, 11.0]
+
+    def test_welford_matches_the_batch_mean_and_variance(self):
+        stats = fold(self.SERIES)
+        self.assertEqual(stats["count"], len(self.SERIES))
+        self.assertAlmostEqual(stats["mean"], statistics.mean(self.SERIES))
+        self.assertAlmostEqual(anomaly.variance(stats), statistics.variance(self.SERIES))
+        self.assertEqual(anomaly.variance(fold([5.0])), 0.0)
+
+    def test_ewma_starts_at_the_first_amount_and_decays(self):
+        expected = self.SERIES[0]
+        for amount in self.SERIES[1:]:
+            expected = anomaly.EWMA_ALPHA * amount + (1 - anomaly.EWMA_ALPHA) * expected
+        self.assertAlmostEqual(fold(self.SERIES)["ewma"], expected)
+
+    def test_median_and_mad_sketch_move_towards_the_data(self):
+        stats = fold([100.0] + [10.0] * 200)
+        self.assertAlmostEqual(stats["median"], 10.0, delta=0.1)
+        self.assertLess(stats["mad"], 1.0)
+        # One outlier moves the sketch by a bounded step, not to the outlier
+        after = anomaly.update_stats(fold(self.SERIES), 1000.0)
+        self.assertLess(after["median"], 13.0)
+
+    def test_update_leaves_its_input_untouched(self):
+        stats = fold(self.SERIES)
+        snapshot = dict(stats)
+        anomaly.update_stats(stats, 50.0)
+        self.assertEqual(stats, snapshot)
+
+    def test_only_upward_outliers_with_enough_history_are_flagged(self):
+        self.assertIsNone(anomaly.anomaly_score(fold(self.SERIES[:anomaly.MIN_SAMPLES - 1]), 1000.0))
+
+        stats = fold(self.SERIES)
+        self.assertGreater(stats["mad"], 0)
+        scores = anomaly.anomaly_score(stats, 100.0)
+        self.assertIsNotNone(scores)
+        self.assertGreater(scores["robust_score"], anomaly.ROBUST_THRESHOLD)
+        self.assertIsNone(anomaly.anomaly_score(stats, 13.0))
+        self.assertIsNone(anomaly.anomaly_score(stats, 0.0))
+
+    def test_z_score_is_used_while_the_mad_is_zero(self):
+        stats = dict(fold(self.SERIES), mad=0.0)
+        std = anomaly.variance(stats) ** 0.5
+        self.assertIsNotNone(anomaly.anomaly_score(stats, stats["mean"] + (anomaly.Z_THRESHOLD + 1) * std))
+        self.assertIsNone(anomaly.anomaly_score(stats, stats["mean"] + (anomaly.Z_THRESHOLD - 1) * std))
+
+class RebuildSpendingStatsTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.start = datetime(2026, 3, 1)
+        self.amounts = {
+            ("ana", "Ocio"): [10.0, 30.0, 20.0, 25.0],
+            ("ana", "Comida"): [40.0, 42.0],
+            ("bea", "Ocio"): [5.0, 7.0, 6.0],
+        }
+        rows = []
+        for (user_id, category), amounts in self.amounts.items():
+            for i, amount in enumerate(amounts):
+                rows.append({"id": str(uuid.uuid4()), "user_id": user_id, "type": "expense", "category": category,
+                             "amount": amount, "created_at": self.start + timedelta(days=i)})
+        rows.append({"id": str(uuid.uuid4()), "user_id": "ana", "type": "income", "category": "Nómina",
+                     "amount": 900.0, "created_at": self.start})
+        # Stored out of order: the replay must sort by time within each user
+        await self.db.transactions.insert_many(rows[::-1])
+
+    async def stored_stats(self):
+        return {
+            (doc["user_id"], doc["category"]): {field: doc[field] for field in anomaly.empty_stats()}
+            async for doc in self.db.spending_stats.find({}, {"_id": 0})
+        }
+
+    async def test_full_rebuild_replays_every_user(self):
+        with mock.patch.object(server, "BULK_INSERT_BATCH_SIZE", 2):
+            written = await server.rebuild_spending_stats(self.db)
+        self.assertEqual(written, len(self.amounts))
+        self.assertEqual(await self.stored_stats(), {key: fold(amounts) for key, amounts in self.amounts.items()})
+
+    async def test_user_rebuild_replaces_only_that_user(self):
+        await self.db.spending_stats.insert_many([
+            {"user_id": "ana", "category": "Viejo", **fold([1.0])},
+            {"user_id": "bea", "category": "Ocio", **fold([99.0])},
+        ])
+        written = await server.rebuild_spending_stats(self.db, "ana")
+        self.assertEqual(written, 2)
+
+        stored = await self.stored_stats()
+        self.assertNotIn(("ana", "Viejo"), stored)
+        self.assertEqual(stored[("ana", "Ocio")], fold(self.amounts[("ana", "Ocio")]))
+        self.assertEqual(stored[("bea", "Ocio")], fold([99.0]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+from datetime import date, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class AtomicUpdateTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+
+    async def create_objective(self, count: int) -> str:
+        response = await self.http.post(f"/api/objectives?user_id={self.user_id}", json={
+            "title": "Objetivo", "description": "",
+            "subtasks": [{"title": f"Paso {i}", "completed": False} for i in range(count)]
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()["id"]
+
+    async def toggle(self, objective_id: str, index: int) -> int:
+        return (await self.http.post(f"/api/objectives/{objective_id}/subtask/{index}/toggle")).status_code
+
+    async def test_toggling_first_middle_and_last_subtask(self):
+        objective_id = await self.create_objective(5)
+        for index in (0, 2, 4):
+            self.assertEqual(await self.toggle(objective_id, index), 200)
+
+        objective = await self.db.objectives.find_one({"id": objective_id})
+        self.assertEqual([s["completed"] for s in objective["subtasks"]], [True, False, True, False, True])
+        self.assertEqual([s["title"] for s in objective["subtasks"]], [f"Paso {i}" for i in range(5)])
+        self.assertAlmostEqual(objective["completion_percentage"], 60.0)
+
+        self.assertEqual(await self.toggle(objective_id, 4), 200)
+        objective = await self.db.objectives.find_one({"id": objective_id})
+        self.assertEqual([s["completed"] for s in objective["subtasks"]], [True, False, True, False, False])
+        self.assertAlmostEqual(objective["completion_percentage"], 40.0)
+
+    async def test_single_subtask_and_bad_indexes(self):
+        objective_id = await self.create_objective(1)
+        self.assertEqual(await self.toggle(objective_id, 0), 200)
+        self.assertEqual((await self.db.objectives.find_one({"id": objective_id}))["completion_percentage"], 100)
+
+        self.assertEqual(await self.toggle(objective_id, 1), 400)
+        self.assertEqual(await self.toggle(objective_id, -1), 400)
+        self.assertEqual(await self.toggle("missing", 0), 404)
+
+    async def test_concurrent_toggles_of_different_subtasks_all_apply(self):
+        objective_id = await self.create_objective(6)
+        statuses = await asyncio.gather(*(self.toggle(objective_id, index) for index in range(6)))
+        self.assertEqual(statuses, [200] * 6)
+        objective = await self.db.objectives.find_one({"id": objective_id})
+        self.assertTrue(all(s["completed"] for s in objective["subtasks"]))
+        self.assertEqual(objective["completion_percentage"], 100)
+
+    async def test_concurrent_add_money_loses_no_deposit(self):
+        response = await self.http.post(f"/api/savings-goals?user_id={self.user_id}", json={
+            "title": "Viaje", "target_amount": 1000.0, "target_date": (date.today() + timedelta(days=90)).isoformat()
+        })
+        goal_id = response.json()["id"]
+
+        responses = await asyncio.gather(*(
+            self.http.put(f"/api/savings-goals/{goal_id}/add-money", params={"amount": 2.5}) for _ in range(20)
+        ))
+        self.assertEqual([r.status_code for r in responses], [200] * 20)
+        self.assertEqual((await self.db.savings_goals.find_one({"id": goal_id}))["current_amount"], 50.0)
+
+        response = await self.http.put("/api/savings-goals/missing/add-money", params={"amount": 1.0})
+        self.assertEqual(response.status_code, 404)
+
+    async def test_concurrent_habit_tracks_each_count_once(self):
+        response = await self.http.post(f"/api/habits?user_id={self.user_id}", json={"name": "Leer", "frequency": 4})
+        habit_id = response.json()["id"]
+
+        responses = await asyncio.gather(*(self.http.post(f"/api/habits/{habit_id}/track") for _ in range(6)))
+        self.assertEqual([r.status_code for r in responses], [200] * 6)
+        habit = await self.db.habits.find_one({"id": habit_id})
+        self.assertEqual(habit["current_week_count"], 6)
+        self.assertEqual(habit["completion_percentage"], 100)
+        self.assertEqual(habit["week_start"], server.habit_week_start(server.datetime.utcnow()))
+
+if __name__ == "__main__":
+    unittest.main()
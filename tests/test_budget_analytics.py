@@ -0,0 +1,53 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase
+
+class BudgetAnalyticsWindowTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        self.path = f"/api/budget-analytics/{self.user_id}"
+        self.today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    async def insert_expense(self, created_at: datetime, amount: float):
+        await self.db.transactions.insert_one({
+            "id": str(uuid.uuid4()), "user_id": self.user_id, "type": "expense", "category": "Ocio",
+            "description": "Cine", "amount": amount, "date": created_at.date().isoformat(), "created_at": created_at
+        })
+
+    async def test_windows_cover_whole_utc_days(self):
+        # The weekly window is today and the six days before it, from midnight to midnight
+        await self.insert_expense(self.today - timedelta(days=6), 10.0)
+        await self.insert_expense(self.today - timedelta(days=6, milliseconds=1), 100.0)
+        await self.insert_expense(self.today, 1.0)
+
+        body = (await self.http.get(self.path, params={"period": "weekly", "trend_bucket_days": 1, "trend_buckets": 8})).json()
+        self.assertEqual(body["total_expenses"], 11.0)
+        self.assertEqual(body["expense_trends"][0]["period_start"], self.today.isoformat())
+        amounts = [bucket["amount"] for bucket in body["expense_trends"]]
+        self.assertEqual(amounts, [1.0, 0, 0, 0, 0, 0, 10.0, 100.0])
+
+    async def test_etag_holds_for_the_day_until_the_data_changes(self):
+        first = await self.http.get(self.path)
+        etag = first.headers["ETag"]
+        again = await self.http.get(self.path, headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+
+        response = await self.http.post(f"/api/transactions?user_id={self.user_id}", json={
+            "type": "expense", "category": "Ocio", "description": "Cine", "amount": 12.0,
+            "date": self.today.date().isoformat()
+        })
+        self.assertEqual(response.status_code, 200, response.text)
+        changed = await self.http.get(self.path, headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.json()["total_expenses"], 12.0)
+
+    async def test_unknown_user_is_404_even_with_a_wildcard_etag(self):
+        for path in ("/api/budget-analytics/missing", "/api/users/missing/dashboard"):
+            response = await self.http.get(path, headers={"If-None-Match": "*"})
+            self.assertEqual(response.status_code, 404, path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import json
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class ExportStreamingTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        start = datetime(2026, 3, 1)
+        await self.db.transactions.insert_many([
+            {"id": str(uuid.uuid4()), "user_id": self.user_id, "type": "expense", "category": "Ocio",
+             "description": f"Movimiento {i}", "amount": 1.0, "date": "2026-03-01",
+             "created_at": start + timedelta(minutes=i)}
+            for i in range(25)
+        ])
+
+    async def test_ndjson_flushes_a_small_first_chunk(self):
+        chunks = [chunk async for chunk in server.export_ndjson_batches(self.user_id, ["transactions"])]
+        sizes = [chunk.count(b"\n") for chunk in chunks]
+        self.assertEqual(sizes, [server.EXPORT_FIRST_BATCH_SIZE, 25 - server.EXPORT_FIRST_BATCH_SIZE])
+
+    async def test_csv_sends_the_header_first(self):
+        chunks = [chunk async for chunk in server.export_csv_batches(self.user_id, "transactions")]
+        self.assertEqual(chunks[0].strip(), ",".join(server.EXPORT_FIELDS["transactions"]))
+        self.assertEqual(chunks[1].count("\n"), server.EXPORT_FIRST_BATCH_SIZE)
+
+    async def test_streamed_export_holds_every_row_in_order(self):
+        response = await self.http.get(f"/api/export/{self.user_id}", params={"collections": "transactions"})
+        self.assertEqual(response.status_code, 200)
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual([row["document"]["description"] for row in rows], [f"Movimiento {i}" for i in range(25)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+NOW = datetime(2026, 3, 10, 12, 0)
+MIDNIGHT = datetime(2026, 3, 10)
+
+class AnclaDueStatusTest(unittest.TestCase):
+    def status(self, **ancla):
+        return server.ancla_due_status({"status": "active", "repeat_type": "no_repeat", **ancla}, NOW)
+
+    def test_timed_anclas_are_due_at_end_date_else_start_date(self):
+        self.assertEqual(self.status(start_date=NOW - timedelta(minutes=1)), "overdue")
+        self.assertEqual(self.status(start_date=NOW), "overdue")
+        self.assertEqual(self.status(start_date=NOW + timedelta(minutes=1)), "active")
+        self.assertEqual(self.status(start_date=NOW - timedelta(days=1), end_date=NOW + timedelta(hours=1)), "active")
+
+    def test_all_day_anclas_are_due_at_the_end_of_their_day(self):
+        self.assertEqual(self.status(start_date=MIDNIGHT, all_day=True), "active")
+        self.assertEqual(self.status(start_date=MIDNIGHT - timedelta(days=1), all_day=True), "overdue")
+        self.assertEqual(self.status(start_date=MIDNIGHT - timedelta(days=3), end_date=MIDNIGHT, all_day=True), "active")
+
+    def test_recurring_and_closed_anclas_keep_their_status(self):
+        self.assertEqual(self.status(start_date=NOW - timedelta(days=30), repeat_type="weekly"), "active")
+        self.assertEqual(self.status(start_date=NOW - timedelta(days=1), status="completed"), "completed")
+        self.assertEqual(self.status(start_date=NOW + timedelta(days=1), status="overdue"), "active")
+
+class OverdueSweeperTest(ServerTestCase):
+    async def seed(self, start_date: datetime, user_id: str = "ana", **fields) -> str:
+        ancla_id = str(uuid.uuid4())
+        await self.db.anclas.insert_one({
+            "id": ancla_id, "user_id": user_id, "title": "Seed", "status": "active", "repeat_type": "no_repeat",
+            "all_day": False, "start_date": start_date, "end_date": None, **fields
+        })
+        return ancla_id
+
+    async def statuses(self):
+        return {a["id"]: a["status"] async for a in self.db.anclas.find({}, {"_id": 0, "id": 1, "status": 1})}
+
+    async def test_first_sweep_catches_up_and_checkpoints(self):
+        missed = await self.seed(NOW - timedelta(days=40))
+        due = await self.seed(NOW - timedelta(minutes=1), user_id="bea")
+        ending = await self.seed(NOW - timedelta(days=2), end_date=NOW + timedelta(hours=1))
+        recurring = await self.seed(NOW - timedelta(days=2), repeat_type="daily")
+        today = await self.seed(MIDNIGHT, all_day=True)
+        yesterday = await self.seed(MIDNIGHT - timedelta(days=1), all_day=True)
+
+        sweeper = server.OverdueSweeper(self.db)
+        self.assertEqual(await sweeper.sweep(NOW), 3)
+        statuses = await self.statuses()
+        self.assertEqual({i for i, s in statuses.items() if s == "overdue"}, {missed, due, yesterday})
+        self.assertEqual({statuses[i] for i in (ending, recurring, today)}, {"active"})
+
+        checkpoint = await self.db.batch_checkpoints.find_one({"_id": server.OVERDUE_JOB})
+        self.assertEqual(checkpoint["high_water"], NOW)
+        versions = {v["user_id"]: v["version"] async for v in self.db.user_data_versions.find()}
+        self.assertEqual(versions, {"ana": 1, "bea": 1})
+
+    async def test_later_sweeps_only_read_the_new_window(self):
+        sweeper = server.OverdueSweeper(self.db)
+        await sweeper.sweep(NOW)
+
+        later = NOW + timedelta(days=1)
+        ending = await self.seed(NOW - timedelta(days=1), end_date=NOW + timedelta(hours=2))
+        all_day = await self.seed(MIDNIGHT, all_day=True)
+        # Due before the mark: settled by the write that created it, not by the sweeper
+        behind = await self.seed(NOW - timedelta(hours=1))
+
+        # A fresh sweeper (another worker, or after a restart) resumes from the checkpoint
+        resumed = server.OverdueSweeper(self.db)
+        self.assertEqual(await resumed.sweep(later), 2)
+        statuses = await self.statuses()
+        self.assertEqual((statuses[ending], statuses[all_day], statuses[behind]), ("overdue", "overdue", "active"))
+        self.assertEqual(resumed.high_water, later)
+
+        self.assertEqual(await resumed.sweep(later + timedelta(minutes=1)), 0)
+
+    async def test_created_anclas_get_their_status_up_front(self):
+        user_id = await self.create_user()
+        now = datetime.utcnow()
+        past = await self.create_ancla(user_id, now - timedelta(hours=1))
+        today = await self.create_ancla(user_id, datetime.combine(now.date(), datetime.min.time()), all_day=True)
+        self.assertEqual((past["status"], today["status"]), ("overdue", "active"))
+
+        # Edits settle the status with the same end-of-day rule
+        yesterday = datetime.combine(now.date() - timedelta(days=1), datetime.min.time())
+        response = await self.http.patch(f"/api/anclas/{today['id']}", json={"start_date": yesterday.isoformat()})
+        self.assertEqual(response.json()["status"], "overdue")
+        response = await self.http.patch(f"/api/anclas/{past['id']}", json={"all_day": True})
+        self.assertEqual(response.json()["status"], "active")
+
+if __name__ == "__main__":
+    unittest.main()
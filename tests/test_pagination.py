@@ -0,0 +1,64 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase
+
+class CursorPaginationTest(ServerTestCase):
+    async def seed_transactions(self, user_id: str, created_at):
+        docs = [
+            {"id": str(uuid.uuid4()), "user_id": user_id, "type": "expense", "category": "Ocio",
+             "description": f"Movimiento {i}", "amount": 1.0, "date": "2026-01-01", "created_at": at}
+            for i, at in enumerate(created_at)
+        ]
+        await self.db.transactions.insert_many(docs)
+        # (created_at, id) descending with missing timestamps last, the order paginate() promises
+        docs.sort(key=lambda d: d["id"], reverse=True)
+        docs.sort(key=lambda d: (d["created_at"] is not None, d["created_at"] or datetime.min), reverse=True)
+        return [d["id"] for d in docs]
+
+    async def walk(self, path: str, limit: int):
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+            response = await self.http.get(path, params=params)
+            self.assertEqual(response.status_code, 200, response.text)
+            page = response.json()
+            self.assertLessEqual(len(page), limit)
+            ids.extend(item["id"] for item in page)
+            pages += 1
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return ids, pages
+
+    async def test_pages_have_no_gaps_or_duplicates_when_created_at_ties(self):
+        user_id = await self.create_user()
+        tied = datetime(2026, 3, 1, 12, 0, 0)
+        created_at = [tied] * 7 + [tied + timedelta(seconds=1), tied - timedelta(seconds=1)] + [None] * 3
+        expected = await self.seed_transactions(user_id, created_at)
+
+        ids, pages = await self.walk(f"/api/transactions/{user_id}", limit=2)
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 6)
+
+    async def test_cached_category_pages_cover_every_category(self):
+        user_id = await self.create_user()
+        tied = datetime(2026, 3, 1, 12, 0, 0)
+        await self.db.categories.update_many({"user_id": user_id}, {"$set": {"created_at": tied}})
+        # Categories page oldest first
+        expected = sorted(c["id"] for c in await self.db.categories.find({"user_id": user_id}).to_list(None))
+
+        ids, _ = await self.walk(f"/api/categories/{user_id}", limit=2)
+        self.assertEqual(ids, expected)
+
+    async def test_unpaged_call_keeps_the_old_default(self):
+        user_id = await self.create_user()
+        start = datetime(2026, 3, 1)
+        await self.seed_transactions(user_id, [start + timedelta(seconds=i) for i in range(150)])
+
+        response = await self.http.get(f"/api/transactions/{user_id}")
+        self.assertEqual(len(response.json()), 150)
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class ReminderLeadTest(unittest.TestCase):
+    def test_lead_is_rendered_in_its_own_unit(self):
+        cases = {10: "10 minutos", 1: "1 minuto", 60: "1 hora", 90: "90 minutos", 120: "2 horas", 1440: "1 día", 4320: "3 días"}
+        for minutes, text in cases.items():
+            self.assertEqual(server.format_lead(minutes), text)
+
+    def test_lead_comes_from_alert_time_then_settings_and_is_clamped(self):
+        self.assertEqual(server.reminder_lead_minutes({"alert_time": "1 hora antes"}, {"reminder_time": 5}), 60)
+        self.assertEqual(server.reminder_lead_minutes({}, {"reminder_time": 5}), 5)
+        self.assertEqual(server.reminder_lead_minutes({"alert_time": "30 días antes"}, None), 7 * 1440)
+
+class ReminderSchedulerTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        response = await self.http.post(f"/api/notification-settings?user_id={self.user_id}", json={"reminder_time": 10})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.scheduler = server.reminder_scheduler
+        await self.scheduler.refill()
+
+    async def seed_ancla(self, start_date: datetime, **fields) -> str:
+        ancla_id = str(uuid.uuid4())
+        await self.db.anclas.insert_one({
+            "id": ancla_id, "user_id": self.user_id, "title": "Seed", "status": "active", "repeat_type": "no_repeat",
+            "alert_enabled": True, "start_date": start_date, **fields
+        })
+        return ancla_id
+
+    async def deliver_due(self):
+        await self.scheduler.deliver(self.scheduler.pop_due(datetime.utcnow()))
+        return [n["body"] async for n in self.db.notifications.find({"user_id": self.user_id}).sort("body", 1)]
+
+    async def test_lead_longer_than_the_lookahead_is_queued_before_it_fires(self):
+        # Whole seconds, since BSON dates drop the microseconds
+        start = datetime.utcnow().replace(microsecond=0) + self.scheduler.LOOKAHEAD + timedelta(days=1, hours=1)
+        await self.seed_ancla(start, alert_time="3 días antes")
+        self.scheduler.loaded_until = None
+
+        await self.scheduler.refill()
+        await self.scheduler.refill()
+        self.assertEqual(len(self.scheduler), 1, "The alert must be queued once, however often the scheduler refills")
+        self.assertEqual(self.scheduler.heap[0][0], start - timedelta(days=3))
+
+    async def test_delete_cancels_and_cancelled_nodes_are_compacted(self):
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(hours=1), alert_enabled=True)
+        self.assertEqual(len(self.scheduler), 1)
+        response = await self.http.delete(f"/api/anclas/{ancla['id']}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.scheduler), 0)
+
+        start = datetime.utcnow() + timedelta(hours=1)
+        ids = [await self.seed_ancla(start + timedelta(minutes=i)) for i in range(2 * self.scheduler.BATCH_SIZE)]
+        self.scheduler.loaded_until = None
+        await self.scheduler.refill()
+        self.assertEqual(len(self.scheduler), len(ids))
+        for ancla_id in ids:
+            self.scheduler.cancel(ancla_id)
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertLessEqual(len(self.scheduler.heap), self.scheduler.BATCH_SIZE)
+
+    async def test_due_reminder_is_delivered_once(self):
+        await self.create_ancla(self.user_id, datetime.utcnow() + timedelta(minutes=5),
+                                title="Reunión", alert_enabled=True, alert_time="1 día antes")
+        due = self.scheduler.pop_due(datetime.utcnow())
+        self.assertEqual(len(due), 1)
+        await self.scheduler.deliver([dict(entry) for entry in due])
+        await self.scheduler.deliver([dict(entry) for entry in due])
+        self.assertEqual(await self.deliver_due(), ['"Reunión" comienza en 1 día'])
+
+    async def test_delivery_follows_the_current_ancla(self):
+        start = datetime.utcnow() + timedelta(minutes=5)
+        renamed = await self.create_ancla(self.user_id, start, title="Antes", alert_enabled=True)
+        patched = await self.create_ancla(self.user_id, start, title="Sin editar", alert_enabled=True)
+        disabled = await self.create_ancla(self.user_id, start, title="Desactivada", alert_enabled=True)
+        completed = await self.create_ancla(self.user_id, start, title="Completada", alert_enabled=True)
+
+        # Edits served by another worker only reach the database
+        await self.db.anclas.update_one({"id": renamed["id"]}, {"$set": {"title": "Después"}})
+        await self.db.anclas.update_one({"id": disabled["id"]}, {"$set": {"alert_enabled": False}})
+        response = await self.http.patch(f"/api/anclas/{patched['id']}", json={"title": "Editada"})
+        self.assertEqual(response.status_code, 200)
+        response = await self.http.post(f"/api/anclas/{completed['id']}/complete")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(await self.deliver_due(), ['"Después" comienza en 10 minutos', '"Editada" comienza en 10 minutos'])
+
+if __name__ == "__main__":
+    unittest.main()
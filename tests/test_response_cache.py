@@ -0,0 +1,63 @@
+import unittest
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase
+
+class ResponseCacheInvalidationTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+
+    async def get(self, path: str):
+        response = await self.http.get(path)
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    async def test_reads_are_served_from_the_cache(self):
+        path = f"/api/users/{self.user_id}"
+        await self.get(path)
+        # A change behind the API's back is not seen until something invalidates the entry
+        await self.db.users.update_one({"id": self.user_id}, {"$set": {"name": "Otro"}})
+        self.assertEqual((await self.get(path))["name"], "Test")
+
+    async def test_completing_an_ancla_invalidates_the_user(self):
+        path = f"/api/users/{self.user_id}"
+        self.assertEqual((await self.get(path))["total_completed"], 0)
+
+        ancla = await self.create_ancla(self.user_id, datetime.utcnow() - timedelta(hours=1))
+        response = await self.http.post(f"/api/anclas/{ancla['id']}/complete")
+        self.assertEqual(response.status_code, 200, response.text)
+
+        user = await self.get(path)
+        self.assertEqual(user["total_completed"], 1)
+        self.assertEqual(user["current_streak"], 1)
+
+    async def test_creating_a_category_invalidates_every_page(self):
+        path = f"/api/categories/{self.user_id}"
+        before = await self.get(path)
+        first_page = await self.get(f"{path}?limit=1")
+
+        response = await self.http.post(f"/api/categories?user_id={self.user_id}&profile=freelancer",
+                                        json={"name": "Nueva", "color": "#000000", "icon": "⚓"})
+        self.assertEqual(response.status_code, 200, response.text)
+
+        after = await self.get(path)
+        self.assertEqual(len(after), len(before) + 1)
+        self.assertEqual(after[-1]["name"], "Nueva")
+        self.assertEqual(await self.get(f"{path}?limit=1"), first_page)
+
+    async def test_settings_writes_invalidate_the_settings(self):
+        path = f"/api/notification-settings/{self.user_id}"
+        self.assertEqual((await self.get(path))["reminder_time"], 30)
+
+        response = await self.http.post(f"/api/notification-settings?user_id={self.user_id}", json={"reminder_time": 15})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual((await self.get(path))["reminder_time"], 15)
+
+        response = await self.http.put(path, json={"reminder_time": 45, "daily_summary": False})
+        self.assertEqual(response.status_code, 200, response.text)
+        settings = await self.get(path)
+        self.assertEqual((settings["reminder_time"], settings["daily_summary"]), (45, False))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class RollupRebuildTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.user_id = await self.create_user()
+        # Inserted behind the API's back, as if the process died before the rollup $inc
+        created_at = server.month_start(datetime.utcnow() - timedelta(days=95)) + timedelta(days=3)
+        await self.db.transactions.insert_many([
+            {"id": str(uuid.uuid4()), "user_id": self.user_id, "type": "expense", "category": "Ocio",
+             "description": "Cine", "amount": amount, "date": created_at.date().isoformat(), "created_at": created_at}
+            for amount in (20.0, 30.0)
+        ])
+        self.path = f"/api/budget-analytics/{self.user_id}"
+        self.params = {"period": "yearly"}
+
+    async def assert_rebuild_repairs(self, user_id):
+        before = await self.http.get(self.path, params=self.params)
+        self.assertEqual(before.json()["total_expenses"], 0)
+        etag = before.headers["ETag"]
+
+        await server.rebuild_transaction_rollups(self.db, user_id)
+
+        after = await self.http.get(self.path, params=self.params, headers={"If-None-Match": etag})
+        self.assertEqual(after.status_code, 200, "A rebuild must invalidate the budget-analytics ETag")
+        self.assertEqual(after.json()["total_expenses"], 50.0)
+
+    async def test_full_rebuild_repairs_totals_and_etag(self):
+        await self.assert_rebuild_repairs(None)
+
+    async def test_per_user_rebuild_repairs_totals_and_etag(self):
+        await self.assert_rebuild_repairs(self.user_id)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime
+
+from tests.helpers import server
+
+def expense(category, amount, created_at):
+    return {"type": "expense", "category": category, "amount": amount, "created_at": created_at}
+
+class SpendingPatternsTest(unittest.TestCase):
+    def analyze(self, transactions):
+        return server.FinancialAIEngine.analyze_spending_patterns(transactions, "freelancer")
+
+    def test_statistics_per_category_and_month(self):
+        march, april = datetime(2026, 3, 10), datetime(2026, 4, 2)
+        patterns = self.analyze([
+            expense("Ocio", 10.5, march), expense("Comida", 40.0, march), {"type": "income", "amount": 999.0},
+            expense("Ocio", 30.5, april), expense("Comida", 20.0, april), expense("Ocio", 20.0, april),
+        ])
+        self.assertEqual(list(patterns["category_averages"]), ["Ocio", "Comida"])
+        self.assertEqual(patterns["category_averages"], {"Ocio": 61.0 / 3, "Comida": 30.0})
+        self.assertEqual(patterns["spending_volatility"], {"Ocio": 20.0, "Comida": 20.0})
+        self.assertEqual(patterns["monthly_growth"], (70.5 - 50.5) / 50.5 * 100)
+
+    def test_integer_amounts_keep_their_types(self):
+        moment = datetime(2026, 3, 10)
+        patterns = self.analyze([
+            expense("Ocio", 10, moment), expense("Ocio", 35, moment), expense("Comida", 40, moment),
+            expense("Viaje", 5.0, moment), expense("Viaje", 7, moment),
+        ])
+        volatility = patterns["spending_volatility"]
+        self.assertEqual(volatility, {"Ocio": 25, "Comida": 0, "Viaje": 2.0})
+        self.assertIs(type(volatility["Ocio"]), int)
+        self.assertIs(type(volatility["Comida"]), int)
+        self.assertIs(type(volatility["Viaje"]), float)
+        self.assertIs(type(patterns["monthly_growth"]), int)
+
+    def test_without_expenses(self):
+        self.assertEqual(self.analyze([]), {})
+        self.assertEqual(self.analyze([{"type": "income", "amount": 10.0}])["category_averages"], {})
+
+if __name__ == "__main__":
+    unittest.main()
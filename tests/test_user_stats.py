@@ -0,0 +1,69 @@
+import unittest
+import uuid
+from datetime import datetime, timedelta
+
+from tests.helpers import ServerTestCase, server
+
+class RebuildUserStatsTest(ServerTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.today = server.completion_day(datetime.utcnow())
+        self.active, self.legacy, self.idle = [await self.create_user() for _ in range(3)]
+
+        # 1 + 8 completions on the two previous days and one occurrence today: 10 in a 3-day streak
+        completions = [self.today - timedelta(days=2) + timedelta(hours=10)] + [self.today - timedelta(days=1) + timedelta(hours=9)] * 8
+        await self.db.anclas.insert_many([
+            {"id": str(uuid.uuid4()), "user_id": self.active, "title": "Hecha", "status": "completed",
+             "repeat_type": "no_repeat", "start_date": completed_at, "completed_at": completed_at}
+            for completed_at in completions
+        ])
+        await self.db.ancla_occurrences.insert_one({
+            "ancla_id": str(uuid.uuid4()), "user_id": self.active, "occurrence_date": self.today,
+            "completed_at": self.today + timedelta(minutes=1)
+        })
+        # Counters left by the old $inc, with no last_completion_day and no completion behind them
+        await self.db.users.update_one(
+            {"id": self.legacy},
+            {"$set": {"total_completed": 7, "current_streak": 2, "best_streak": 3}, "$unset": {"last_completion_day": ""}}
+        )
+
+    async def dashboard_etag(self, user_id: str) -> str:
+        response = await self.http.get(f"/api/users/{user_id}/dashboard")
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.headers["ETag"]
+
+    async def versions(self):
+        return {doc["user_id"]: doc["version"] async for doc in self.db.user_data_versions.find()}
+
+    async def test_rebuild_replays_completions_and_resets_the_rest(self):
+        self.assertEqual((await self.http.get(f"/api/users/{self.active}")).json()["total_completed"], 0)
+        etags = {user_id: await self.dashboard_etag(user_id) for user_id in (self.active, self.legacy, self.idle)}
+        before = await self.versions()
+
+        self.assertEqual(await server.rebuild_user_stats(self.db), 1)
+
+        active = (await self.http.get(f"/api/users/{self.active}")).json()
+        self.assertEqual(
+            {field: active[field] for field in ("total_completed", "current_streak", "best_streak", "rank")},
+            {"total_completed": 10, "current_streak": 3, "best_streak": 3, "rank": "marinero"}
+        )
+        self.assertEqual(datetime.fromisoformat(active["last_completion_day"]), self.today)
+
+        legacy = await self.db.users.find_one({"id": self.legacy})
+        self.assertEqual((legacy["total_completed"], legacy["current_streak"], legacy["best_streak"]), (0, 0, 0))
+
+        # The dashboards of users whose stats changed must not revalidate as unchanged
+        after = await self.versions()
+        for user_id, bumped in ((self.active, True), (self.legacy, True), (self.idle, False)):
+            self.assertEqual(after.get(user_id, 0) > before.get(user_id, 0), bumped, user_id)
+            response = await self.http.get(f"/api/users/{user_id}/dashboard", headers={"If-None-Match": etags[user_id]})
+            self.assertEqual(response.status_code, 200 if bumped else 304, user_id)
+
+    async def test_a_second_rebuild_changes_nothing(self):
+        await server.rebuild_user_stats(self.db)
+        versions = await self.versions()
+        await server.rebuild_user_stats(self.db)
+        self.assertEqual(await self.versions(), versions)
+
+if __name__ == "__main__":
+    unittest.main()
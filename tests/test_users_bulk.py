@@ -0,0 +1,49 @@
+import unittest
+
+from tests.helpers import ServerTestCase, server
+
+def bulk_payload(*emails, profile="student"):
+    return {"users": [{"email": email, "name": email.split("@")[0], "profile": profile} for email in emails]}
+
+class BulkUserCreateTest(ServerTestCase):
+    async def test_creates_users_with_their_predefined_data(self):
+        response = await self.http.post("/api/users/bulk", json=bulk_payload("a@anclora.test", "b@anclora.test"))
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertEqual(body["created"], 2)
+        self.assertEqual(body["failed"], [])
+        self.assertEqual(body["incomplete"], [])
+
+        expected = len(server.PREDEFINED_CATEGORIES[server.UserProfile.STUDENT])
+        for user_id in body["user_ids"]:
+            self.assertEqual(await self.db.categories.count_documents({"user_id": user_id}), expected)
+            self.assertEqual((await self.http.get(f"/api/users/{user_id}")).status_code, 200)
+
+    async def test_rejects_repeated_emails(self):
+        response = await self.http.post(
+            "/api/users/bulk", json=bulk_payload("a@anclora.test", "b@anclora.test", " A@Anclora.test")
+        )
+        self.assertEqual(response.status_code, 422)
+        self.assertIn("a@anclora.test", response.json()["detail"])
+        self.assertEqual(await self.db.users.count_documents({}), 0)
+
+    async def test_reports_failed_users_without_orphaned_children(self):
+        # A deployment-level unique email index makes one insert of the batch fail
+        await self.db.users.create_index("email", unique=True)
+        await self.http.post("/api/users", json={"email": "taken@anclora.test", "name": "Taken", "profile": "student"})
+
+        response = await self.http.post(
+            "/api/users/bulk", json=bulk_payload("new@anclora.test", "taken@anclora.test", "other@anclora.test")
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertEqual(body["created"], 2)
+        self.assertEqual([(f["index"], f["email"]) for f in body["failed"]], [(1, "taken@anclora.test")])
+
+        user_ids = {u["id"] async for u in self.db.users.find({}, {"id": 1})}
+        for name in ("categories", "habits", "objectives"):
+            owners = set(await self.db[name].distinct("user_id"))
+            self.assertLessEqual(owners, user_ids, f"{name} written for a user that was not created")
+
+if __name__ == "__main__":
+    unittest.main()